@@ -0,0 +1,171 @@
+"""
+番組一覧APIのレスポンスのパース速度を比べる
+
+    python -m benchmarks.bench_parse_user_broadcast_history [--response_paths PATH ...]
+    python -m benchmarks.bench_parse_user_broadcast_history --cassette_paths PATH ...
+
+response_pathsには、保存したレスポンスボディのJSONファイルを指定する。
+cassette_pathsには、updateサブコマンドの--cassette_mode recordで記録したファイルを指定し、
+記録された番組一覧APIの成功したレスポンスを全て使う。
+
+どちらも指定しない場合は benchmarks/data/user_broadcast_history.json を使う。
+これは手で作ったレスポンスのため、実際の分布で測るにはカセットを使う
+"""
+
+import importlib.util
+import json
+import timeit
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from live_inbox_updater.cassette import CassetteEntry, decode_cassette_content
+from live_inbox_updater.niconico_api.niconico_user_broadcast_history_client.niconico import (
+    USER_BROADCAST_HISTORY_API_URL,
+    UserBroadcastHistoryResponseBody,
+    load_user_broadcast_history_response,
+    parse_user_broadcast_history_response,
+)
+
+DEFAULT_RESPONSE_PATH = Path(__file__).parent / "data" / "user_broadcast_history.json"
+
+
+def parse_full(content: bytes) -> None:
+    """変更前の経路: 辞書にしてからレスポンス全体を検証する"""
+    response_body = UserBroadcastHistoryResponseBody.model_validate(json.loads(content))
+    parse_user_broadcast_history_response(response_body, offset=0, limit=10)
+
+
+def parse_lean_pydantic(content: bytes) -> None:
+    response_body = load_user_broadcast_history_response(
+        content,
+        json_backend="pydantic",
+    )
+    parse_user_broadcast_history_response(response_body, offset=0, limit=10)
+
+
+def parse_lean_orjson(content: bytes) -> None:
+    response_body = load_user_broadcast_history_response(
+        content,
+        json_backend="orjson",
+    )
+    parse_user_broadcast_history_response(response_body, offset=0, limit=10)
+
+
+def load_cassette_response_contents(path: Path) -> list[bytes]:
+    """
+    カセットから番組一覧APIの成功したレスポンスボディを取り出す
+
+    カセットはContent-Encodingを解く前のボディを持つため、httpxで解いてから返す
+    """
+
+    contents: list[bytes] = []
+    with path.open("r", encoding="utf-8") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+
+            entry = CassetteEntry.model_validate_json(line)
+            if entry.service != "niconico" or entry.status_code != 200:
+                continue
+
+            if not entry.url.startswith(USER_BROADCAST_HISTORY_API_URL):
+                continue
+
+            response = httpx.Response(
+                status_code=entry.status_code,
+                headers=entry.headers,
+                stream=httpx.ByteStream(decode_cassette_content(entry.content)),
+            )
+            contents.append(response.read())
+
+    return contents
+
+
+def create_runner(
+    parse: Callable[[bytes], None],
+    contents: list[bytes],
+) -> Callable[[], None]:
+    def _run() -> None:
+        for content in contents:
+            parse(content)
+
+    return _run
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--response_paths",
+        type=Path,
+        nargs="+",
+        default=[],
+    )
+    parser.add_argument(
+        "--cassette_paths",
+        type=Path,
+        nargs="+",
+        default=[],
+    )
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+    )
+    args = parser.parse_args()
+
+    response_paths: list[Path] = args.response_paths
+    cassette_paths: list[Path] = args.cassette_paths
+    number: int = args.number
+    repeat: int = args.repeat
+
+    if len(response_paths) == 0 and len(cassette_paths) == 0:
+        response_paths = [DEFAULT_RESPONSE_PATH]
+
+    contents = [path.read_bytes() for path in response_paths]
+    for cassette_path in cassette_paths:
+        contents.extend(load_cassette_response_contents(path=cassette_path))
+
+    if len(contents) == 0:
+        raise Exception("No user broadcast history responses found.")
+
+    total_bytes = sum(len(content) for content in contents)
+
+    cases: dict[str, Callable[[bytes], None]] = {
+        "full (json + model_validate)": parse_full,
+        "lean (pydantic model_validate_json)": parse_lean_pydantic,
+        "lean (orjson + model_validate)": parse_lean_orjson,
+    }
+
+    print(f"{len(contents)} responses, {total_bytes} bytes")
+
+    if importlib.util.find_spec("orjson") is None:
+        print("orjson is not installed. Skipping the orjson backend")
+        del cases["lean (orjson + model_validate)"]
+
+    for name, parse in cases.items():
+        best = (
+            min(
+                timeit.repeat(
+                    create_runner(parse=parse, contents=contents),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            / number
+        )
+        print(
+            f"{name}: {best * 1_000_000:.1f} us/iteration, "
+            f"{total_bytes / best / 1_000_000:.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
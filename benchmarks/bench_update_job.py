@@ -0,0 +1,379 @@
+"""
+偽のニコニコとHasura GraphQLに対してupdate_jobを実行し、更新サイクルの性能を測る
+
+    python -m benchmarks.bench_update_job [--user_counts 100 1000 10000] [--cycles 3]
+
+ユーザ数ごとに別のプロセスで実行し、サイクル時間、1秒あたりのリクエスト数、
+ピークRSS、CPU時間を表示する。
+偽のサーバはhttpx.MockTransportのハンドラで、ソケットは使わない。
+レート制限は通信の待ち時間ではなく処理の性能を測るため使わない
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+import traceback
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+from pydantic import BaseModel
+
+from live_inbox_updater.json_backend import JsonBackend
+from live_inbox_updater.live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramHasuraManager,
+)
+from live_inbox_updater.live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager,
+)
+from live_inbox_updater.live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageFileManager,
+)
+from live_inbox_updater.live_inbox_api.niconico_user_manager import (
+    NiconicoUserHasuraManager,
+)
+from live_inbox_updater.live_inbox_utility import (
+    NiconicoLiveProgramStateStore,
+    NiconicoUserIconPipelineConfig,
+    NiconicoUserIndex,
+    OpenNiconicoLiveProgramIndex,
+    update_job_async,
+)
+from live_inbox_updater.niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient,
+)
+from live_inbox_updater.niconico_api.niconico_user_icon_client import (
+    NiconicoApiNiconicoUserIconNiconicoAsyncClient,
+)
+
+from .fake_servers import FakeHasuraServer, FakeNiconicoServer, FakeServerConfig
+
+HASURA_URL = "http://hasura.invalid/"
+HASURA_TOKEN = "benchmark"
+USERAGENT = "LiveInboxBenchmark/0.0.0"
+
+
+class BenchUpdateJobScenario(BaseModel):
+    fake_server_config: FakeServerConfig
+    cycles: int
+    update_concurrency: int
+    program_upsert_chunk_size: int
+    program_history_page_size: int
+    program_history_max_pages: int
+    niconico_json_backend: JsonBackend
+    log_level: str
+
+
+class BenchUpdateJobResult(BaseModel):
+    user_count: int
+    cycle_seconds: list[float]
+    failed_cycles: int
+    niconico_requests: int
+    niconico_errors: int
+    hasura_requests: int
+    hasura_errors: int
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_bytes: int
+
+
+def get_peak_rss_bytes() -> int:
+    # ru_maxrssの単位はLinuxではKiB、macOSではバイト
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak_rss
+    return peak_rss * 1024
+
+
+def run_scenario(scenario: BenchUpdateJobScenario) -> BenchUpdateJobResult:
+    """
+    1つのユーザ数についてupdate_jobをcycles回実行する。ピークRSSを分けるため、子プロセスで呼ぶ
+    """
+
+    logging.basicConfig(level=scenario.log_level)
+
+    fake_server_config = scenario.fake_server_config
+    fake_niconico_server = FakeNiconicoServer(config=fake_server_config)
+    fake_hasura_server = FakeHasuraServer(config=fake_server_config)
+
+    hasura_http_client = httpx.Client(
+        transport=httpx.MockTransport(fake_hasura_server.handle_request),
+    )
+    niconico_async_http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(fake_niconico_server.handle_async_request),
+    )
+
+    niconico_user_index = NiconicoUserIndex(
+        niconico_user_manager=NiconicoUserHasuraManager(
+            hasura_url=HASURA_URL,
+            hasura_token=HASURA_TOKEN,
+            useragent=USERAGENT,
+            http_client=hasura_http_client,
+        ),
+        incremental=True,
+        full_resync_interval=timedelta(hours=1),
+        shard=None,
+    )
+    niconico_user_icon_async_client = NiconicoApiNiconicoUserIconNiconicoAsyncClient(
+        useragent=USERAGENT,
+        http_client=niconico_async_http_client,
+    )
+    niconico_user_icon_cache_metadata_manager = (
+        LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
+            hasura_url=HASURA_URL,
+            hasura_token=HASURA_TOKEN,
+            useragent=USERAGENT,
+            http_client=hasura_http_client,
+        )
+    )
+    niconico_user_broadcast_history_async_client = (
+        NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient(
+            useragent=USERAGENT,
+            http_client=niconico_async_http_client,
+            json_backend=scenario.niconico_json_backend,
+        )
+    )
+    niconico_live_program_manager = LiveInboxApiNiconicoLiveProgramHasuraManager(
+        hasura_url=HASURA_URL,
+        hasura_token=HASURA_TOKEN,
+        useragent=USERAGENT,
+        http_client=hasura_http_client,
+        upsert_chunk_size=scenario.program_upsert_chunk_size,
+    )
+    niconico_live_program_state_store = NiconicoLiveProgramStateStore(
+        heartbeat_interval=timedelta(hours=1),
+    )
+    open_niconico_live_program_index = OpenNiconicoLiveProgramIndex(
+        recheck_delay=timedelta(seconds=30),
+    )
+    niconico_user_icon_pipeline_config = NiconicoUserIconPipelineConfig(
+        download_concurrency=4,
+        store_concurrency=4,
+        metadata_concurrency=1,
+        metadata_batch_size=100,
+        max_in_flight_bytes=33554432,
+        content_addressed=True,
+        revalidation_batch_size=100,
+        revalidation_interval=604800,
+    )
+
+    cycle_seconds: list[float] = []
+    failed_cycles = 0
+
+    with (
+        tempfile.TemporaryDirectory() as niconico_user_icon_dir,
+        asyncio.Runner() as runner,
+    ):
+        niconico_user_icon_cache_storage_manager = (
+            LiveInboxApiNiconicoUserIconCacheStorageFileManager(
+                niconico_user_icon_dir=Path(niconico_user_icon_dir),
+            )
+        )
+
+        started_at = time.monotonic()
+        cpu_started_at = time.process_time()
+
+        for _ in range(scenario.cycles):
+            cycle_started_at = time.monotonic()
+            try:
+                runner.run(
+                    update_job_async(
+                        niconico_user_index=niconico_user_index,
+                        niconico_user_icon_async_client=niconico_user_icon_async_client,
+                        niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                        niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                        niconico_user_icon_pipeline_config=niconico_user_icon_pipeline_config,
+                        niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                        niconico_live_program_manager=niconico_live_program_manager,
+                        niconico_live_program_state_store=niconico_live_program_state_store,
+                        open_niconico_live_program_index=open_niconico_live_program_index,
+                        update_concurrency=scenario.update_concurrency,
+                        program_upsert_chunk_size=scenario.program_upsert_chunk_size,
+                        program_history_page_size=scenario.program_history_page_size,
+                        program_history_max_pages=scenario.program_history_max_pages,
+                        metrics=None,
+                        tracer=None,
+                    ),
+                )
+            except Exception:
+                traceback.print_exc()
+                failed_cycles += 1
+
+            cycle_seconds.append(time.monotonic() - cycle_started_at)
+
+        wall_seconds = time.monotonic() - started_at
+        cpu_seconds = time.process_time() - cpu_started_at
+
+        runner.run(niconico_async_http_client.aclose())
+
+    hasura_http_client.close()
+
+    return BenchUpdateJobResult(
+        user_count=fake_server_config.user_count,
+        cycle_seconds=cycle_seconds,
+        failed_cycles=failed_cycles,
+        niconico_requests=fake_niconico_server.request_count,
+        niconico_errors=fake_niconico_server.error_count,
+        hasura_requests=fake_hasura_server.request_count,
+        hasura_errors=fake_hasura_server.error_count,
+        wall_seconds=wall_seconds,
+        cpu_seconds=cpu_seconds,
+        peak_rss_bytes=get_peak_rss_bytes(),
+    )
+
+
+def print_result(result: BenchUpdateJobResult) -> None:
+    cycle_seconds = result.cycle_seconds
+    total_requests = result.niconico_requests + result.hasura_requests
+
+    # 初回のサイクルはアイコンの取得や全番組の書き込みを含むため、以降と分けて表示する
+    first_cycle_seconds = cycle_seconds[0] if cycle_seconds else 0.0
+    steady_cycle_seconds = (
+        sum(cycle_seconds[1:]) / (len(cycle_seconds) - 1)
+        if len(cycle_seconds) > 1
+        else 0.0
+    )
+
+    print(
+        f"{result.user_count:>6} users | "
+        f"first cycle {first_cycle_seconds:8.3f} s | "
+        f"steady cycle {steady_cycle_seconds:8.3f} s | "
+        f"{total_requests / result.wall_seconds:9.1f} req/s | "
+        f"peak RSS {result.peak_rss_bytes / 1024 / 1024:7.1f} MiB | "
+        f"CPU {result.cpu_seconds:8.3f} s | "
+        f"failed cycles {result.failed_cycles}"
+    )
+    print(
+        f"{'':>6}       | "
+        f"niconico {result.niconico_requests} requests "
+        f"({result.niconico_errors} errors), "
+        f"hasura {result.hasura_requests} requests "
+        f"({result.hasura_errors} errors)"
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--user_counts",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--programs_per_user",
+        type=int,
+        default=25,
+    )
+    parser.add_argument(
+        "--niconico_latency",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument(
+        "--niconico_error_rate",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--hasura_latency",
+        type=float,
+        default=0.01,
+    )
+    parser.add_argument(
+        "--hasura_error_rate",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--update_concurrency",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--program_upsert_chunk_size",
+        type=int,
+        default=500,
+    )
+    parser.add_argument(
+        "--program_history_page_size",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--program_history_max_pages",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        "--niconico_json_backend",
+        type=str,
+        choices=["pydantic", "orjson"],
+        default="pydantic",
+    )
+    parser.add_argument(
+        "--log_level",
+        type=str,
+        default="WARNING",
+    )
+    args = parser.parse_args()
+
+    user_counts: list[int] = args.user_counts
+
+    print(
+        f"cycles={args.cycles}, "
+        f"niconico latency={args.niconico_latency} s "
+        f"error rate={args.niconico_error_rate}, "
+        f"hasura latency={args.hasura_latency} s "
+        f"error rate={args.hasura_error_rate}, "
+        f"update_concurrency={args.update_concurrency}"
+    )
+
+    for user_count in user_counts:
+        scenario = BenchUpdateJobScenario(
+            fake_server_config=FakeServerConfig(
+                user_count=user_count,
+                programs_per_user=args.programs_per_user,
+                niconico_latency=args.niconico_latency,
+                niconico_error_rate=args.niconico_error_rate,
+                hasura_latency=args.hasura_latency,
+                hasura_error_rate=args.hasura_error_rate,
+                seed=args.seed,
+            ),
+            cycles=args.cycles,
+            update_concurrency=args.update_concurrency,
+            program_upsert_chunk_size=args.program_upsert_chunk_size,
+            program_history_page_size=args.program_history_page_size,
+            program_history_max_pages=args.program_history_max_pages,
+            niconico_json_backend=args.niconico_json_backend,
+            log_level=args.log_level,
+        )
+
+        # ピークRSSがシナリオをまたいで残らないよう、シナリオごとに新しいプロセスで実行する
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            result = executor.submit(run_scenario, scenario).result()
+
+        print_result(result)
+
+
+if __name__ == "__main__":
+    main()
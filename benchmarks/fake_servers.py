@@ -0,0 +1,419 @@
+"""
+ベンチマーク用に、ニコニコとHasura GraphQLの応答をプロセス内で返す偽のサーバ
+
+httpx.MockTransportのハンドラとして使う。
+遅延とエラー率を指定でき、受けたリクエストの件数を数える
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+from pydantic import BaseModel
+
+GRAPHQL_OPERATION_NAME_PATTERN = re.compile(
+    r"(?:query|mutation|subscription)\s+([A-Za-z_][A-Za-z0-9_]*)"
+)
+
+# 引数を持たないフィールド名だけが並ぶ、最も内側の選択セット
+GRAPHQL_SELECTION_SET_PATTERN = re.compile(
+    r"\{\s*((?:[A-Za-z_][A-Za-z0-9_]*\s+)*[A-Za-z_][A-Za-z0-9_]*)\s*\}"
+)
+
+NICONICO_LIVE_HOST = "live.nicovideo.jp"
+NICONICO_USER_ICON_HOST = "secure-dcdn.cdn.nimg.jp"
+
+# 番組の開始時刻の基準。ユーザごと・番組ごとにずらして使う
+PROGRAM_BASE_TIME = 1700000000
+
+
+class FakeServerConfig(BaseModel):
+    user_count: int
+    programs_per_user: int = 25
+    niconico_latency: float = 0.05
+    niconico_error_rate: float = 0.0
+    hasura_latency: float = 0.01
+    hasura_error_rate: float = 0.0
+    seed: int = 0
+
+
+def create_remote_niconico_user_id(index: int) -> str:
+    return str(10000000 + index)
+
+
+def create_niconico_user_icon_url(remote_niconico_user_id: str) -> str:
+    return (
+        f"https://{NICONICO_USER_ICON_HOST}/nicoaccount/usericon/"
+        f"{remote_niconico_user_id[:4]}/{remote_niconico_user_id}.jpg"
+    )
+
+
+def select_graphql_fields(
+    query: str,
+    rows: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """
+    本物のHasuraと同じく、クエリが選択した列だけを返す。
+    クエリとレスポンスのモデルの食い違いを、ベンチマークでも検出できるようにする
+    """
+
+    match = GRAPHQL_SELECTION_SET_PATTERN.search(query)
+    if match is None:
+        raise ValueError("Selection set not found in the query.")
+
+    field_names = match.group(1).split()
+    return [{field_name: row[field_name] for field_name in field_names} for row in rows]
+
+
+def _create_schedule_time(seconds: int) -> dict[str, int]:
+    return {"seconds": seconds, "nanos": 0}
+
+
+def create_program_item(
+    remote_niconico_user_id: str,
+    index: int,
+) -> dict[str, Any]:
+    """
+    番組一覧APIの1件分。index=0が最新の番組で、最新の番組だけ放送中にする
+    """
+
+    begin_time = PROGRAM_BASE_TIME - index * 86400 + int(remote_niconico_user_id) % 3600
+    status = "ON_AIR" if index == 0 else "ENDED"
+    content_id = f"lv{remote_niconico_user_id}{index:04d}"
+
+    return {
+        "id": {"value": content_id},
+        "program": {
+            "title": f"配信 #{index}",
+            "description": "<p>ベンチマーク用の番組です。</p>" * 8,
+            "schedule": {
+                "status": status,
+                "openTime": _create_schedule_time(begin_time - 60),
+                "beginTime": _create_schedule_time(begin_time),
+                "scheduledEndTime": _create_schedule_time(begin_time + 7200),
+                "endTime": (
+                    _create_schedule_time(begin_time + 7200)
+                    if status == "ENDED"
+                    else None
+                ),
+                "vposBaseTime": _create_schedule_time(begin_time - 60),
+            },
+        },
+        "programProvider": {
+            "type": "USER",
+            "name": f"user {remote_niconico_user_id}",
+            "programProviderId": {"value": remote_niconico_user_id},
+            "icons": {
+                "uri150x150": create_niconico_user_icon_url(remote_niconico_user_id),
+            },
+        },
+        "socialGroup": {
+            "type": "COMMUNITY",
+            "socialGroupId": "co1",
+            "name": "community",
+            "description": "<p>community</p>",
+            "thumbnail": "https://example.com/co1.jpg",
+        },
+        "thumbnail": {"screenshot": None},
+    }
+
+
+class _FakeServerBase:
+    def __init__(
+        self,
+        latency: float,
+        error_rate: float,
+        seed: int,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+
+        self.request_count = 0
+        self.error_count = 0
+
+        self._lock = threading.Lock()
+        self.__random = random.Random(seed)
+
+    def _count_request(self) -> bool:
+        """
+        リクエストを数え、エラーを返すべきならTrueを返す
+        """
+
+        with self._lock:
+            self.request_count += 1
+            failed = self.__random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+
+        return failed
+
+
+class FakeNiconicoServer(_FakeServerBase):
+    """
+    番組一覧APIとユーザアイコンを返す。非同期クライアント用
+    """
+
+    def __init__(
+        self,
+        config: FakeServerConfig,
+    ):
+        super().__init__(
+            latency=config.niconico_latency,
+            error_rate=config.niconico_error_rate,
+            seed=config.seed,
+        )
+
+        self.programs_per_user = config.programs_per_user
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        failed = self._count_request()
+
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        if failed:
+            return httpx.Response(503)
+
+        if request.url.host == NICONICO_LIVE_HOST:
+            return self.__handle_user_broadcast_history(request=request)
+
+        if request.url.host == NICONICO_USER_ICON_HOST:
+            return self.__handle_user_icon(request=request)
+
+        return httpx.Response(404)
+
+    def __handle_user_broadcast_history(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        remote_niconico_user_id = request.url.params["providerId"]
+        offset = int(request.url.params["offset"])
+        limit = int(request.url.params["limit"])
+
+        total_count = self.programs_per_user
+        program_items = [
+            create_program_item(remote_niconico_user_id, index)
+            for index in range(offset, min(total_count, offset + limit))
+        ]
+
+        return httpx.Response(
+            200,
+            json={
+                "meta": {"status": 200},
+                "data": {
+                    "programsList": program_items,
+                    "totalCount": total_count,
+                    "hasNext": offset + limit < total_count,
+                },
+            },
+        )
+
+    def __handle_user_icon(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        content = b"\xff\xd8\xff\xe0" + request.url.path.encode("utf-8") * 64
+        etag = '"' + hashlib.md5(content).hexdigest() + '"'
+
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "image/jpeg", "ETag": etag},
+            content=content,
+        )
+
+
+class FakeHasuraServer(_FakeServerBase):
+    """
+    updateサブコマンドが使うGraphQLの操作だけを、メモリ上の状態で処理する。同期クライアント用
+    """
+
+    def __init__(
+        self,
+        config: FakeServerConfig,
+    ):
+        super().__init__(
+            latency=config.hasura_latency,
+            error_rate=config.hasura_error_rate,
+            seed=config.seed + 1,
+        )
+
+        updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()
+        self.niconico_users: list[dict[str, Any]] = []
+        for index in range(config.user_count):
+            remote_niconico_user_id = create_remote_niconico_user_id(index)
+            self.niconico_users.append(
+                {
+                    "id": str(index),
+                    "remote_niconico_user_id": remote_niconico_user_id,
+                    "name": f"user {remote_niconico_user_id}",
+                    "enabled": True,
+                    "icon_url": create_niconico_user_icon_url(remote_niconico_user_id),
+                    "updated_at": updated_at,
+                }
+            )
+
+        self.niconico_user_icon_caches: dict[str, dict[str, Any]] = {}
+        self.niconico_live_programs: dict[str, dict[str, Any]] = {}
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        failed = self._count_request()
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if failed:
+            return httpx.Response(500)
+
+        payload = json.loads(request.content)
+        match = GRAPHQL_OPERATION_NAME_PATTERN.search(payload["query"])
+        if match is None:
+            return httpx.Response(400)
+
+        operation_name = match.group(1)
+        variables: dict[str, Any] = payload.get("variables") or {}
+
+        with self._lock:
+            data = self.__handle_operation(
+                query=payload["query"],
+                operation_name=operation_name,
+                variables=variables,
+            )
+
+        if data is None:
+            return httpx.Response(
+                200,
+                json={"errors": [{"message": f"Unknown operation: {operation_name}"}]},
+            )
+
+        return httpx.Response(200, json={"data": data})
+
+    def __handle_operation(
+        self,
+        query: str,
+        operation_name: str,
+        variables: dict[str, Any],
+    ) -> dict[str, Any] | None:
+        if operation_name in ("GetNiconicoUsers", "GetNiconicoUsersUpdatedSince"):
+            niconico_users = self.niconico_users
+
+            updated_after = (
+                (variables.get("where") or {}).get("updated_at", {}).get("_gte")
+            )
+            if updated_after is not None:
+                niconico_users = [
+                    niconico_user
+                    for niconico_user in niconico_users
+                    if niconico_user["updated_at"] >= updated_after
+                ]
+
+            return {
+                "niconico_users": select_graphql_fields(
+                    query=query,
+                    rows=niconico_users,
+                ),
+            }
+
+        if operation_name == "GetNiconicoUserIconCacheByUrls":
+            return {
+                "niconico_user_icon_caches": select_graphql_fields(
+                    query=query,
+                    rows=[
+                        self.niconico_user_icon_caches[url]
+                        for url in variables["urls"]
+                        if url in self.niconico_user_icon_caches
+                    ],
+                ),
+            }
+
+        if operation_name == "InsertNiconicoUserIconCaches":
+            for icon_cache in variables["objects"]:
+                self.__save_icon_cache(icon_cache=icon_cache)
+
+            return {
+                "insert_niconico_user_icon_caches": {
+                    "affected_rows": len(variables["objects"]),
+                },
+            }
+
+        if operation_name == "InsertNiconicoUserIconCache":
+            icon_cache = self.__save_icon_cache(icon_cache=variables)
+            return {"insert_niconico_user_icon_caches_one": {"id": icon_cache["id"]}}
+
+        if operation_name == "GetNiconicoUserIconCacheRevalidationCandidates":
+            validated_before = variables["validated_before"]
+            candidates = [
+                icon_cache
+                for icon_cache in self.niconico_user_icon_caches.values()
+                if icon_cache["gone_at"] is None
+                and (icon_cache["revalidated_at"] or icon_cache["fetched_at"])
+                < validated_before
+            ]
+            return {
+                "niconico_user_icon_caches": select_graphql_fields(
+                    query=query,
+                    rows=candidates[: variables["limit"]],
+                ),
+            }
+
+        if operation_name == "UpdateNiconicoUserIconCaches":
+            for url in variables["urls"]:
+                icon_cache = self.niconico_user_icon_caches[url]
+                icon_cache["revalidated_at"] = variables["revalidated_at"]
+                icon_cache["gone_at"] = variables["gone_at"]
+
+            return {
+                "update_niconico_user_icon_caches": {
+                    "affected_rows": len(variables["urls"]),
+                },
+            }
+
+        if operation_name == "UpsertNiconicoLivePrograms":
+            upsert_objects = variables["niconico_live_program_upsert_objects"]
+            for upsert_object in upsert_objects:
+                content_id = upsert_object["remote_niconico_content_id"]
+                self.niconico_live_programs[content_id] = upsert_object
+
+            return {
+                "insert_niconico_live_programs": {
+                    "affected_rows": len(upsert_objects),
+                },
+            }
+
+        return None
+
+    def __save_icon_cache(
+        self,
+        icon_cache: dict[str, Any],
+    ) -> dict[str, Any]:
+        url = icon_cache["url"]
+
+        saved_icon_cache = {
+            "id": str(len(self.niconico_user_icon_caches)),
+            "etag": None,
+            "last_modified": None,
+            "revalidated_at": None,
+            "gone_at": None,
+            **icon_cache,
+        }
+        existing_icon_cache = self.niconico_user_icon_caches.get(url)
+        if existing_icon_cache is not None:
+            saved_icon_cache["id"] = existing_icon_cache["id"]
+
+        self.niconico_user_icon_caches[url] = saved_icon_cache
+        return saved_icon_cache
@@ -4,7 +4,11 @@ from pathlib import Path
 from pydantic import BaseModel
 
 from . import __version__ as APP_VERSION
+from .cassette_mode import CassetteMode, validate_cassette_mode_string
+from .json_backend import JsonBackend, validate_json_backend_string
 from .storage_type import StorageType, validate_storage_type_string
+from .update_mode import UpdateMode, validate_update_mode_string
+from .user_sync_mode import UserSyncMode, validate_user_sync_mode_string
 
 
 class AppConfig(BaseModel):
@@ -20,9 +24,66 @@ class AppConfig(BaseModel):
     storage_s3_region_name: str | None
     storage_s3_access_key_id: str | None
     storage_s3_secret_access_key: str | None
+    storage_s3_max_pool_connections: int
+    storage_s3_multipart_threshold: int
+    storage_s3_max_concurrency: int
+    storage_s3_listing_cache_ttl: float
 
     useragent: str
+    update_mode: UpdateMode
+    user_sync_mode: UserSyncMode
+    user_full_resync_interval: int
+    user_subscription: bool
+    shard_index: int
+    shard_count: int
     update_interval: int | None
+    update_concurrency: int
+    program_upsert_chunk_size: int
+    program_history_page_size: int
+    program_history_max_pages: int
+    niconico_json_backend: JsonBackend
+    program_upsert_max_payload_bytes: int
+    program_heartbeat_interval: int
+    adaptive_poll_min_interval: int
+    adaptive_poll_max_interval: int
+
+    niconico_live_requests_per_second: float
+    niconico_live_burst: int
+    niconico_account_requests_per_second: float
+    niconico_account_burst: int
+    niconico_user_icon_requests_per_second: float
+    niconico_user_icon_burst: int
+
+    icon_download_concurrency: int
+    icon_store_concurrency: int
+    icon_metadata_concurrency: int
+    icon_metadata_batch_size: int
+    icon_max_in_flight_bytes: int
+    icon_content_addressed: bool
+    icon_revalidation_batch_size: int
+    icon_revalidation_interval: int
+    icon_metadata_lookup_chunk_size: int
+    icon_metadata_lookup_concurrency: int
+    icon_metadata_cache_path: Path | None
+    icon_metadata_cache_reconcile_interval: float
+
+    backfill_concurrency: int
+    backfill_page_size: int
+    backfill_checkpoint_path: Path | None
+
+    http_max_connections: int
+    http_max_keepalive_connections: int
+    http_keepalive_expiry: float
+    http2: bool
+
+    metrics_host: str
+    metrics_port: int | None
+
+    trace_path: Path | None
+
+    cassette_mode: CassetteMode | None
+    cassette_path: Path | None
+    cassette_time_scale: float
 
 
 def load_app_config_from_env() -> AppConfig:
@@ -49,16 +110,171 @@ def load_app_config_from_env() -> AppConfig:
     storage_s3_secret_access_key = (
         os.environ.get("APP_STORAGE_S3_SECRET_ACCESS_KEY") or None
     )
+    storage_s3_max_pool_connections = int(
+        os.environ.get("APP_STORAGE_S3_MAX_POOL_CONNECTIONS") or "10"
+    )
+    storage_s3_multipart_threshold = int(
+        os.environ.get("APP_STORAGE_S3_MULTIPART_THRESHOLD") or "8388608"
+    )
+    storage_s3_max_concurrency = int(
+        os.environ.get("APP_STORAGE_S3_MAX_CONCURRENCY") or "10"
+    )
+    storage_s3_listing_cache_ttl = float(
+        os.environ.get("APP_STORAGE_S3_LISTING_CACHE_TTL") or "300"
+    )
 
     useragent = os.environ.get("APP_USERAGENT") or None
     if useragent is None:
         useragent = f"LiveInboxBot/{APP_VERSION}"
 
+    update_mode_string = os.environ.get("APP_UPDATE_MODE") or "interval"
+    if not validate_update_mode_string(update_mode_string):
+        raise ValueError("Invalid update mode string. Use 'interval' or 'adaptive'.")
+    update_mode: UpdateMode = update_mode_string
+
+    user_sync_mode_string = os.environ.get("APP_USER_SYNC_MODE") or "full"
+    if not validate_user_sync_mode_string(user_sync_mode_string):
+        raise ValueError("Invalid user sync mode string. Use 'full' or 'incremental'.")
+    user_sync_mode: UserSyncMode = user_sync_mode_string
+    user_full_resync_interval = int(
+        os.environ.get("APP_USER_FULL_RESYNC_INTERVAL") or "3600"
+    )
+    user_subscription = (
+        os.environ.get("APP_USER_SUBSCRIPTION") or "false"
+    ).lower() == "true"
+    shard_index = int(os.environ.get("APP_SHARD_INDEX") or "0")
+    shard_count = int(os.environ.get("APP_SHARD_COUNT") or "1")
+
     update_interval_string = os.environ.get("APP_UPDATE_INTERVAL") or None
     update_interval: int | None = None
     if update_interval_string is not None:
         update_interval = int(update_interval_string)
 
+    update_concurrency = int(os.environ.get("APP_UPDATE_CONCURRENCY") or "4")
+    program_upsert_chunk_size = int(
+        os.environ.get("APP_PROGRAM_UPSERT_CHUNK_SIZE") or "500"
+    )
+    program_history_page_size = int(
+        os.environ.get("APP_PROGRAM_HISTORY_PAGE_SIZE") or "10"
+    )
+    program_history_max_pages = int(
+        os.environ.get("APP_PROGRAM_HISTORY_MAX_PAGES") or "5"
+    )
+    niconico_json_backend_string = (
+        os.environ.get("APP_NICONICO_JSON_BACKEND") or "pydantic"
+    )
+    if not validate_json_backend_string(niconico_json_backend_string):
+        raise ValueError("Invalid json backend string. Use 'pydantic' or 'orjson'.")
+    niconico_json_backend: JsonBackend = niconico_json_backend_string
+    program_upsert_max_payload_bytes = int(
+        os.environ.get("APP_PROGRAM_UPSERT_MAX_PAYLOAD_BYTES") or "1000000"
+    )
+    program_heartbeat_interval = int(
+        os.environ.get("APP_PROGRAM_HEARTBEAT_INTERVAL") or "3600"
+    )
+    adaptive_poll_min_interval = int(
+        os.environ.get("APP_ADAPTIVE_POLL_MIN_INTERVAL") or "60"
+    )
+    adaptive_poll_max_interval = int(
+        os.environ.get("APP_ADAPTIVE_POLL_MAX_INTERVAL") or "21600"
+    )
+
+    niconico_live_requests_per_second = float(
+        os.environ.get("APP_NICONICO_LIVE_REQUESTS_PER_SECOND") or "1"
+    )
+    niconico_live_burst = int(os.environ.get("APP_NICONICO_LIVE_BURST") or "1")
+    niconico_account_requests_per_second = float(
+        os.environ.get("APP_NICONICO_ACCOUNT_REQUESTS_PER_SECOND") or "1"
+    )
+    niconico_account_burst = int(os.environ.get("APP_NICONICO_ACCOUNT_BURST") or "1")
+    niconico_user_icon_requests_per_second = float(
+        os.environ.get("APP_NICONICO_USER_ICON_REQUESTS_PER_SECOND") or "1"
+    )
+    niconico_user_icon_burst = int(
+        os.environ.get("APP_NICONICO_USER_ICON_BURST") or "1"
+    )
+
+    icon_download_concurrency = int(
+        os.environ.get("APP_ICON_DOWNLOAD_CONCURRENCY") or "4"
+    )
+    icon_store_concurrency = int(os.environ.get("APP_ICON_STORE_CONCURRENCY") or "4")
+    icon_metadata_concurrency = int(
+        os.environ.get("APP_ICON_METADATA_CONCURRENCY") or "1"
+    )
+    icon_metadata_batch_size = int(
+        os.environ.get("APP_ICON_METADATA_BATCH_SIZE") or "100"
+    )
+    icon_max_in_flight_bytes = int(
+        os.environ.get("APP_ICON_MAX_IN_FLIGHT_BYTES") or "33554432"
+    )
+
+    icon_content_addressed = (
+        os.environ.get("APP_ICON_CONTENT_ADDRESSED") or "true"
+    ).lower() == "true"
+
+    icon_revalidation_batch_size = int(
+        os.environ.get("APP_ICON_REVALIDATION_BATCH_SIZE") or "100"
+    )
+    icon_revalidation_interval = int(
+        os.environ.get("APP_ICON_REVALIDATION_INTERVAL") or "604800"
+    )
+
+    icon_metadata_lookup_chunk_size = int(
+        os.environ.get("APP_ICON_METADATA_LOOKUP_CHUNK_SIZE") or "1000"
+    )
+    icon_metadata_lookup_concurrency = int(
+        os.environ.get("APP_ICON_METADATA_LOOKUP_CONCURRENCY") or "4"
+    )
+
+    icon_metadata_cache_path: Path | None = None
+    icon_metadata_cache_path_string = (
+        os.environ.get("APP_ICON_METADATA_CACHE_PATH") or None
+    )
+    if icon_metadata_cache_path_string is not None:
+        icon_metadata_cache_path = Path(icon_metadata_cache_path_string)
+    icon_metadata_cache_reconcile_interval = float(
+        os.environ.get("APP_ICON_METADATA_CACHE_RECONCILE_INTERVAL") or "86400"
+    )
+
+    backfill_concurrency = int(os.environ.get("APP_BACKFILL_CONCURRENCY") or "4")
+    backfill_page_size = int(os.environ.get("APP_BACKFILL_PAGE_SIZE") or "100")
+    backfill_checkpoint_path: Path | None = None
+    backfill_checkpoint_path_string = (
+        os.environ.get("APP_BACKFILL_CHECKPOINT_PATH") or None
+    )
+    if backfill_checkpoint_path_string is not None:
+        backfill_checkpoint_path = Path(backfill_checkpoint_path_string)
+
+    http_max_connections = int(os.environ.get("APP_HTTP_MAX_CONNECTIONS") or "100")
+    http_max_keepalive_connections = int(
+        os.environ.get("APP_HTTP_MAX_KEEPALIVE_CONNECTIONS") or "20"
+    )
+    http_keepalive_expiry = float(os.environ.get("APP_HTTP_KEEPALIVE_EXPIRY") or "30")
+    http2 = (os.environ.get("APP_HTTP2") or "false").lower() == "true"
+
+    metrics_host = os.environ.get("APP_METRICS_HOST") or "0.0.0.0"
+    metrics_port_string = os.environ.get("APP_METRICS_PORT") or None
+    metrics_port: int | None = None
+    if metrics_port_string is not None:
+        metrics_port = int(metrics_port_string)
+
+    trace_path: Path | None = None
+    trace_path_string = os.environ.get("APP_TRACE_PATH") or None
+    if trace_path_string is not None:
+        trace_path = Path(trace_path_string)
+
+    cassette_mode_string = os.environ.get("APP_CASSETTE_MODE") or None
+    cassette_mode: CassetteMode | None = None
+    if cassette_mode_string is not None:
+        if not validate_cassette_mode_string(cassette_mode_string):
+            raise ValueError("Invalid cassette mode string. Use 'record' or 'replay'.")
+        cassette_mode = cassette_mode_string
+    cassette_path: Path | None = None
+    cassette_path_string = os.environ.get("APP_CASSETTE_PATH") or None
+    if cassette_path_string is not None:
+        cassette_path = Path(cassette_path_string)
+    cassette_time_scale = float(os.environ.get("APP_CASSETTE_TIME_SCALE") or "1")
+
     return AppConfig(
         live_inbox_hasura_url=live_inbox_hasura_url,
         live_inbox_hasura_token=live_inbox_hasura_token,
@@ -69,6 +285,56 @@ def load_app_config_from_env() -> AppConfig:
         storage_s3_region_name=storage_s3_region_name,
         storage_s3_access_key_id=storage_s3_access_key_id,
         storage_s3_secret_access_key=storage_s3_secret_access_key,
+        storage_s3_max_pool_connections=storage_s3_max_pool_connections,
+        storage_s3_multipart_threshold=storage_s3_multipart_threshold,
+        storage_s3_max_concurrency=storage_s3_max_concurrency,
+        storage_s3_listing_cache_ttl=storage_s3_listing_cache_ttl,
         useragent=useragent,
+        update_mode=update_mode,
+        user_sync_mode=user_sync_mode,
+        user_full_resync_interval=user_full_resync_interval,
+        user_subscription=user_subscription,
+        shard_index=shard_index,
+        shard_count=shard_count,
         update_interval=update_interval,
+        update_concurrency=update_concurrency,
+        program_upsert_chunk_size=program_upsert_chunk_size,
+        program_history_page_size=program_history_page_size,
+        program_history_max_pages=program_history_max_pages,
+        niconico_json_backend=niconico_json_backend,
+        program_upsert_max_payload_bytes=program_upsert_max_payload_bytes,
+        program_heartbeat_interval=program_heartbeat_interval,
+        adaptive_poll_min_interval=adaptive_poll_min_interval,
+        adaptive_poll_max_interval=adaptive_poll_max_interval,
+        niconico_live_requests_per_second=niconico_live_requests_per_second,
+        niconico_live_burst=niconico_live_burst,
+        niconico_account_requests_per_second=niconico_account_requests_per_second,
+        niconico_account_burst=niconico_account_burst,
+        niconico_user_icon_requests_per_second=niconico_user_icon_requests_per_second,
+        niconico_user_icon_burst=niconico_user_icon_burst,
+        icon_download_concurrency=icon_download_concurrency,
+        icon_store_concurrency=icon_store_concurrency,
+        icon_metadata_concurrency=icon_metadata_concurrency,
+        icon_metadata_batch_size=icon_metadata_batch_size,
+        icon_max_in_flight_bytes=icon_max_in_flight_bytes,
+        icon_content_addressed=icon_content_addressed,
+        icon_revalidation_batch_size=icon_revalidation_batch_size,
+        icon_revalidation_interval=icon_revalidation_interval,
+        icon_metadata_lookup_chunk_size=icon_metadata_lookup_chunk_size,
+        icon_metadata_lookup_concurrency=icon_metadata_lookup_concurrency,
+        icon_metadata_cache_path=icon_metadata_cache_path,
+        icon_metadata_cache_reconcile_interval=icon_metadata_cache_reconcile_interval,
+        backfill_concurrency=backfill_concurrency,
+        backfill_page_size=backfill_page_size,
+        backfill_checkpoint_path=backfill_checkpoint_path,
+        http_max_connections=http_max_connections,
+        http_max_keepalive_connections=http_max_keepalive_connections,
+        http_keepalive_expiry=http_keepalive_expiry,
+        http2=http2,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
+        trace_path=trace_path,
+        cassette_mode=cassette_mode,
+        cassette_path=cassette_path,
+        cassette_time_scale=cassette_time_scale,
     )
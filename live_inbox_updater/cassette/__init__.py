@@ -0,0 +1,21 @@
+from .entry import CassetteEntry, decode_cassette_content, encode_cassette_content
+from .http_transport import (
+    RecordingAsyncHttpTransport,
+    RecordingHttpTransport,
+    ReplayAsyncHttpTransport,
+    ReplayHttpTransport,
+)
+from .player import CassettePlayer
+from .recorder import CassetteRecorder
+
+__all__ = [
+    "CassetteEntry",
+    "decode_cassette_content",
+    "encode_cassette_content",
+    "RecordingAsyncHttpTransport",
+    "RecordingHttpTransport",
+    "ReplayAsyncHttpTransport",
+    "ReplayHttpTransport",
+    "CassettePlayer",
+    "CassetteRecorder",
+]
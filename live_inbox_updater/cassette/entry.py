@@ -0,0 +1,33 @@
+import base64
+import zlib
+
+from pydantic import BaseModel
+
+
+class CassetteEntry(BaseModel):
+    """
+    1件のリクエストとレスポンス
+
+    ボディはzlibで圧縮してBase64にした文字列で持つ。
+    通信に失敗した場合はstatus_codeをNoneとし、errorに内容を残す
+    """
+
+    service: str
+    target: str
+    method: str
+    url: str
+    request_content: str
+    started_at: float
+    duration_seconds: float
+    status_code: int | None
+    headers: list[tuple[str, str]]
+    content: str
+    error: str | None = None
+
+
+def encode_cassette_content(content: bytes) -> str:
+    return base64.b64encode(zlib.compress(content)).decode("ascii")
+
+
+def decode_cassette_content(string: str) -> bytes:
+    return zlib.decompress(base64.b64decode(string))
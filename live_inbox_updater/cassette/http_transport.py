@@ -0,0 +1,277 @@
+import asyncio
+import time
+from typing import Callable
+
+import httpx
+
+from .entry import CassetteEntry, decode_cassette_content, encode_cassette_content
+from .player import CassettePlayer
+from .recorder import CassetteRecorder
+
+
+def _record_entry(
+    recorder: CassetteRecorder,
+    service: str,
+    target: str,
+    request: httpx.Request,
+    started_at: float,
+    response: httpx.Response | None,
+    content: bytes,
+    error: Exception | None,
+) -> None:
+    recorder.record(
+        entry=CassetteEntry(
+            service=service,
+            target=target,
+            method=request.method,
+            url=str(request.url),
+            request_content=encode_cassette_content(request.content),
+            started_at=started_at - recorder.started_at,
+            duration_seconds=time.monotonic() - started_at,
+            status_code=response.status_code if response is not None else None,
+            headers=(
+                list(response.headers.multi_items()) if response is not None else []
+            ),
+            content=encode_cassette_content(content),
+            error=f"{type(error).__name__}: {error}" if error is not None else None,
+        ),
+    )
+
+
+def _create_replay_response(
+    entry: CassetteEntry,
+    request: httpx.Request,
+) -> httpx.Response:
+    if entry.status_code is None:
+        raise httpx.TransportError(
+            f"Recorded error: {entry.error}",
+            request=request,
+        )
+
+    return httpx.Response(
+        status_code=entry.status_code,
+        headers=entry.headers,
+        stream=httpx.ByteStream(decode_cassette_content(entry.content)),
+    )
+
+
+class RecordingHttpTransport(httpx.BaseTransport):
+    """
+    リクエストとレスポンスをrecorderに記録するトランスポート
+
+    記録のためレスポンスボディを読み切ってから返す。
+    ボディはContent-Encodingを解く前のまま記録する
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        recorder: CassetteRecorder,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.recorder = recorder
+        self.service = service
+        self.get_target = get_target
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        target = self.get_target(request)
+
+        request.read()
+        started_at = time.monotonic()
+
+        try:
+            response = self.transport.handle_request(request)
+
+            stream = response.stream
+            if not isinstance(stream, httpx.SyncByteStream):
+                raise Exception("Unexpected state.")
+
+            try:
+                content = b"".join(stream)
+            finally:
+                stream.close()
+        except Exception as error:
+            _record_entry(
+                recorder=self.recorder,
+                service=self.service,
+                target=target,
+                request=request,
+                started_at=started_at,
+                response=None,
+                content=b"",
+                error=error,
+            )
+            raise
+
+        _record_entry(
+            recorder=self.recorder,
+            service=self.service,
+            target=target,
+            request=request,
+            started_at=started_at,
+            response=response,
+            content=content,
+            error=None,
+        )
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(content),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class RecordingAsyncHttpTransport(httpx.AsyncBaseTransport):
+    """
+    RecordingHttpTransportの非同期版
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        recorder: CassetteRecorder,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.recorder = recorder
+        self.service = service
+        self.get_target = get_target
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        target = self.get_target(request)
+
+        await request.aread()
+        started_at = time.monotonic()
+
+        try:
+            response = await self.transport.handle_async_request(request)
+
+            stream = response.stream
+            if not isinstance(stream, httpx.AsyncByteStream):
+                raise Exception("Unexpected state.")
+
+            try:
+                content = b"".join([chunk async for chunk in stream])
+            finally:
+                await stream.aclose()
+        except Exception as error:
+            _record_entry(
+                recorder=self.recorder,
+                service=self.service,
+                target=target,
+                request=request,
+                started_at=started_at,
+                response=None,
+                content=b"",
+                error=error,
+            )
+            raise
+
+        _record_entry(
+            recorder=self.recorder,
+            service=self.service,
+            target=target,
+            request=request,
+            started_at=started_at,
+            response=response,
+            content=content,
+            error=None,
+        )
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(content),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class ReplayHttpTransport(httpx.BaseTransport):
+    """
+    通信せず、playerが持つ記録からレスポンスを返すトランスポート
+
+    記録した所要時間にtime_scaleを掛けた時間だけ待ってから返す。
+    time_scaleが0の場合は待たない
+    """
+
+    def __init__(
+        self,
+        player: CassettePlayer,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+        time_scale: float,
+    ):
+        self.player = player
+        self.service = service
+        self.get_target = get_target
+        self.time_scale = time_scale
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        request.read()
+
+        entry = self.player.pop(
+            service=self.service,
+            target=self.get_target(request),
+            request=request,
+        )
+
+        delay = entry.duration_seconds * self.time_scale
+        if delay > 0:
+            time.sleep(delay)
+
+        return _create_replay_response(entry=entry, request=request)
+
+
+class ReplayAsyncHttpTransport(httpx.AsyncBaseTransport):
+    """
+    ReplayHttpTransportの非同期版
+    """
+
+    def __init__(
+        self,
+        player: CassettePlayer,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+        time_scale: float,
+    ):
+        self.player = player
+        self.service = service
+        self.get_target = get_target
+        self.time_scale = time_scale
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        await request.aread()
+
+        entry = self.player.pop(
+            service=self.service,
+            target=self.get_target(request),
+            request=request,
+        )
+
+        delay = entry.duration_seconds * self.time_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return _create_replay_response(entry=entry, request=request)
@@ -0,0 +1,80 @@
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from .entry import CassetteEntry, decode_cassette_content
+
+_CassetteKey = tuple[str, str, str, str]
+
+
+class CassettePlayer:
+    """
+    pathに記録したレスポンスを、リクエストに対応するものから順に取り出す
+
+    service・target・メソッド・URLが同じ記録のうち、リクエストボディが一致するものを優先し、
+    なければ最も早く記録したものを返す。
+    Hasuraへのリクエストには現在時刻が入るため、ボディの一致は必須にしない
+
+    書き込みのまとめ方は処理の速さで変わり、記録時とリクエスト数が一致しないことがある。
+    記録を使い切った場合は、同じ組み合わせで最後に返したものを繰り返す
+    """
+
+    def __init__(
+        self,
+        path: Path,
+    ):
+        self.path = path
+
+        self.__lock = threading.Lock()
+        self.__entries: dict[_CassetteKey, list[tuple[bytes, CassetteEntry]]] = (
+            defaultdict(list)
+        )
+        self.__last_entries: dict[_CassetteKey, CassetteEntry] = {}
+
+        with path.open("r", encoding="utf-8") as fp:
+            for line in fp:
+                if not line.strip():
+                    continue
+
+                entry = CassetteEntry.model_validate_json(line)
+                key = (entry.service, entry.target, entry.method, entry.url)
+                self.__entries[key].append(
+                    (decode_cassette_content(entry.request_content), entry),
+                )
+
+    def pop(
+        self,
+        service: str,
+        target: str,
+        request: httpx.Request,
+    ) -> CassetteEntry:
+        key = (service, target, request.method, str(request.url))
+        request_content = request.content
+
+        with self.__lock:
+            entries = self.__entries.get(key)
+            if not entries:
+                last_entry = self.__last_entries.get(key)
+                if last_entry is None:
+                    raise Exception(
+                        f"No recorded response for {service} {target}: "
+                        f"{request.method} {request.url}"
+                    )
+
+                return last_entry
+
+            index = next(
+                (
+                    index
+                    for index, (recorded_request_content, _) in enumerate(entries)
+                    if recorded_request_content == request_content
+                ),
+                0,
+            )
+
+            _, entry = entries.pop(index)
+            self.__last_entries[key] = entry
+
+        return entry
@@ -0,0 +1,41 @@
+import threading
+import time
+from pathlib import Path
+
+from .entry import CassetteEntry
+
+
+class CassetteRecorder:
+    """
+    記録したリクエストとレスポンスを1行1件のJSONとしてpathに書き出す
+
+    プロセスが強制終了されても途中までを再生できるよう、1件ごとにファイルへ反映する
+    """
+
+    def __init__(
+        self,
+        path: Path,
+    ):
+        self.path = path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 各リクエストの開始時刻は、記録を始めてからの秒数で持つ
+        self.started_at = time.monotonic()
+
+        self.__lock = threading.Lock()
+        self.__file = path.open("w", encoding="utf-8")
+
+    def record(
+        self,
+        entry: CassetteEntry,
+    ) -> None:
+        line = entry.model_dump_json() + "\n"
+
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__file.close()
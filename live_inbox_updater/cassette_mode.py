@@ -0,0 +1,15 @@
+from typing import Literal, TypeGuard
+
+CassetteMode = Literal["record", "replay"]
+
+
+def validate_cassette_mode_string(
+    string: str,
+) -> TypeGuard[CassetteMode]:
+    if string == "record":
+        return True
+
+    if string == "replay":
+        return True
+
+    return False
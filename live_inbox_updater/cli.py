@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from . import __version__ as APP_VERSION
 from .app_config import load_app_config_from_env
 from .subcommand.subcommand_add_user import add_arguments_subcommand_add_user
+from .subcommand.subcommand_backfill import add_arguments_subcommand_backfill
 from .subcommand.subcommand_disable_user import add_arguments_subcommand_disable_user
 from .subcommand.subcommand_enable_user import add_arguments_subcommand_enable_user
 from .subcommand.subcommand_update import add_arguments_subcommand_update
@@ -56,6 +57,12 @@ def main() -> None:
         app_config=app_config,
     )
 
+    subparser_backfill = subparsers.add_parser("backfill")
+    add_arguments_subcommand_backfill(
+        parser=subparser_backfill,
+        app_config=app_config,
+    )
+
     args = parser.parse_args()
     if hasattr(args, "handler"):
         args.handler(args)
@@ -0,0 +1,158 @@
+from typing import AsyncIterator, Callable, Iterator
+
+import httpx
+from pydantic import BaseModel
+
+
+class HttpClientConfig(BaseModel):
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float
+    http2: bool
+
+
+def create_http_client_limits(
+    config: HttpClientConfig,
+) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+
+
+def create_http_transport(
+    config: HttpClientConfig,
+) -> httpx.HTTPTransport:
+    return httpx.HTTPTransport(
+        limits=create_http_client_limits(config=config),
+        http2=config.http2,
+    )
+
+
+def create_async_http_transport(
+    config: HttpClientConfig,
+) -> httpx.AsyncHTTPTransport:
+    return httpx.AsyncHTTPTransport(
+        limits=create_http_client_limits(config=config),
+        http2=config.http2,
+    )
+
+
+def create_http_client(
+    config: HttpClientConfig,
+    transport: httpx.BaseTransport | None = None,
+) -> httpx.Client:
+    """
+    接続を使い回すための長寿命なHTTPクライアントを作成する
+
+    http2を有効にする場合は h2 パッケージ（http2 extra）が必要。
+    transportを指定する場合は、create_http_transportで作ったものを包んで渡す
+    """
+
+    if transport is not None:
+        return httpx.Client(transport=transport)
+
+    return httpx.Client(
+        limits=create_http_client_limits(config=config),
+        http2=config.http2,
+    )
+
+
+def create_async_http_client(
+    config: HttpClientConfig,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """
+    接続を使い回すための長寿命な非同期HTTPクライアントを作成する
+
+    http2を有効にする場合は h2 パッケージ（http2 extra）が必要。
+    transportを指定する場合は、create_async_http_transportで作ったものを包んで渡す
+    """
+
+    if transport is not None:
+        return httpx.AsyncClient(transport=transport)
+
+    return httpx.AsyncClient(
+        limits=create_http_client_limits(config=config),
+        http2=config.http2,
+    )
+
+
+class _CloseCallbackSyncByteStream(httpx.SyncByteStream):
+    def __init__(
+        self,
+        stream: httpx.SyncByteStream,
+        on_close: Callable[[], None],
+    ):
+        self.stream = stream
+        self.on_close = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self.stream
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self.on_close()
+
+
+class _CloseCallbackAsyncByteStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        on_close: Callable[[], None],
+    ):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            self.on_close()
+
+
+def wrap_response_on_close(
+    response: httpx.Response,
+    on_close: Callable[[], None],
+) -> httpx.Response:
+    """
+    トランスポートが返したレスポンスを、ボディを読み終えて閉じたときにon_closeを呼ぶよう包む
+    """
+
+    stream = response.stream
+    if not isinstance(stream, httpx.SyncByteStream):
+        raise Exception("Unexpected state.")
+
+    return httpx.Response(
+        status_code=response.status_code,
+        headers=response.headers,
+        stream=_CloseCallbackSyncByteStream(stream=stream, on_close=on_close),
+        extensions=response.extensions,
+    )
+
+
+def wrap_async_response_on_close(
+    response: httpx.Response,
+    on_close: Callable[[], None],
+) -> httpx.Response:
+    """
+    wrap_response_on_closeの非同期トランスポート版
+    """
+
+    stream = response.stream
+    if not isinstance(stream, httpx.AsyncByteStream):
+        raise Exception("Unexpected state.")
+
+    return httpx.Response(
+        status_code=response.status_code,
+        headers=response.headers,
+        stream=_CloseCallbackAsyncByteStream(stream=stream, on_close=on_close),
+        extensions=response.extensions,
+    )
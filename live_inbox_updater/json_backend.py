@@ -0,0 +1,15 @@
+from typing import Literal, TypeGuard
+
+JsonBackend = Literal["pydantic", "orjson"]
+
+
+def validate_json_backend_string(
+    string: str,
+) -> TypeGuard[JsonBackend]:
+    if string == "pydantic":
+        return True
+
+    if string == "orjson":
+        return True
+
+    return False
@@ -1,5 +1,6 @@
+import json
 from logging import getLogger
-from typing import Iterable
+from typing import Any, Iterable, Iterator
 from urllib.parse import urljoin
 
 import httpx
@@ -35,18 +36,71 @@ class LiveInboxApiNiconicoLiveProgramHasuraManager(
         hasura_url: str,
         hasura_token: str,
         useragent: str,
+        http_client: httpx.Client,
+        upsert_chunk_size: int = 500,
+        upsert_max_payload_bytes: int = 1_000_000,
     ):
         self.hasura_url = hasura_url
         self.hasura_token = hasura_token
         self.useragent = useragent
+        self.http_client = http_client
+        self.upsert_chunk_size = upsert_chunk_size
+        self.upsert_max_payload_bytes = upsert_max_payload_bytes
+
+    def __iter_upsert_object_chunks(
+        self,
+        upsert_objects: Iterable[LiveInboxApiNiconicoLiveProgramUpsertObject],
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        1回のmutationに含める行数とペイロードサイズが上限を超えないよう分割する
+        """
+
+        upsert_chunk_size = self.upsert_chunk_size
+        upsert_max_payload_bytes = self.upsert_max_payload_bytes
+
+        upsert_object_adapter = TypeAdapter(LiveInboxApiNiconicoLiveProgramUpsertObject)
+
+        chunk: list[dict[str, Any]] = []
+        chunk_bytes = 0
+        for upsert_object in upsert_objects:
+            upsert_object_json = upsert_object_adapter.dump_python(
+                upsert_object,
+                mode="json",
+            )
+            upsert_object_bytes = len(json.dumps(upsert_object_json).encode("utf-8"))
+
+            if len(chunk) > 0 and (
+                len(chunk) >= upsert_chunk_size
+                or chunk_bytes + upsert_object_bytes > upsert_max_payload_bytes
+            ):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+
+            chunk.append(upsert_object_json)
+            chunk_bytes += upsert_object_bytes
+
+        if len(chunk) > 0:
+            yield chunk
 
     def upsert_all(
         self,
         upsert_objects: Iterable[LiveInboxApiNiconicoLiveProgramUpsertObject],
     ) -> None:
+        affected_rows = 0
+        for chunk in self.__iter_upsert_object_chunks(upsert_objects=upsert_objects):
+            affected_rows += self.__upsert_chunk(upsert_object_jsons=chunk)
+
+        logger.info(f"Upserted {affected_rows} niconico live programs")
+
+    def __upsert_chunk(
+        self,
+        upsert_object_jsons: list[dict[str, Any]],
+    ) -> int:
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -74,16 +128,11 @@ mutation UpsertNiconicoLivePrograms(
 }
 """,
             "variables": {
-                "niconico_live_program_upsert_objects": TypeAdapter(
-                    list[LiveInboxApiNiconicoLiveProgramUpsertObject]
-                ).dump_python(
-                    list(upsert_objects),
-                    mode="json",
-                ),
+                "niconico_live_program_upsert_objects": upsert_object_jsons,
             },
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -103,4 +152,9 @@ mutation UpsertNiconicoLivePrograms(
             raise
 
         affected_rows = response_body.data.insert_niconico_live_programs.affected_rows
-        logger.info(f"Upserted {affected_rows} niconico live programs")
+        logger.debug(
+            f"Upserted {affected_rows} niconico live programs "
+            f"in a chunk of {len(upsert_object_jsons)}"
+        )
+
+        return affected_rows
@@ -3,9 +3,11 @@ from .base import (
     LiveInboxApiNiconicoUserIconCacheMetadataManager,
 )
 from .hasura import LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager
+from .sqlite import LiveInboxApiNiconicoUserIconCacheMetadataSqliteCacheManager
 
 __all__ = [
     "LiveInboxApiNiconicoUserIconCacheMetadata",
     "LiveInboxApiNiconicoUserIconCacheMetadataManager",
     "LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager",
+    "LiveInboxApiNiconicoUserIconCacheMetadataSqliteCacheManager",
 ]
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from pydantic import BaseModel
 
@@ -12,6 +12,10 @@ class LiveInboxApiNiconicoUserIconCacheMetadata(BaseModel):
     hash_md5: str
     content_type: str
     file_key: str
+    etag: str | None = None
+    last_modified: str | None = None
+    revalidated_at: datetime | None = None
+    gone_at: datetime | None = None
 
 
 class LiveInboxApiNiconicoUserIconCacheMetadataManager(ABC):
@@ -21,6 +25,16 @@ class LiveInboxApiNiconicoUserIconCacheMetadataManager(ABC):
         urls: Iterable[str],
     ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]: ...
 
+    def iter_by_urls(
+        self,
+        urls: Iterable[str],
+    ) -> Iterator[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        """
+        get_by_urlsの結果を、取得できたものから順に返す
+        """
+
+        yield from self.get_by_urls(urls=urls)
+
     @abstractmethod
     def save(
         self,
@@ -31,3 +45,30 @@ class LiveInboxApiNiconicoUserIconCacheMetadataManager(ABC):
         content_type: str,
         file_key: str,
     ) -> None: ...
+
+    @abstractmethod
+    def save_all(
+        self,
+        metadatas: Iterable[LiveInboxApiNiconicoUserIconCacheMetadata],
+    ) -> None: ...
+
+    @abstractmethod
+    def get_revalidation_candidates(
+        self,
+        validated_before: datetime,
+        limit: int,
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]: ...
+
+    @abstractmethod
+    def touch_revalidated(
+        self,
+        urls: Iterable[str],
+        revalidated_at: datetime,
+    ) -> None: ...
+
+    @abstractmethod
+    def mark_gone(
+        self,
+        urls: Iterable[str],
+        gone_at: datetime,
+    ) -> None: ...
@@ -1,10 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from datetime import datetime
 from logging import getLogger
-from typing import Iterable
+from typing import Any, Iterable, Iterator
 from urllib.parse import urljoin
 
 import httpx
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from .base import (
     LiveInboxApiNiconicoUserIconCacheMetadata,
@@ -61,6 +63,71 @@ class InsertNiconicoUserIconCacheResponseBody(BaseModel):
     data: InsertNiconicoUserIconCacheResponseData
 
 
+class InsertNiconicoUserIconCachesResponseInsertNiconicoUserIconCaches(BaseModel):
+    affected_rows: int
+
+
+class InsertNiconicoUserIconCachesResponseData(BaseModel):
+    insert_niconico_user_icon_caches: (
+        InsertNiconicoUserIconCachesResponseInsertNiconicoUserIconCaches
+    )
+
+
+class InsertNiconicoUserIconCachesResponseBody(BaseModel):
+    data: InsertNiconicoUserIconCachesResponseData
+
+
+class GetNiconicoUserIconCacheRevalidationCandidatesRequestVariables(BaseModel):
+    validated_before: datetime
+    limit: int
+
+
+class GetNiconicoUserIconCacheRevalidationCandidatesResponseNiconicoUserIconCache(
+    BaseModel
+):
+    id: str
+    url: str
+    fetched_at: datetime
+    file_size: int
+    hash_md5: str
+    content_type: str
+    file_key: str
+    etag: str | None
+    last_modified: str | None
+    revalidated_at: datetime | None
+    gone_at: datetime | None
+
+
+class GetNiconicoUserIconCacheRevalidationCandidatesResponseData(BaseModel):
+    niconico_user_icon_caches: list[
+        GetNiconicoUserIconCacheRevalidationCandidatesResponseNiconicoUserIconCache
+    ]
+
+
+class GetNiconicoUserIconCacheRevalidationCandidatesResponseBody(BaseModel):
+    data: GetNiconicoUserIconCacheRevalidationCandidatesResponseData
+
+
+class UpdateNiconicoUserIconCachesRequestVariables(BaseModel):
+    urls: list[str]
+    revalidated_at: datetime
+    gone_at: datetime | None
+
+
+class UpdateNiconicoUserIconCachesResponseUpdateNiconicoUserIconCaches(BaseModel):
+    affected_rows: int
+
+
+class UpdateNiconicoUserIconCachesResponseData(BaseModel):
+    update_niconico_user_icon_caches: (
+        UpdateNiconicoUserIconCachesResponseUpdateNiconicoUserIconCaches
+    )
+
+
+class UpdateNiconicoUserIconCachesResponseBody(BaseModel):
+    data: UpdateNiconicoUserIconCachesResponseData
+
+
 class LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
     LiveInboxApiNiconicoUserIconCacheMetadataManager
 ):
@@ -69,18 +136,82 @@ class LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
         hasura_url: str,
         hasura_token: str,
         useragent: str,
+        http_client: httpx.Client,
+        save_chunk_size: int = 500,
+        get_by_urls_chunk_size: int = 1000,
+        get_by_urls_concurrency: int = 4,
     ):
         self.hasura_url = hasura_url
         self.hasura_token = hasura_token
         self.useragent = useragent
+        self.http_client = http_client
+        self.save_chunk_size = save_chunk_size
+        self.get_by_urls_chunk_size = get_by_urls_chunk_size
+        self.get_by_urls_concurrency = get_by_urls_concurrency
 
     def get_by_urls(
         self,
         urls: Iterable[str],
     ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        niconico_user_icon_cache_metadatas = list(self.iter_by_urls(urls=urls))
+        logger.info(
+            f"Fetched {len(niconico_user_icon_cache_metadatas)} niconico_user_icon_caches"
+        )
+
+        return niconico_user_icon_cache_metadatas
+
+    def iter_by_urls(
+        self,
+        urls: Iterable[str],
+    ) -> Iterator[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        """
+        get_by_urls_chunk_size件ずつ、最大get_by_urls_concurrency件並行して問い合わせ、
+        問い合わせが終わった順に返す
+        """
+
+        get_by_urls_chunk_size = self.get_by_urls_chunk_size
+        get_by_urls_concurrency = self.get_by_urls_concurrency
+
+        url_list = list(urls)
+        url_chunks = [
+            url_list[index : index + get_by_urls_chunk_size]
+            for index in range(0, len(url_list), get_by_urls_chunk_size)
+        ]
+
+        if len(url_chunks) <= 1 or get_by_urls_concurrency <= 1:
+            for url_chunk in url_chunks:
+                yield from self.__get_by_url_chunk(urls=url_chunk)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=get_by_urls_concurrency)
+        try:
+            # トレースのスパンなどを引き継ぐため、呼び出し元のコンテキストで実行する
+            futures = [
+                executor.submit(
+                    copy_context().run,
+                    self.__get_by_url_chunk,
+                    urls=url_chunk,
+                )
+                for url_chunk in url_chunks
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # 途中で読むのをやめた場合、まだ始まっていない問い合わせは行わない
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __get_by_url_chunk(
+        self,
+        urls: list[str],
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        """
+        更新サイクルごとに呼ばれるため、再検証用の列（etagなど）は問い合わせない
+        """
+
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -107,11 +238,11 @@ query GetNiconicoUserIconCacheByUrls(
 }
 """,
             "variables": GetNiconicoUserIconCacheByUrlsRequestVariables(
-                urls=list(urls),
+                urls=urls,
             ).model_dump(mode="json"),
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -131,8 +262,9 @@ query GetNiconicoUserIconCacheByUrls(
             raise
 
         hasura_niconico_user_icon_caches = response_body.data.niconico_user_icon_caches
-        logger.info(
-            f"Fetched {len(hasura_niconico_user_icon_caches)} niconico_user_icon_caches"
+        logger.debug(
+            f"Fetched {len(hasura_niconico_user_icon_caches)} niconico_user_icon_caches "
+            f"in a chunk of {len(urls)} urls"
         )
 
         niconico_user_icon_cache_metadatas: list[
@@ -164,6 +296,7 @@ query GetNiconicoUserIconCacheByUrls(
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -201,7 +334,7 @@ mutation InsertNiconicoUserIconCache(
             ).model_dump(mode="json"),
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -222,3 +355,301 @@ mutation InsertNiconicoUserIconCache(
 
         id = response_body.data.insert_niconico_user_icon_caches_one.id
         logger.info(f"Created niconico_user_icon_caches[id={id}]")
+
+    def save_all(
+        self,
+        metadatas: Iterable[LiveInboxApiNiconicoUserIconCacheMetadata],
+    ) -> None:
+        """
+        save_chunk_size件ずつまとめて保存する
+
+        同じURLの行があれば上書きするため、同じメタデータを再送しても結果は変わらない
+        """
+
+        save_chunk_size = self.save_chunk_size
+
+        metadata_adapter = TypeAdapter(LiveInboxApiNiconicoUserIconCacheMetadata)
+
+        affected_rows = 0
+        chunk: list[dict[str, Any]] = []
+        for metadata in metadatas:
+            chunk.append(metadata_adapter.dump_python(metadata, mode="json"))
+
+            if len(chunk) >= save_chunk_size:
+                affected_rows += self.__save_chunk(metadata_jsons=chunk)
+                chunk = []
+
+        if len(chunk) > 0:
+            affected_rows += self.__save_chunk(metadata_jsons=chunk)
+
+        logger.info(f"Saved {affected_rows} niconico_user_icon_caches")
+
+    def __save_chunk(
+        self,
+        metadata_jsons: list[dict[str, Any]],
+    ) -> int:
+        hasura_url = self.hasura_url
+        hasura_token = self.hasura_token
+        useragent = self.useragent
+        http_client = self.http_client
+
+        hasura_api_url = urljoin(hasura_url, "v1/graphql")
+
+        payload = {
+            "query": """
+mutation InsertNiconicoUserIconCaches(
+  $objects: [niconico_user_icon_caches_insert_input!]!
+) {
+  insert_niconico_user_icon_caches(
+    objects: $objects
+    on_conflict: {
+      constraint: niconico_user_icon_caches_url_key
+      update_columns: [
+        fetched_at
+        file_size
+        hash_md5
+        content_type
+        file_key
+        etag
+        last_modified
+        revalidated_at
+        gone_at
+      ]
+    }
+  ) {
+    affected_rows
+  }
+}
+""",
+            "variables": {
+                "objects": metadata_jsons,
+            },
+        }
+
+        res = http_client.post(
+            url=hasura_api_url,
+            headers={
+                "Authorization": f"Bearer {hasura_token}",
+                "User-Agent": useragent,
+            },
+            json=payload,
+        )
+        res.raise_for_status()
+
+        response_body_json = res.json()
+        try:
+            response_body = InsertNiconicoUserIconCachesResponseBody.model_validate(
+                response_body_json
+            )
+        except ValidationError:
+            logger.error(response_body_json)
+            raise
+
+        affected_rows = (
+            response_body.data.insert_niconico_user_icon_caches.affected_rows
+        )
+        logger.debug(
+            f"Saved {affected_rows} niconico_user_icon_caches "
+            f"in a chunk of {len(metadata_jsons)}"
+        )
+
+        return affected_rows
+
+    def get_revalidation_candidates(
+        self,
+        validated_before: datetime,
+        limit: int,
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        """
+        validated_beforeより前に取得・再検証したアイコンを、古い順にlimit件取得する
+
+        削除済みとしたアイコンは含めない
+        """
+
+        hasura_url = self.hasura_url
+        hasura_token = self.hasura_token
+        useragent = self.useragent
+        http_client = self.http_client
+
+        hasura_api_url = urljoin(hasura_url, "v1/graphql")
+
+        payload = {
+            "query": """
+query GetNiconicoUserIconCacheRevalidationCandidates(
+  $validated_before: timestamptz!
+  $limit: Int!
+) {
+  niconico_user_icon_caches(
+    where: {
+      gone_at: { _is_null: true }
+      _or: [
+        { revalidated_at: { _lt: $validated_before } }
+        {
+          revalidated_at: { _is_null: true }
+          fetched_at: { _lt: $validated_before }
+        }
+      ]
+    }
+    order_by: [
+      { revalidated_at: asc_nulls_first }
+      { fetched_at: asc }
+    ]
+    limit: $limit
+  ) {
+    id
+    url
+    fetched_at
+    file_size
+    hash_md5
+    content_type
+    file_key
+    etag
+    last_modified
+    revalidated_at
+    gone_at
+  }
+}
+""",
+            "variables": GetNiconicoUserIconCacheRevalidationCandidatesRequestVariables(
+                validated_before=validated_before,
+                limit=limit,
+            ).model_dump(mode="json"),
+        }
+
+        res = http_client.post(
+            url=hasura_api_url,
+            headers={
+                "Authorization": f"Bearer {hasura_token}",
+                "User-Agent": useragent,
+            },
+            json=payload,
+        )
+        res.raise_for_status()
+
+        response_body_json = res.json()
+        try:
+            response_body = GetNiconicoUserIconCacheRevalidationCandidatesResponseBody.model_validate(
+                response_body_json
+            )
+        except ValidationError:
+            logger.error(response_body_json)
+            raise
+
+        hasura_niconico_user_icon_caches = response_body.data.niconico_user_icon_caches
+        logger.info(
+            f"Fetched {len(hasura_niconico_user_icon_caches)} niconico_user_icon_caches "
+            "to revalidate"
+        )
+
+        niconico_user_icon_cache_metadatas: list[
+            LiveInboxApiNiconicoUserIconCacheMetadata
+        ] = []
+        for hasura_niconico_user_icon_cache in hasura_niconico_user_icon_caches:
+            niconico_user_icon_cache_metadatas.append(
+                LiveInboxApiNiconicoUserIconCacheMetadata(
+                    url=hasura_niconico_user_icon_cache.url,
+                    fetched_at=hasura_niconico_user_icon_cache.fetched_at,
+                    file_size=hasura_niconico_user_icon_cache.file_size,
+                    hash_md5=hasura_niconico_user_icon_cache.hash_md5,
+                    content_type=hasura_niconico_user_icon_cache.content_type,
+                    file_key=hasura_niconico_user_icon_cache.file_key,
+                    etag=hasura_niconico_user_icon_cache.etag,
+                    last_modified=hasura_niconico_user_icon_cache.last_modified,
+                    revalidated_at=hasura_niconico_user_icon_cache.revalidated_at,
+                    gone_at=hasura_niconico_user_icon_cache.gone_at,
+                ),
+            )
+
+        return niconico_user_icon_cache_metadatas
+
+    def touch_revalidated(
+        self,
+        urls: Iterable[str],
+        revalidated_at: datetime,
+    ) -> None:
+        self.__update_revalidation(
+            urls=urls,
+            revalidated_at=revalidated_at,
+            gone_at=None,
+        )
+
+    def mark_gone(
+        self,
+        urls: Iterable[str],
+        gone_at: datetime,
+    ) -> None:
+        self.__update_revalidation(
+            urls=urls,
+            revalidated_at=gone_at,
+            gone_at=gone_at,
+        )
+
+    def __update_revalidation(
+        self,
+        urls: Iterable[str],
+        revalidated_at: datetime,
+        gone_at: datetime | None,
+    ) -> None:
+        hasura_url = self.hasura_url
+        hasura_token = self.hasura_token
+        useragent = self.useragent
+        http_client = self.http_client
+
+        url_list = list(urls)
+        if len(url_list) == 0:
+            return
+
+        hasura_api_url = urljoin(hasura_url, "v1/graphql")
+
+        payload = {
+            "query": """
+mutation UpdateNiconicoUserIconCaches(
+  $urls: [String!]!
+  $revalidated_at: timestamptz!
+  $gone_at: timestamptz
+) {
+  update_niconico_user_icon_caches(
+    where: {
+      url: {
+        _in: $urls
+      }
+    }
+    _set: {
+      revalidated_at: $revalidated_at
+      gone_at: $gone_at
+    }
+  ) {
+    affected_rows
+  }
+}
+""",
+            "variables": UpdateNiconicoUserIconCachesRequestVariables(
+                urls=url_list,
+                revalidated_at=revalidated_at,
+                gone_at=gone_at,
+            ).model_dump(mode="json"),
+        }
+
+        res = http_client.post(
+            url=hasura_api_url,
+            headers={
+                "Authorization": f"Bearer {hasura_token}",
+                "User-Agent": useragent,
+            },
+            json=payload,
+        )
+        res.raise_for_status()
+
+        response_body_json = res.json()
+        try:
+            response_body = UpdateNiconicoUserIconCachesResponseBody.model_validate(
+                response_body_json
+            )
+        except ValidationError:
+            logger.error(response_body_json)
+            raise
+
+        affected_rows = (
+            response_body.data.update_niconico_user_icon_caches.affected_rows
+        )
+        logger.info(f"Updated {affected_rows} niconico_user_icon_caches")
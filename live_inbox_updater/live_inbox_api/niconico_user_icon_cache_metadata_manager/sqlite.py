@@ -0,0 +1,229 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable
+
+from .base import (
+    LiveInboxApiNiconicoUserIconCacheMetadata,
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+)
+
+logger = getLogger(__name__)
+
+
+class LiveInboxApiNiconicoUserIconCacheMetadataSqliteCacheManager(
+    LiveInboxApiNiconicoUserIconCacheMetadataManager
+):
+    def __init__(
+        self,
+        manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+        database_path: Path,
+        reconcile_interval: float | None = None,
+    ):
+        """
+        既知のユーザアイコンのメタデータをローカルのSQLiteに保持し、
+        get_by_urlsではローカルにないURLだけをmanagerに問い合わせる
+
+        reconcile_interval: 指定した秒数ごとに、get_by_urlsで全てのURLをmanagerに問い合わせ、
+        ローカルの内容を置き換える
+        """
+
+        self.manager = manager
+        self.database_path = database_path
+        self.reconcile_interval = reconcile_interval
+
+        database_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # asyncio.to_threadから呼ばれるため、接続をスレッド間で共有してロックで守る
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(
+            database_path,
+            check_same_thread=False,
+        )
+        with self.__connection:
+            self.__connection.execute(
+                """
+CREATE TABLE IF NOT EXISTS niconico_user_icon_cache_metadatas (
+    url TEXT PRIMARY KEY,
+    metadata_json TEXT NOT NULL
+)
+"""
+            )
+
+        self.__reconciled_at: float | None = None
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    def __is_reconcile_due(self) -> bool:
+        reconcile_interval = self.reconcile_interval
+        if reconcile_interval is None:
+            return False
+
+        return (
+            self.__reconciled_at is None
+            or time.monotonic() - self.__reconciled_at >= reconcile_interval
+        )
+
+    def __select(
+        self,
+        urls: list[str],
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        metadatas: list[LiveInboxApiNiconicoUserIconCacheMetadata] = []
+
+        # SQLiteの変数の上限を超えないよう分けて問い合わせる
+        chunk_size = 500
+        with self.__lock:
+            for index in range(0, len(urls), chunk_size):
+                chunk = urls[index : index + chunk_size]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self.__connection.execute(
+                    "SELECT metadata_json FROM niconico_user_icon_cache_metadatas "
+                    f"WHERE url IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for (metadata_json,) in rows:
+                    metadatas.append(
+                        LiveInboxApiNiconicoUserIconCacheMetadata.model_validate_json(
+                            metadata_json
+                        ),
+                    )
+
+        return metadatas
+
+    def __upsert(
+        self,
+        metadatas: Iterable[LiveInboxApiNiconicoUserIconCacheMetadata],
+    ) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                "INSERT INTO niconico_user_icon_cache_metadatas (url, metadata_json) "
+                "VALUES (?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET metadata_json = excluded.metadata_json",
+                [(metadata.url, metadata.model_dump_json()) for metadata in metadatas],
+            )
+
+    def __delete(
+        self,
+        urls: Iterable[str],
+    ) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                "DELETE FROM niconico_user_icon_cache_metadatas WHERE url = ?",
+                [(url,) for url in urls],
+            )
+
+    def get_by_urls(
+        self,
+        urls: Iterable[str],
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        manager = self.manager
+
+        url_list = list(urls)
+
+        if self.__is_reconcile_due():
+            metadatas = manager.get_by_urls(urls=url_list)
+
+            # 問い合わせたURLのうち、managerにないものはローカルからも消す
+            self.__delete(urls=url_list)
+            self.__upsert(metadatas=metadatas)
+            self.__reconciled_at = time.monotonic()
+
+            logger.info(
+                f"Reconciled {len(metadatas)} niconico_user_icon_caches "
+                "with the local cache"
+            )
+            return metadatas
+
+        local_metadatas = self.__select(urls=url_list)
+        local_urls = {metadata.url for metadata in local_metadatas}
+
+        missing_urls = [url for url in url_list if url not in local_urls]
+        remote_metadatas: list[LiveInboxApiNiconicoUserIconCacheMetadata] = []
+        if len(missing_urls) > 0:
+            remote_metadatas = manager.get_by_urls(urls=missing_urls)
+            self.__upsert(metadatas=remote_metadatas)
+
+        logger.info(
+            f"Found {len(local_metadatas)} niconico_user_icon_caches in the local cache, "
+            f"{len(remote_metadatas)} of {len(missing_urls)} missing ones remotely"
+        )
+
+        return local_metadatas + remote_metadatas
+
+    def save(
+        self,
+        url: str,
+        fetched_at: datetime,
+        file_size: int,
+        hash_md5: str,
+        content_type: str,
+        file_key: str,
+    ) -> None:
+        self.save_all(
+            metadatas=[
+                LiveInboxApiNiconicoUserIconCacheMetadata(
+                    url=url,
+                    fetched_at=fetched_at,
+                    file_size=file_size,
+                    hash_md5=hash_md5,
+                    content_type=content_type,
+                    file_key=file_key,
+                ),
+            ],
+        )
+
+    def save_all(
+        self,
+        metadatas: Iterable[LiveInboxApiNiconicoUserIconCacheMetadata],
+    ) -> None:
+        metadata_list = list(metadatas)
+
+        self.manager.save_all(metadatas=metadata_list)
+        self.__upsert(metadatas=metadata_list)
+
+    def get_revalidation_candidates(
+        self,
+        validated_before: datetime,
+        limit: int,
+    ) -> list[LiveInboxApiNiconicoUserIconCacheMetadata]:
+        return self.manager.get_revalidation_candidates(
+            validated_before=validated_before,
+            limit=limit,
+        )
+
+    def touch_revalidated(
+        self,
+        urls: Iterable[str],
+        revalidated_at: datetime,
+    ) -> None:
+        url_list = list(urls)
+
+        self.manager.touch_revalidated(urls=url_list, revalidated_at=revalidated_at)
+        self.__upsert(
+            metadatas=[
+                metadata.model_copy(update={"revalidated_at": revalidated_at})
+                for metadata in self.__select(urls=url_list)
+            ],
+        )
+
+    def mark_gone(
+        self,
+        urls: Iterable[str],
+        gone_at: datetime,
+    ) -> None:
+        url_list = list(urls)
+
+        self.manager.mark_gone(urls=url_list, gone_at=gone_at)
+        self.__upsert(
+            metadatas=[
+                metadata.model_copy(
+                    update={"revalidated_at": gone_at, "gone_at": gone_at},
+                )
+                for metadata in self.__select(urls=url_list)
+            ],
+        )
@@ -1,4 +1,7 @@
-from .base import LiveInboxApiNiconicoUserIconCacheStorageManager
+from .base import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+    create_content_addressed_file_key,
+)
 from .file import LiveInboxApiNiconicoUserIconCacheStorageFileManager
 from .s3 import LiveInboxApiNiconicoUserIconCacheStorageS3Manager
 
@@ -6,4 +9,5 @@ __all__ = [
     "LiveInboxApiNiconicoUserIconCacheStorageManager",
     "LiveInboxApiNiconicoUserIconCacheStorageFileManager",
     "LiveInboxApiNiconicoUserIconCacheStorageS3Manager",
+    "create_content_addressed_file_key",
 ]
@@ -1,6 +1,17 @@
+import hashlib
 from abc import ABC, abstractmethod
 
 
+def create_content_addressed_file_key(
+    content: bytes,
+) -> str:
+    """
+    内容のダイジェストからfile_keyを作る。同じ内容のアイコンは同じfile_keyになる
+    """
+
+    return hashlib.sha256(content).hexdigest()
+
+
 class LiveInboxApiNiconicoUserIconCacheStorageManager(ABC):
     @abstractmethod
     def check_exists(
@@ -16,3 +27,25 @@ class LiveInboxApiNiconicoUserIconCacheStorageManager(ABC):
         content_type: str,
         content: bytes,
     ) -> None: ...
+
+    def save_content_addressed(
+        self,
+        content_type: str,
+        content: bytes,
+    ) -> str:
+        """
+        内容のダイジェストをfile_keyとして保存し、file_keyを返す
+
+        同じfile_keyのファイルが既にあればアップロードを省く
+        """
+
+        file_key = create_content_addressed_file_key(content=content)
+
+        if not self.check_exists(file_key=file_key, content_type=content_type):
+            self.save(
+                file_key=file_key,
+                content_type=content_type,
+                content=content,
+            )
+
+        return file_key
@@ -1,3 +1,4 @@
+import uuid
 from pathlib import Path
 
 from .base import LiveInboxApiNiconicoUserIconCacheStorageManager
@@ -57,4 +58,10 @@ class LiveInboxApiNiconicoUserIconCacheStorageFileManager(
         )
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        path.write_bytes(content)
+        # 書き込み途中のファイルが存在扱いされないよう、書き終えてから置き換える
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4()}.tmp")
+        try:
+            tmp_path.write_bytes(content)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
@@ -1,5 +1,11 @@
+import io
+import threading
+import time
+
 import boto3
+import botocore.config
 import botocore.exceptions
+from boto3.s3.transfer import TransferConfig
 
 from .base import LiveInboxApiNiconicoUserIconCacheStorageManager
 
@@ -15,6 +21,10 @@ class LiveInboxApiNiconicoUserIconCacheStorageS3Manager(
         region_name: str | None,
         access_key_id: str,
         secret_access_key: str,
+        max_pool_connections: int = 10,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        max_concurrency: int = 10,
+        listing_cache_ttl: float | None = None,
     ):
         self.dir = dir
         self.bucket_name = bucket_name
@@ -24,14 +34,28 @@ class LiveInboxApiNiconicoUserIconCacheStorageS3Manager(
         self.access_key_id = access_key_id
         self.secret_access_key = secret_access_key
 
+        self.listing_cache_ttl = listing_cache_ttl
+
+        # 並行してアップロードできるよう、接続プールの大きさを指定する
         self.s3_client = boto3.client(
             "s3",
             endpoint_url=endpoint_url,
             region_name=region_name,
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
+            config=botocore.config.Config(
+                max_pool_connections=max_pool_connections,
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            max_concurrency=max_concurrency,
         )
 
+        self.__listing_cache_lock = threading.Lock()
+        self.__listing_cache_object_keys: set[str] | None = None
+        self.__listing_cache_loaded_at: float | None = None
+
     def __create_niconico_user_icon_object_key(
         self,
         file_key: str,
@@ -54,6 +78,43 @@ class LiveInboxApiNiconicoUserIconCacheStorageS3Manager(
         file_name = f"{file_key}{suffix}"
         return f"{dir}/{file_name}"
 
+    def __list_object_keys(self) -> set[str]:
+        s3_client = self.s3_client
+        bucket_name = self.bucket_name
+        dir = self.dir
+
+        object_keys: set[str] = set()
+
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{dir}/"):
+            for content in page.get("Contents", []):
+                object_keys.add(content["Key"])
+
+        return object_keys
+
+    def __get_cached_object_keys(self) -> set[str] | None:
+        """
+        ディレクトリ内のオブジェクトキー一覧を返す。キャッシュが無効ならNoneを返す
+
+        キャッシュが古ければ、一覧を取得し直す
+        """
+
+        listing_cache_ttl = self.listing_cache_ttl
+        if listing_cache_ttl is None:
+            return None
+
+        with self.__listing_cache_lock:
+            now = time.monotonic()
+            if (
+                self.__listing_cache_object_keys is None
+                or self.__listing_cache_loaded_at is None
+                or now - self.__listing_cache_loaded_at >= listing_cache_ttl
+            ):
+                self.__listing_cache_object_keys = self.__list_object_keys()
+                self.__listing_cache_loaded_at = now
+
+            return self.__listing_cache_object_keys
+
     def check_exists(
         self,
         file_key: str,
@@ -67,6 +128,10 @@ class LiveInboxApiNiconicoUserIconCacheStorageS3Manager(
             content_type=content_type,
         )
 
+        cached_object_keys = self.__get_cached_object_keys()
+        if cached_object_keys is not None:
+            return object_key in cached_object_keys
+
         try:
             s3_client.head_object(
                 Bucket=bucket_name,
@@ -87,15 +152,23 @@ class LiveInboxApiNiconicoUserIconCacheStorageS3Manager(
     ) -> None:
         s3_client = self.s3_client
         bucket_name = self.bucket_name
+        transfer_config = self.transfer_config
 
         object_key = self.__create_niconico_user_icon_object_key(
             file_key=file_key,
             content_type=content_type,
         )
 
-        s3_client.put_object(
+        s3_client.upload_fileobj(
+            Fileobj=io.BytesIO(content),
             Bucket=bucket_name,
             Key=object_key,
-            Body=content,
-            ContentType=content_type,
+            ExtraArgs={
+                "ContentType": content_type,
+            },
+            Config=transfer_config,
         )
+
+        with self.__listing_cache_lock:
+            if self.__listing_cache_object_keys is not None:
+                self.__listing_cache_object_keys.add(object_key)
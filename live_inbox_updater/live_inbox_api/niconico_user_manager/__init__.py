@@ -3,13 +3,17 @@ from .base import (
     LiveInboxApiNiconicoUserCreateObject,
     LiveInboxApiNiconicoUserEnabledUpdateObject,
     LiveInboxApiNiconicoUserManager,
+    LiveInboxApiNiconicoUserSubscriber,
 )
 from .hasura import NiconicoUserHasuraManager
+from .hasura_subscription import NiconicoUserHasuraSubscriber
 
 __all__ = [
     "LiveInboxApiNiconicoUser",
     "LiveInboxApiNiconicoUserEnabledUpdateObject",
     "LiveInboxApiNiconicoUserCreateObject",
     "LiveInboxApiNiconicoUserManager",
+    "LiveInboxApiNiconicoUserSubscriber",
     "NiconicoUserHasuraManager",
+    "NiconicoUserHasuraSubscriber",
 ]
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+from datetime import datetime
+from typing import AsyncIterator, Iterable
 
 from pydantic import BaseModel
 
@@ -9,6 +10,7 @@ class LiveInboxApiNiconicoUser(BaseModel):
     name: str
     enabled: bool
     icon_url: str | None
+    updated_at: datetime | None = None
 
 
 class LiveInboxApiNiconicoUserCreateObject(BaseModel):
@@ -29,6 +31,12 @@ class LiveInboxApiNiconicoUserManager(ABC):
         self,
     ) -> list[LiveInboxApiNiconicoUser]: ...
 
+    @abstractmethod
+    def get_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> list[LiveInboxApiNiconicoUser]: ...
+
     @abstractmethod
     def create_users(
         self,
@@ -40,3 +48,11 @@ class LiveInboxApiNiconicoUserManager(ABC):
         self,
         update_objects: Iterable[LiveInboxApiNiconicoUserEnabledUpdateObject],
     ) -> None: ...
+
+
+class LiveInboxApiNiconicoUserSubscriber(ABC):
+    @abstractmethod
+    def subscribe_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> AsyncIterator[list[LiveInboxApiNiconicoUser]]: ...
@@ -1,5 +1,6 @@
+from datetime import datetime
 from logging import getLogger
-from typing import Iterable
+from typing import Any, Iterable
 from urllib.parse import urljoin
 
 import httpx
@@ -31,6 +32,23 @@ class GetNiconicoUsersResponseBody(BaseModel):
     data: GetNiconicoUsersResponseData
 
 
+class GetNiconicoUsersUpdatedSinceResponseNiconicoUser(BaseModel):
+    id: str
+    remote_niconico_user_id: str
+    name: str
+    enabled: bool
+    icon_url: str | None
+    updated_at: datetime
+
+
+class GetNiconicoUsersUpdatedSinceResponseData(BaseModel):
+    niconico_users: list[GetNiconicoUsersUpdatedSinceResponseNiconicoUser]
+
+
+class GetNiconicoUsersUpdatedSinceResponseBody(BaseModel):
+    data: GetNiconicoUsersUpdatedSinceResponseData
+
+
 class CreateNiconicoUsersResponseInsertNiconicoUsers(BaseModel):
     affected_rows: int
 
@@ -63,10 +81,12 @@ class NiconicoUserHasuraManager(LiveInboxApiNiconicoUserManager):
         hasura_url: str,
         hasura_token: str,
         useragent: str,
+        http_client: httpx.Client,
     ):
         self.hasura_url = hasura_url
         self.hasura_token = hasura_token
         self.useragent = useragent
+        self.http_client = http_client
 
     def get_all(
         self,
@@ -74,6 +94,7 @@ class NiconicoUserHasuraManager(LiveInboxApiNiconicoUserManager):
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -91,7 +112,7 @@ query GetNiconicoUsers {
 """,
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -126,6 +147,93 @@ query GetNiconicoUsers {
 
         return niconico_users
 
+    def get_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> list[LiveInboxApiNiconicoUser]:
+        """
+        updated_atがupdated_after以降のユーザを、updated_atの昇順で取得する
+
+        updated_afterがNoneの場合は全てのユーザを取得する
+        """
+
+        hasura_url = self.hasura_url
+        hasura_token = self.hasura_token
+        useragent = self.useragent
+        http_client = self.http_client
+
+        hasura_api_url = urljoin(hasura_url, "v1/graphql")
+
+        where: dict[str, Any] = {}
+        if updated_after is not None:
+            where = {
+                "updated_at": {
+                    "_gte": updated_after.isoformat(),
+                },
+            }
+
+        payload = {
+            "query": """
+query GetNiconicoUsersUpdatedSince(
+  $where: niconico_users_bool_exp!
+) {
+  niconico_users(
+    where: $where
+    order_by: { updated_at: asc }
+  ) {
+    id
+    remote_niconico_user_id
+    name
+    enabled
+    icon_url
+    updated_at
+  }
+}
+""",
+            "variables": {
+                "where": where,
+            },
+        }
+
+        res = http_client.post(
+            url=hasura_api_url,
+            headers={
+                "Authorization": f"Bearer {hasura_token}",
+                "User-Agent": useragent,
+            },
+            json=payload,
+        )
+        res.raise_for_status()
+
+        response_body_json = res.json()
+        try:
+            response_body = GetNiconicoUsersUpdatedSinceResponseBody.model_validate(
+                response_body_json
+            )
+        except ValidationError:
+            logger.error(response_body_json)
+            raise
+
+        hasura_niconico_users = response_body.data.niconico_users
+        logger.info(
+            f"Fetched {len(hasura_niconico_users)} niconico users "
+            f"updated since {updated_after}"
+        )
+
+        niconico_users: list[LiveInboxApiNiconicoUser] = []
+        for hasura_niconico_user in hasura_niconico_users:
+            niconico_users.append(
+                LiveInboxApiNiconicoUser(
+                    remote_niconico_user_id=hasura_niconico_user.remote_niconico_user_id,
+                    name=hasura_niconico_user.name,
+                    enabled=hasura_niconico_user.enabled,
+                    icon_url=hasura_niconico_user.icon_url,
+                    updated_at=hasura_niconico_user.updated_at,
+                ),
+            )
+
+        return niconico_users
+
     def create_users(
         self,
         create_objects: Iterable[LiveInboxApiNiconicoUserCreateObject],
@@ -133,6 +241,7 @@ query GetNiconicoUsers {
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -162,7 +271,7 @@ mutation CreateNiconicoUsers(
             },
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -191,6 +300,7 @@ mutation CreateNiconicoUsers(
         hasura_url = self.hasura_url
         hasura_token = self.hasura_token
         useragent = self.useragent
+        http_client = self.http_client
 
         hasura_api_url = urljoin(hasura_url, "v1/graphql")
 
@@ -224,7 +334,7 @@ mutation BulkUpdateNiconicoUserEnabled(
             },
         }
 
-        res = httpx.post(
+        res = http_client.post(
             url=hasura_api_url,
             headers={
                 "Authorization": f"Bearer {hasura_token}",
@@ -0,0 +1,214 @@
+import json
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Any, AsyncIterator
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from pydantic import BaseModel, ValidationError
+
+from .base import LiveInboxApiNiconicoUser, LiveInboxApiNiconicoUserSubscriber
+
+logger = getLogger(__name__)
+
+# カーソルを指定しない場合に、全てのユーザを受け取るための初期値
+STREAM_INITIAL_UPDATED_AT = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Hasuraが対応しているGraphQL over WebSocketのサブプロトコル
+GRAPHQL_TRANSPORT_WS_PROTOCOL = "graphql-transport-ws"
+
+
+class StreamNiconicoUsersResponseNiconicoUser(BaseModel):
+    id: str
+    remote_niconico_user_id: str
+    name: str
+    enabled: bool
+    icon_url: str | None
+    updated_at: datetime
+
+
+class StreamNiconicoUsersResponseData(BaseModel):
+    niconico_users_stream: list[StreamNiconicoUsersResponseNiconicoUser]
+
+
+class StreamNiconicoUsersResponseBody(BaseModel):
+    data: StreamNiconicoUsersResponseData
+
+
+def create_hasura_websocket_url(hasura_url: str) -> str:
+    hasura_api_url = urljoin(hasura_url, "v1/graphql")
+
+    split_url = urlsplit(hasura_api_url)
+    if split_url.scheme == "https":
+        split_url = split_url._replace(scheme="wss")
+    elif split_url.scheme == "http":
+        split_url = split_url._replace(scheme="ws")
+
+    return urlunsplit(split_url)
+
+
+class NiconicoUserHasuraSubscriber(LiveInboxApiNiconicoUserSubscriber):
+    def __init__(
+        self,
+        hasura_url: str,
+        hasura_token: str,
+        useragent: str,
+        batch_size: int = 100,
+    ):
+        """
+        Hasuraのストリーミングサブスクリプションで、追加・変更されたユーザを受け取る
+
+        接続にはwebsocketsパッケージが必要
+        """
+
+        self.hasura_url = hasura_url
+        self.hasura_token = hasura_token
+        self.useragent = useragent
+        self.batch_size = batch_size
+
+    async def subscribe_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> AsyncIterator[list[LiveInboxApiNiconicoUser]]:
+        """
+        updated_atがupdated_afterより後のユーザを、updated_atの昇順で受け取り続ける
+
+        updated_afterがNoneの場合は全てのユーザから受け取る
+        """
+
+        try:
+            # websocketsは任意の依存パッケージのため、使うときだけ読み込む
+            from websockets.asyncio.client import (  # type: ignore[import-not-found, unused-ignore]
+                connect,
+            )
+            from websockets.typing import (  # type: ignore[import-not-found, unused-ignore]
+                Subprotocol,
+            )
+        except ImportError as error:
+            raise Exception(
+                "websockets package is required to subscribe niconico_users."
+            ) from error
+
+        hasura_token = self.hasura_token
+        useragent = self.useragent
+        batch_size = self.batch_size
+
+        hasura_websocket_url = create_hasura_websocket_url(hasura_url=self.hasura_url)
+
+        if updated_after is None:
+            updated_after = STREAM_INITIAL_UPDATED_AT
+
+        async with connect(
+            hasura_websocket_url,
+            subprotocols=[Subprotocol(GRAPHQL_TRANSPORT_WS_PROTOCOL)],
+            user_agent_header=useragent,
+        ) as websocket:
+
+            async def _send(message: dict[str, Any]) -> None:
+                await websocket.send(json.dumps(message))
+
+            async def _receive() -> dict[str, Any]:
+                message: dict[str, Any] = json.loads(await websocket.recv())
+                return message
+
+            await _send(
+                {
+                    "type": "connection_init",
+                    "payload": {
+                        "headers": {
+                            "Authorization": f"Bearer {hasura_token}",
+                        },
+                    },
+                },
+            )
+
+            while True:
+                message = await _receive()
+                message_type = message.get("type")
+                if message_type == "connection_ack":
+                    break
+                if message_type == "ping":
+                    await _send({"type": "pong"})
+                    continue
+
+                raise Exception(f"Unexpected message before connection_ack: {message}")
+
+            await _send(
+                {
+                    "id": "1",
+                    "type": "subscribe",
+                    "payload": {
+                        "query": """
+subscription StreamNiconicoUsers(
+  $batch_size: Int!
+  $updated_after: timestamptz!
+) {
+  niconico_users_stream(
+    batch_size: $batch_size
+    cursor: {
+      initial_value: { updated_at: $updated_after }
+      ordering: ASC
+    }
+  ) {
+    id
+    remote_niconico_user_id
+    name
+    enabled
+    icon_url
+    updated_at
+  }
+}
+""",
+                        "variables": {
+                            "batch_size": batch_size,
+                            "updated_after": updated_after.isoformat(),
+                        },
+                    },
+                },
+            )
+
+            logger.info(f"Subscribed niconico users updated after {updated_after}")
+
+            while True:
+                message = await _receive()
+                message_type = message.get("type")
+
+                if message_type == "ping":
+                    await _send({"type": "pong"})
+                    continue
+
+                if message_type == "complete":
+                    return
+
+                if message_type == "error":
+                    raise Exception(f"Subscription error: {message.get('payload')}")
+
+                if message_type != "next":
+                    continue
+
+                response_body_json = message.get("payload")
+                try:
+                    response_body = StreamNiconicoUsersResponseBody.model_validate(
+                        response_body_json
+                    )
+                except ValidationError:
+                    logger.error(response_body_json)
+                    raise
+
+                hasura_niconico_users = response_body.data.niconico_users_stream
+                logger.info(
+                    f"Received {len(hasura_niconico_users)} updated niconico users"
+                )
+
+                niconico_users: list[LiveInboxApiNiconicoUser] = []
+                for hasura_niconico_user in hasura_niconico_users:
+                    niconico_users.append(
+                        LiveInboxApiNiconicoUser(
+                            remote_niconico_user_id=hasura_niconico_user.remote_niconico_user_id,
+                            name=hasura_niconico_user.name,
+                            enabled=hasura_niconico_user.enabled,
+                            icon_url=hasura_niconico_user.icon_url,
+                            updated_at=hasura_niconico_user.updated_at,
+                        ),
+                    )
+
+                yield niconico_users
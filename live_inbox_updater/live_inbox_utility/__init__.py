@@ -1,15 +1,71 @@
+from .adaptive_update_loop import run_adaptive_update_loop
 from .add_users import add_users
+from .backfill_niconico_live_programs_async import backfill_niconico_live_programs_async
 from .disable_users import disable_users
 from .enable_users import enable_users
-from .fetch_uncached_niconico_user_icons import fetch_uncached_niconico_user_icons
-from .update_job import update_job
-from .update_niconico_live_programs import update_niconico_live_programs
+from .fetch_uncached_niconico_user_icons_async import (
+    NiconicoUserIconPipelineConfig,
+    fetch_uncached_niconico_user_icons_async,
+)
+from .niconico_live_program_backfill_checkpoint import (
+    NiconicoLiveProgramBackfillCheckpoint,
+    NiconicoLiveProgramBackfillUserProgress,
+)
+from .niconico_live_program_state_store import (
+    NiconicoLiveProgramState,
+    NiconicoLiveProgramStateStore,
+)
+from .niconico_live_program_upsert_buffer import NiconicoLiveProgramUpsertBuffer
+from .niconico_user_index import NiconicoUserIndex, sync_update_cycle_context
+from .niconico_user_poll_scheduler import (
+    NiconicoUserPollScheduler,
+    compute_niconico_user_poll_interval,
+)
+from .niconico_user_shard import NiconicoUserShard, get_shard_index
+from .niconico_user_subscription import run_niconico_user_subscription_forever
+from .open_niconico_live_program_index import (
+    OpenNiconicoLiveProgram,
+    OpenNiconicoLiveProgramIndex,
+)
+from .revalidate_niconico_user_icons_async import revalidate_niconico_user_icons_async
+from .store_niconico_user_icon import store_niconico_user_icon
+from .update_cycle_context import UpdateCycleContext
+from .update_job_async import update_job_async
+from .update_niconico_live_programs_async import (
+    create_niconico_live_program_upsert_objects,
+    fetch_niconico_user_live_programs_async,
+    update_niconico_live_programs_async,
+)
+from .update_stage import observe_update_stage
 
 __all__ = [
     "add_users",
+    "backfill_niconico_live_programs_async",
+    "run_adaptive_update_loop",
     "disable_users",
     "enable_users",
-    "fetch_uncached_niconico_user_icons",
-    "update_niconico_live_programs",
-    "update_job",
+    "fetch_uncached_niconico_user_icons_async",
+    "NiconicoLiveProgramBackfillCheckpoint",
+    "NiconicoLiveProgramBackfillUserProgress",
+    "NiconicoLiveProgramState",
+    "NiconicoLiveProgramStateStore",
+    "NiconicoLiveProgramUpsertBuffer",
+    "NiconicoUserIconPipelineConfig",
+    "NiconicoUserIndex",
+    "sync_update_cycle_context",
+    "NiconicoUserShard",
+    "get_shard_index",
+    "run_niconico_user_subscription_forever",
+    "NiconicoUserPollScheduler",
+    "compute_niconico_user_poll_interval",
+    "OpenNiconicoLiveProgram",
+    "OpenNiconicoLiveProgramIndex",
+    "revalidate_niconico_user_icons_async",
+    "store_niconico_user_icon",
+    "UpdateCycleContext",
+    "create_niconico_live_program_upsert_objects",
+    "fetch_niconico_user_live_programs_async",
+    "update_niconico_live_programs_async",
+    "observe_update_stage",
+    "update_job_async",
 ]
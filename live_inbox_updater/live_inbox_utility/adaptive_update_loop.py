@@ -0,0 +1,281 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+)
+from ..live_inbox_api.niconico_user_manager import LiveInboxApiNiconicoUserSubscriber
+from ..metrics import UpdaterMetrics
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+)
+from ..niconico_api.niconico_user_icon_client import (
+    NiconicoApiNiconicoUserIconAsyncClient,
+)
+from ..tracing import Tracer, trace_span
+from .fetch_uncached_niconico_user_icons_async import (
+    NiconicoUserIconPipelineConfig,
+    fetch_uncached_niconico_user_icons_async,
+)
+from .niconico_live_program_state_store import NiconicoLiveProgramStateStore
+from .niconico_live_program_upsert_buffer import NiconicoLiveProgramUpsertBuffer
+from .niconico_user_index import NiconicoUserIndex, sync_update_cycle_context
+from .niconico_user_poll_scheduler import NiconicoUserPollScheduler
+from .niconico_user_subscription import run_niconico_user_subscription_forever
+from .open_niconico_live_program_index import OpenNiconicoLiveProgramIndex
+from .revalidate_niconico_user_icons_async import revalidate_niconico_user_icons_async
+from .update_niconico_live_programs_async import fetch_niconico_user_live_programs_async
+from .update_stage import observe_update_stage
+
+logger = getLogger(__name__)
+
+
+async def run_adaptive_update_loop(
+    niconico_user_index: NiconicoUserIndex,
+    niconico_user_icon_async_client: NiconicoApiNiconicoUserIconAsyncClient,
+    niconico_user_icon_cache_storage_manager: LiveInboxApiNiconicoUserIconCacheStorageManager,
+    niconico_user_icon_cache_metadata_manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+    niconico_user_icon_pipeline_config: NiconicoUserIconPipelineConfig,
+    niconico_user_broadcast_history_async_client: NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    niconico_live_program_manager: LiveInboxApiNiconicoLiveProgramManager,
+    niconico_live_program_state_store: NiconicoLiveProgramStateStore,
+    open_niconico_live_program_index: OpenNiconicoLiveProgramIndex,
+    niconico_user_poll_scheduler: NiconicoUserPollScheduler,
+    user_refresh_interval: timedelta,
+    update_concurrency: int,
+    program_upsert_chunk_size: int,
+    program_upsert_flush_interval: timedelta,
+    program_history_page_size: int,
+    program_history_max_pages: int,
+    niconico_user_subscriber: LiveInboxApiNiconicoUserSubscriber | None,
+    user_subscription_reconnect_delay: timedelta,
+    metrics: UpdaterMetrics | None,
+    tracer: Tracer | None,
+) -> None:
+    """
+    ユーザごとに決めた時刻でポーリングを続ける
+
+    - user_refresh_intervalごとにユーザ一覧を読み直し、未取得のユーザアイコンを取得し、
+      取得済みのユーザアイコンの一部を再検証する
+    - update_concurrency個のワーカーが、ポーリング時刻を過ぎたユーザを順に取得する
+    - 予約中・放送中の番組があるユーザは、開場・開始・終了予定時刻の直後にも取得する
+    - 番組のupsertはまとめて、溜まったときかprogram_upsert_flush_intervalごとに書き込む
+    - niconico_user_subscriberがある場合、ユーザの追加・変更を受け取り次第反映し、
+      ユーザ一覧の読み直しは全件の取得し直しが必要なときだけ行う
+    - metricsを指定した場合は、各段階とユーザごとのポーリングの所要時間を記録する
+    - tracerを指定した場合は、ユーザ一覧の読み直しとユーザごとのポーリングを
+      それぞれ1つのトレースとして記録する
+    """
+
+    if update_concurrency < 1:
+        raise ValueError("update_concurrency must be >= 1")
+
+    upsert_buffer = NiconicoLiveProgramUpsertBuffer(
+        niconico_live_program_manager=niconico_live_program_manager,
+        flush_size=program_upsert_chunk_size,
+        state_store=niconico_live_program_state_store,
+        metrics=metrics,
+    )
+
+    # ポーリング対象が増えた、または時刻が早まったことをワーカーに知らせる
+    scheduler_changed = asyncio.Event()
+
+    # サブスクリプションでユーザ一覧が変わったことを知らせる
+    users_changed = asyncio.Event()
+
+    # 最初の同期の後からサブスクリプションを始める
+    users_synced = asyncio.Event()
+
+    async def _refresh_users(users_changed_only: bool) -> None:
+        try:
+            if niconico_user_subscriber is not None and (
+                users_changed_only or not niconico_user_index.is_full_resync_due()
+            ):
+                # 変更はサブスクリプションで反映済み
+                update_cycle_context = niconico_user_index.create_update_cycle_context()
+            else:
+                with observe_update_stage(
+                    metrics=metrics, tracer=tracer, stage="user_sync"
+                ):
+                    update_cycle_context = await asyncio.to_thread(
+                        sync_update_cycle_context,
+                        niconico_user_index=niconico_user_index,
+                    )
+                users_synced.set()
+
+            niconico_user_poll_scheduler.sync_users(
+                remote_niconico_user_ids=update_cycle_context.enabled_niconico_users_by_remote_niconico_user_id.keys(),
+                now=datetime.now(tz=timezone.utc),
+            )
+            scheduler_changed.set()
+
+            with observe_update_stage(
+                metrics=metrics, tracer=tracer, stage="icon_fetch"
+            ):
+                await fetch_uncached_niconico_user_icons_async(
+                    update_cycle_context=update_cycle_context,
+                    niconico_user_icon_async_client=niconico_user_icon_async_client,
+                    niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                    niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                    config=niconico_user_icon_pipeline_config,
+                )
+        except Exception:
+            logger.exception("Failed to refresh niconico users")
+
+        if not users_changed_only:
+            try:
+                with observe_update_stage(
+                    metrics=metrics, tracer=tracer, stage="icon_revalidation"
+                ):
+                    await revalidate_niconico_user_icons_async(
+                        niconico_user_icon_async_client=niconico_user_icon_async_client,
+                        niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                        niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                        config=niconico_user_icon_pipeline_config,
+                        shard=niconico_user_index.shard,
+                    )
+            except Exception:
+                logger.exception("Failed to revalidate niconico user icons")
+
+    async def _refresh_users_forever() -> None:
+        users_changed_only = False
+        while True:
+            users_changed.clear()
+
+            with trace_span(tracer=tracer, name="refresh_users", new_trace=True):
+                await _refresh_users(users_changed_only=users_changed_only)
+
+            try:
+                await asyncio.wait_for(
+                    users_changed.wait(),
+                    timeout=user_refresh_interval.total_seconds(),
+                )
+                users_changed_only = True
+            except TimeoutError:
+                users_changed_only = False
+
+    async def _subscribe_users_forever() -> None:
+        if niconico_user_subscriber is None:
+            return
+
+        await users_synced.wait()
+        await run_niconico_user_subscription_forever(
+            niconico_user_subscriber=niconico_user_subscriber,
+            niconico_user_index=niconico_user_index,
+            on_changed=users_changed.set,
+            reconnect_delay=user_subscription_reconnect_delay,
+        )
+
+    async def _flush_upsert_buffer_forever() -> None:
+        while True:
+            await asyncio.sleep(program_upsert_flush_interval.total_seconds())
+
+            try:
+                await upsert_buffer.flush_async()
+            except Exception:
+                logger.exception("Failed to upsert niconico live programs")
+
+            niconico_live_program_state_store.prune(now=datetime.now(tz=timezone.utc))
+
+    async def _poll_user(remote_niconico_user_id: str) -> None:
+        with trace_span(
+            tracer=tracer,
+            name="poll_user",
+            attributes={"remote_niconico_user_id": remote_niconico_user_id},
+            new_trace=True,
+        ):
+            await _poll_user_in_trace(remote_niconico_user_id=remote_niconico_user_id)
+
+    async def _poll_user_in_trace(remote_niconico_user_id: str) -> None:
+        try:
+            with observe_update_stage(
+                metrics=metrics, tracer=tracer, stage="user_poll"
+            ):
+                upsert_objects = await fetch_niconico_user_live_programs_async(
+                    remote_niconico_user_id=remote_niconico_user_id,
+                    niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                    open_niconico_live_program_index=open_niconico_live_program_index,
+                    niconico_live_program_state_store=niconico_live_program_state_store,
+                    page_size=program_history_page_size,
+                    max_pages=program_history_max_pages,
+                )
+        except Exception:
+            logger.exception(
+                f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+                "Failed to fetch live programs"
+            )
+            niconico_user_poll_scheduler.schedule(
+                remote_niconico_user_id=remote_niconico_user_id,
+                at=datetime.now(tz=timezone.utc)
+                + niconico_user_poll_scheduler.base_interval,
+            )
+            return
+
+        now = datetime.now(tz=timezone.utc)
+        niconico_user_poll_scheduler.reschedule(
+            remote_niconico_user_id=remote_niconico_user_id,
+            upsert_objects=upsert_objects,
+            now=now,
+        )
+
+        recheck_at = open_niconico_live_program_index.get_next_recheck_at(
+            remote_niconico_user_id=remote_niconico_user_id,
+            now=now,
+        )
+        if recheck_at is not None:
+            niconico_user_poll_scheduler.schedule(
+                remote_niconico_user_id=remote_niconico_user_id,
+                at=recheck_at,
+                earlier_only=True,
+            )
+
+        next_poll_at = niconico_user_poll_scheduler.get_user_next_poll_at(
+            remote_niconico_user_id=remote_niconico_user_id,
+        )
+        logger.info(
+            f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+            f"Next poll at {next_poll_at}"
+        )
+
+        upsert_buffer.add_all(upsert_objects=upsert_objects)
+        if upsert_buffer.is_full():
+            try:
+                await upsert_buffer.flush_async()
+            except Exception:
+                logger.exception("Failed to upsert niconico live programs")
+
+    async def _poll_worker() -> None:
+        while True:
+            now = datetime.now(tz=timezone.utc)
+            remote_niconico_user_id = niconico_user_poll_scheduler.pop_due(now=now)
+            if remote_niconico_user_id is not None:
+                await _poll_user(remote_niconico_user_id=remote_niconico_user_id)
+                continue
+
+            timeout: float | None = None
+            next_poll_at = niconico_user_poll_scheduler.get_next_poll_at()
+            if next_poll_at is not None:
+                timeout = (next_poll_at - now).total_seconds()
+
+            scheduler_changed.clear()
+            try:
+                await asyncio.wait_for(scheduler_changed.wait(), timeout=timeout)
+            except TimeoutError:
+                pass
+
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(_refresh_users_forever())
+            task_group.create_task(_subscribe_users_forever())
+            task_group.create_task(_flush_upsert_buffer_forever())
+            for _ in range(update_concurrency):
+                task_group.create_task(_poll_worker())
+    finally:
+        await upsert_buffer.flush_async()
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timezone
+from logging import getLogger
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramManager,
+)
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+)
+from .niconico_live_program_backfill_checkpoint import (
+    NiconicoLiveProgramBackfillCheckpoint,
+)
+from .update_niconico_live_programs_async import (
+    create_niconico_live_program_upsert_objects,
+)
+
+logger = getLogger(__name__)
+
+
+async def backfill_niconico_live_programs_async(
+    remote_niconico_user_ids: list[str],
+    niconico_user_broadcast_history_async_client: NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    niconico_live_program_manager: LiveInboxApiNiconicoLiveProgramManager,
+    checkpoint: NiconicoLiveProgramBackfillCheckpoint,
+    concurrency: int,
+    page_size: int,
+) -> None:
+    """
+    ユーザの番組一覧を最後まで遡って取得し、ページごとにまとめて書き込む
+
+    - concurrency個のワーカーがユーザを1人ずつ担当する
+    - ページを書き込むたびにcheckpointへ次の取得位置を記録し、
+      中断した場合は記録した位置から再開する。取り込み済みのユーザは飛ばす
+    - 取り込み中に新しい番組が増えると位置がずれるが、
+      同じ番組を書き込み直すだけで取りこぼしはしない
+    """
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    if page_size < 1:
+        raise ValueError("page_size must be >= 1")
+
+    user_queue: asyncio.Queue[str] = asyncio.Queue()
+    for remote_niconico_user_id in remote_niconico_user_ids:
+        if checkpoint.get(remote_niconico_user_id=remote_niconico_user_id).completed:
+            logger.info(
+                f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+                "Already backfilled"
+            )
+            continue
+
+        user_queue.put_nowait(remote_niconico_user_id)
+
+    logger.info(
+        f"Backfilling live programs of {user_queue.qsize()} niconico_users "
+        f"(concurrency={concurrency}, page_size={page_size})"
+    )
+
+    failed_remote_niconico_user_ids: list[str] = []
+
+    async def _backfill_user(remote_niconico_user_id: str) -> None:
+        progress = checkpoint.get(remote_niconico_user_id=remote_niconico_user_id)
+
+        pages = niconico_user_broadcast_history_async_client.iter_program_pages(
+            niconico_user_id=remote_niconico_user_id,
+            page_size=page_size,
+            start_offset=progress.next_offset,
+        )
+        async for page in pages:
+            upsert_objects = create_niconico_live_program_upsert_objects(
+                programs=page.programs,
+                fetch_time=datetime.now(tz=timezone.utc),
+            )
+            if len(upsert_objects) > 0:
+                await asyncio.to_thread(
+                    niconico_live_program_manager.upsert_all,
+                    upsert_objects=upsert_objects,
+                )
+
+            progress.next_offset += len(page.programs)
+            progress.upserted_count += len(upsert_objects)
+            progress.completed = not page.has_next or len(page.programs) == 0
+            checkpoint.update(
+                remote_niconico_user_id=remote_niconico_user_id,
+                progress=progress,
+            )
+
+            logger.info(
+                f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+                f"Backfilled {progress.next_offset} of {page.total_count} live programs"
+            )
+
+            if progress.completed:
+                return
+
+    async def _worker() -> None:
+        while True:
+            try:
+                remote_niconico_user_id = user_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                await _backfill_user(remote_niconico_user_id=remote_niconico_user_id)
+            except Exception:
+                logger.exception(
+                    f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+                    "Failed to backfill live programs"
+                )
+                failed_remote_niconico_user_ids.append(remote_niconico_user_id)
+
+    async with asyncio.TaskGroup() as task_group:
+        for _ in range(concurrency):
+            task_group.create_task(_worker())
+
+    if len(failed_remote_niconico_user_ids) > 0:
+        raise Exception(
+            f"Failed to backfill {len(failed_remote_niconico_user_ids)} niconico_users: "
+            f"{', '.join(failed_remote_niconico_user_ids)}"
+        )
@@ -0,0 +1,251 @@
+import asyncio
+from datetime import datetime, timezone
+from logging import getLogger
+
+from pydantic import BaseModel
+
+from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadata,
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+)
+from ..niconico_api.niconico_user_icon_client import (
+    NiconicoApiNiconicoUserIcon,
+    NiconicoApiNiconicoUserIconAsyncClient,
+)
+from .store_niconico_user_icon import store_niconico_user_icon
+from .update_cycle_context import UpdateCycleContext
+
+logger = getLogger(__name__)
+
+
+class NiconicoUserIconPipelineConfig(BaseModel):
+    download_concurrency: int
+    store_concurrency: int
+    metadata_concurrency: int
+    metadata_batch_size: int
+    max_in_flight_bytes: int
+    content_addressed: bool
+    revalidation_batch_size: int
+    revalidation_interval: int
+
+
+class _DownloadedNiconicoUserIcon(BaseModel):
+    niconico_user_icon: NiconicoApiNiconicoUserIcon
+    fetched_at: datetime
+
+
+class _InFlightBytesLimiter:
+    """
+    ダウンロード済みで保存されていないアイコンの合計バイト数を制限する
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+    ):
+        self.max_bytes = max_bytes
+        self.in_flight_bytes = 0
+        self.__condition = asyncio.Condition()
+
+    async def acquire(
+        self,
+        size: int,
+    ) -> None:
+        async with self.__condition:
+            # 上限より大きいアイコンでも、他に保持しているものがなければ通す
+            await self.__condition.wait_for(
+                lambda: self.in_flight_bytes == 0
+                or self.in_flight_bytes + size <= self.max_bytes
+            )
+            self.in_flight_bytes += size
+
+    async def release(
+        self,
+        size: int,
+    ) -> None:
+        async with self.__condition:
+            self.in_flight_bytes -= size
+            self.__condition.notify_all()
+
+
+def _get_cached_icon_urls(
+    icon_urls: set[str],
+    niconico_user_icon_cache_metadata_manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+) -> set[str]:
+    cached_icon_urls: set[str] = set()
+    for icon_cache_metadata in niconico_user_icon_cache_metadata_manager.iter_by_urls(
+        urls=icon_urls,
+    ):
+        cached_icon_urls.add(icon_cache_metadata.url)
+
+    return cached_icon_urls
+
+
+async def fetch_uncached_niconico_user_icons_async(
+    update_cycle_context: UpdateCycleContext,
+    niconico_user_icon_async_client: NiconicoApiNiconicoUserIconAsyncClient,
+    niconico_user_icon_cache_metadata_manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+    niconico_user_icon_cache_storage_manager: LiveInboxApiNiconicoUserIconCacheStorageManager,
+    config: NiconicoUserIconPipelineConfig,
+) -> None:
+    """
+    未取得のユーザアイコンを、ダウンロード・保存・メタデータ保存の3段で並行して取得する
+
+    - ダウンロードはレートリミッタに従い、download_concurrency個で行う
+    - 保存はstore_concurrency個で行い、保存待ちのアイコンは合計max_in_flight_bytesまで保持する
+    - メタデータはmetadata_batch_size件ずつまとめ、metadata_concurrency個で保存する
+    - content_addressedの場合、内容のダイジェストをfile_keyとし、保存済みの内容はアップロードしない
+    """
+
+    if config.download_concurrency < 1:
+        raise ValueError("download_concurrency must be >= 1")
+    if config.store_concurrency < 1:
+        raise ValueError("store_concurrency must be >= 1")
+    if config.metadata_concurrency < 1:
+        raise ValueError("metadata_concurrency must be >= 1")
+    if config.metadata_batch_size < 1:
+        raise ValueError("metadata_batch_size must be >= 1")
+
+    # ユーザアイコンURLリストを取得
+    icon_urls = update_cycle_context.get_enabled_niconico_user_icon_urls()
+
+    # 取得済みのユーザアイコンURLリストを取得
+    cached_icon_urls = await asyncio.to_thread(
+        _get_cached_icon_urls,
+        icon_urls=icon_urls,
+        niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+    )
+
+    # 未取得のユーザアイコンURLリストを作成
+    uncached_icon_urls = icon_urls - cached_icon_urls
+    logger.info(f"Found {len(uncached_icon_urls)} uncached niconico user icons")
+
+    if len(uncached_icon_urls) == 0:
+        return
+
+    download_queue: asyncio.Queue[str] = asyncio.Queue()
+    for icon_url in uncached_icon_urls:
+        download_queue.put_nowait(icon_url)
+
+    store_queue: asyncio.Queue[_DownloadedNiconicoUserIcon | None] = asyncio.Queue()
+    metadata_queue: asyncio.Queue[LiveInboxApiNiconicoUserIconCacheMetadata | None] = (
+        asyncio.Queue()
+    )
+
+    in_flight_bytes_limiter = _InFlightBytesLimiter(
+        max_bytes=config.max_in_flight_bytes,
+    )
+
+    saved_count = 0
+
+    async def _download_worker() -> None:
+        while True:
+            try:
+                icon_url = download_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                fetched_at = datetime.now(tz=timezone.utc)
+                niconico_user_icon = await niconico_user_icon_async_client.get(
+                    url=icon_url,
+                )
+            except Exception:
+                logger.exception(f"Failed to download niconico user icon: {icon_url}")
+                continue
+
+            await in_flight_bytes_limiter.acquire(size=len(niconico_user_icon.content))
+            await store_queue.put(
+                _DownloadedNiconicoUserIcon(
+                    niconico_user_icon=niconico_user_icon,
+                    fetched_at=fetched_at,
+                ),
+            )
+
+    async def _store_worker() -> None:
+        while True:
+            downloaded_icon = await store_queue.get()
+            if downloaded_icon is None:
+                return
+
+            niconico_user_icon = downloaded_icon.niconico_user_icon
+            try:
+                stored_icon = await asyncio.to_thread(
+                    store_niconico_user_icon,
+                    niconico_user_icon=niconico_user_icon,
+                    fetched_at=downloaded_icon.fetched_at,
+                    niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                    content_addressed=config.content_addressed,
+                )
+            except Exception:
+                logger.exception(
+                    f"Failed to store niconico user icon: {niconico_user_icon.url}"
+                )
+                continue
+            finally:
+                await in_flight_bytes_limiter.release(
+                    size=len(niconico_user_icon.content),
+                )
+
+            await metadata_queue.put(stored_icon)
+
+    async def _metadata_worker() -> None:
+        nonlocal saved_count
+
+        finished = False
+        while not finished:
+            stored_icon = await metadata_queue.get()
+            if stored_icon is None:
+                return
+
+            # 溜まっている分をまとめて保存する
+            stored_icons = [stored_icon]
+            while len(stored_icons) < config.metadata_batch_size:
+                try:
+                    next_stored_icon = metadata_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+                if next_stored_icon is None:
+                    finished = True
+                    break
+
+                stored_icons.append(next_stored_icon)
+
+            try:
+                await asyncio.to_thread(
+                    niconico_user_icon_cache_metadata_manager.save_all,
+                    metadatas=stored_icons,
+                )
+            except Exception:
+                logger.exception(
+                    f"Failed to save {len(stored_icons)} niconico user icon metadatas"
+                )
+                continue
+
+            saved_count += len(stored_icons)
+
+    async with asyncio.TaskGroup() as metadata_task_group:
+        for _ in range(config.metadata_concurrency):
+            metadata_task_group.create_task(_metadata_worker())
+
+        async with asyncio.TaskGroup() as store_task_group:
+            for _ in range(config.store_concurrency):
+                store_task_group.create_task(_store_worker())
+
+            async with asyncio.TaskGroup() as download_task_group:
+                for _ in range(config.download_concurrency):
+                    download_task_group.create_task(_download_worker())
+
+            for _ in range(config.store_concurrency):
+                await store_queue.put(None)
+
+        for _ in range(config.metadata_concurrency):
+            await metadata_queue.put(None)
+
+    logger.info(
+        f"Fetched {saved_count} of {len(uncached_icon_urls)} niconico user icons"
+    )
@@ -0,0 +1,75 @@
+import uuid
+from logging import getLogger
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+
+class NiconicoLiveProgramBackfillUserProgress(BaseModel):
+    next_offset: int = 0
+    upserted_count: int = 0
+    completed: bool = False
+
+
+class NiconicoLiveProgramBackfillCheckpointData(BaseModel):
+    users: dict[str, NiconicoLiveProgramBackfillUserProgress] = {}
+
+
+class NiconicoLiveProgramBackfillCheckpoint:
+    """
+    ユーザごとの番組一覧の取り込み状況を保持する
+
+    pathを指定した場合は、更新のたびにJSONファイルへ書き出し、
+    次回起動時にその続きから取り込めるようにする
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+    ):
+        self.path = path
+
+        self.__data = NiconicoLiveProgramBackfillCheckpointData()
+        if path is not None and path.exists():
+            self.__data = NiconicoLiveProgramBackfillCheckpointData.model_validate_json(
+                path.read_bytes(),
+            )
+            logger.info(
+                f"Loaded backfill checkpoint of {len(self.__data.users)} niconico_users "
+                f"from {path}"
+            )
+
+    def get(
+        self,
+        remote_niconico_user_id: str,
+    ) -> NiconicoLiveProgramBackfillUserProgress:
+        progress = self.__data.users.get(remote_niconico_user_id)
+        if progress is None:
+            return NiconicoLiveProgramBackfillUserProgress()
+
+        return progress.model_copy()
+
+    def update(
+        self,
+        remote_niconico_user_id: str,
+        progress: NiconicoLiveProgramBackfillUserProgress,
+    ) -> None:
+        self.__data.users[remote_niconico_user_id] = progress.model_copy()
+        self.__save()
+
+    def __save(self) -> None:
+        path = self.path
+        if path is None:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 書き込み途中で止まっても前回のチェックポイントが残るよう、書き終えてから置き換える
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4()}.tmp")
+        try:
+            tmp_path.write_text(self.__data.model_dump_json(), encoding="utf-8")
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from pydantic import BaseModel
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastProgram,
+)
+
+
+class NiconicoLiveProgramState(BaseModel):
+    remote_niconico_user_id: str
+    title: str
+    status: str
+    start_time: datetime | None
+    end_time: datetime | None
+    last_upserted_at: datetime
+    last_seen_at: datetime
+
+
+class NiconicoLiveProgramStateStore:
+    """
+    最後に書き込んだ番組の状態をremote_niconico_content_idごとに保持する
+
+    内容が変わっていない番組は書き込みを省略するが、
+    heartbeat_intervalごとに少なくとも1回は書き込んでlast_fetch_timeを更新する
+    """
+
+    def __init__(
+        self,
+        heartbeat_interval: timedelta,
+    ):
+        self.heartbeat_interval = heartbeat_interval
+
+        self.__states: dict[str, NiconicoLiveProgramState] = {}
+        self.__remote_niconico_content_ids_by_remote_niconico_user_id: dict[
+            str, set[str]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self.__states)
+
+    def get(
+        self,
+        remote_niconico_content_id: str,
+    ) -> NiconicoLiveProgramState | None:
+        return self.__states.get(remote_niconico_content_id)
+
+    def has_niconico_user(
+        self,
+        remote_niconico_user_id: str,
+    ) -> bool:
+        return (
+            remote_niconico_user_id
+            in self.__remote_niconico_content_ids_by_remote_niconico_user_id
+        )
+
+    def is_ended_and_unchanged(
+        self,
+        program: NiconicoApiNiconicoUserBroadcastProgram,
+    ) -> bool:
+        """
+        ENDEDとして書き込み済みで、内容が変わっていない番組かどうかを返す
+        """
+
+        state = self.__states.get(program.niconico_content_id)
+        if state is None:
+            return False
+
+        return (
+            state.status == "ENDED"
+            and program.status == "ENDED"
+            and state.remote_niconico_user_id == program.niconico_user_id
+            and state.title == program.title
+            and state.start_time == program.start_time
+            and state.end_time == program.end_time
+        )
+
+    def filter_changed(
+        self,
+        upsert_objects: Iterable[LiveInboxApiNiconicoLiveProgramUpsertObject],
+    ) -> list[LiveInboxApiNiconicoLiveProgramUpsertObject]:
+        """
+        新規、内容が変わった、またはheartbeat_intervalを過ぎた番組だけを返す
+        """
+
+        heartbeat_interval = self.heartbeat_interval
+
+        changed_upsert_objects: list[LiveInboxApiNiconicoLiveProgramUpsertObject] = []
+        for upsert_object in upsert_objects:
+            state = self.__states.get(upsert_object.remote_niconico_content_id)
+            if state is not None:
+                state.last_seen_at = upsert_object.last_fetch_time
+
+            if (
+                state is None
+                or state.remote_niconico_user_id
+                != upsert_object.remote_niconico_user_id
+                or state.title != upsert_object.title
+                or state.status != upsert_object.status
+                or state.start_time != upsert_object.start_time
+                or state.end_time != upsert_object.end_time
+                or upsert_object.last_fetch_time - state.last_upserted_at
+                >= heartbeat_interval
+            ):
+                changed_upsert_objects.append(upsert_object)
+
+        return changed_upsert_objects
+
+    def mark_upserted(
+        self,
+        upsert_objects: Iterable[LiveInboxApiNiconicoLiveProgramUpsertObject],
+    ) -> None:
+        """
+        書き込みに成功した番組の状態を記録する
+        """
+
+        for upsert_object in upsert_objects:
+            previous_state = self.__states.get(upsert_object.remote_niconico_content_id)
+            if previous_state is not None:
+                self.__discard_user_content_id(
+                    remote_niconico_user_id=previous_state.remote_niconico_user_id,
+                    remote_niconico_content_id=upsert_object.remote_niconico_content_id,
+                )
+
+            self.__remote_niconico_content_ids_by_remote_niconico_user_id.setdefault(
+                upsert_object.remote_niconico_user_id, set()
+            ).add(upsert_object.remote_niconico_content_id)
+
+            self.__states[upsert_object.remote_niconico_content_id] = (
+                NiconicoLiveProgramState(
+                    remote_niconico_user_id=upsert_object.remote_niconico_user_id,
+                    title=upsert_object.title,
+                    status=upsert_object.status,
+                    start_time=upsert_object.start_time,
+                    end_time=upsert_object.end_time,
+                    last_upserted_at=upsert_object.last_fetch_time,
+                    last_seen_at=upsert_object.last_fetch_time,
+                )
+            )
+
+    def prune(
+        self,
+        now: datetime,
+    ) -> int:
+        """
+        heartbeat_intervalの2倍以上取得されていない番組の状態を破棄し、破棄した件数を返す
+
+        破棄した番組を再び取得した場合は新規として書き込まれる
+        """
+
+        expires_before = now - self.heartbeat_interval * 2
+
+        expired_remote_niconico_content_ids = [
+            remote_niconico_content_id
+            for remote_niconico_content_id, state in self.__states.items()
+            if state.last_seen_at < expires_before
+        ]
+        for remote_niconico_content_id in expired_remote_niconico_content_ids:
+            state = self.__states.pop(remote_niconico_content_id)
+            self.__discard_user_content_id(
+                remote_niconico_user_id=state.remote_niconico_user_id,
+                remote_niconico_content_id=remote_niconico_content_id,
+            )
+
+        return len(expired_remote_niconico_content_ids)
+
+    def __discard_user_content_id(
+        self,
+        remote_niconico_user_id: str,
+        remote_niconico_content_id: str,
+    ) -> None:
+        remote_niconico_content_ids = (
+            self.__remote_niconico_content_ids_by_remote_niconico_user_id.get(
+                remote_niconico_user_id
+            )
+        )
+        if remote_niconico_content_ids is None:
+            return
+
+        remote_niconico_content_ids.discard(remote_niconico_content_id)
+        if len(remote_niconico_content_ids) == 0:
+            del self.__remote_niconico_content_ids_by_remote_niconico_user_id[
+                remote_niconico_user_id
+            ]
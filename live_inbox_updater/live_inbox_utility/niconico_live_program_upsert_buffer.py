@@ -0,0 +1,111 @@
+import asyncio
+from logging import getLogger
+from typing import Iterable
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramManager,
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+from ..metrics import UpdaterMetrics
+from .niconico_live_program_state_store import NiconicoLiveProgramStateStore
+
+logger = getLogger(__name__)
+
+
+class NiconicoLiveProgramUpsertBuffer:
+    """
+    複数ユーザ分の番組のupsertをまとめて、flush_sizeごとに書き込む
+
+    同じ番組が複数回追加された場合は最後に追加されたものだけを書き込む。
+    state_storeを指定した場合は、前回から変化のない番組を追加せず、
+    書き込みに成功した番組の状態をstate_storeに記録する。
+    metricsを指定した場合は、書き込んだ件数と省いた件数を加算する
+    """
+
+    def __init__(
+        self,
+        niconico_live_program_manager: LiveInboxApiNiconicoLiveProgramManager,
+        flush_size: int,
+        state_store: NiconicoLiveProgramStateStore | None = None,
+        metrics: UpdaterMetrics | None = None,
+    ):
+        if flush_size < 1:
+            raise ValueError("flush_size must be >= 1")
+
+        self.niconico_live_program_manager = niconico_live_program_manager
+        self.flush_size = flush_size
+        self.state_store = state_store
+        self.metrics = metrics
+
+        self.upserted_count = 0
+        self.skipped_count = 0
+
+        self.__upsert_objects: dict[
+            str, LiveInboxApiNiconicoLiveProgramUpsertObject
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self.__upsert_objects)
+
+    def add_all(
+        self,
+        upsert_objects: Iterable[LiveInboxApiNiconicoLiveProgramUpsertObject],
+    ) -> int:
+        """
+        番組を追加し、実際に追加した件数を返す
+        """
+
+        state_store = self.state_store
+
+        upsert_objects = list(upsert_objects)
+        changed_upsert_objects = upsert_objects
+        if state_store is not None:
+            changed_upsert_objects = state_store.filter_changed(
+                upsert_objects=upsert_objects,
+            )
+
+        skipped_count = len(upsert_objects) - len(changed_upsert_objects)
+        self.skipped_count += skipped_count
+        if self.metrics is not None:
+            self.metrics.programs_skipped.inc(skipped_count)
+
+        for upsert_object in changed_upsert_objects:
+            self.__upsert_objects[upsert_object.remote_niconico_content_id] = (
+                upsert_object
+            )
+
+        return len(changed_upsert_objects)
+
+    def is_full(self) -> bool:
+        return len(self.__upsert_objects) >= self.flush_size
+
+    async def flush_async(
+        self,
+    ) -> list[LiveInboxApiNiconicoLiveProgramUpsertObject]:
+        """
+        溜まっている番組を全て書き込み、書き込んだ番組を返す
+        """
+
+        niconico_live_program_manager = self.niconico_live_program_manager
+        state_store = self.state_store
+
+        # awaitより前に取り出すことで、書き込み中に追加された番組を次回に回す
+        upsert_objects = list(self.__upsert_objects.values())
+        self.__upsert_objects = {}
+
+        if len(upsert_objects) == 0:
+            return []
+
+        await asyncio.to_thread(
+            niconico_live_program_manager.upsert_all,
+            upsert_objects=upsert_objects,
+        )
+
+        if state_store is not None:
+            state_store.mark_upserted(upsert_objects=upsert_objects)
+
+        self.upserted_count += len(upsert_objects)
+        if self.metrics is not None:
+            self.metrics.programs_upserted.inc(len(upsert_objects))
+
+        return upsert_objects
@@ -0,0 +1,216 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Iterable
+
+from ..live_inbox_api.niconico_user_manager import (
+    LiveInboxApiNiconicoUser,
+    LiveInboxApiNiconicoUserManager,
+)
+from .niconico_user_shard import NiconicoUserShard
+from .update_cycle_context import UpdateCycleContext
+
+logger = getLogger(__name__)
+
+# 更新日時の前後関係が前後して取りこぼさないよう、カーソルより少し前から取得し直す
+INCREMENTAL_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class NiconicoUserIndex:
+    """
+    更新サイクルをまたいで保持するユーザ一覧
+
+    incrementalの場合、前回までに見たupdated_atをカーソルとして、変更されたユーザだけを取得する。
+    full_resync_intervalごとに全件を取得し直し、取りこぼしや削除を反映する
+
+    shardを指定した場合は、このレプリカが担当するユーザだけを保持する
+    """
+
+    def __init__(
+        self,
+        niconico_user_manager: LiveInboxApiNiconicoUserManager,
+        incremental: bool,
+        full_resync_interval: timedelta,
+        shard: NiconicoUserShard | None,
+    ):
+        self.niconico_user_manager = niconico_user_manager
+        self.incremental = incremental
+        self.full_resync_interval = full_resync_interval
+        self.shard = shard
+
+        self.__lock = threading.Lock()
+        self.__niconico_users_by_remote_niconico_user_id: dict[
+            str, LiveInboxApiNiconicoUser
+        ] = {}
+        self.__cursor: datetime | None = None
+        self.__full_synced_at: float | None = None
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__niconico_users_by_remote_niconico_user_id)
+
+    def is_full_resync_due(self) -> bool:
+        if not self.incremental:
+            return True
+
+        full_synced_at = self.__full_synced_at
+        if full_synced_at is None:
+            return True
+
+        return (
+            time.monotonic() - full_synced_at
+            >= self.full_resync_interval.total_seconds()
+        )
+
+    def sync(self) -> None:
+        """
+        ユーザ一覧をHasuraと同期する
+        """
+
+        niconico_user_manager = self.niconico_user_manager
+
+        if not self.incremental:
+            self.__replace(niconico_users=niconico_user_manager.get_all())
+            return
+
+        if self.is_full_resync_due() or self.__cursor is None:
+            self.__replace(
+                niconico_users=niconico_user_manager.get_updated_since(
+                    updated_after=None,
+                ),
+            )
+            self.__full_synced_at = time.monotonic()
+            return
+
+        niconico_users = niconico_user_manager.get_updated_since(
+            updated_after=self.__cursor - INCREMENTAL_SYNC_OVERLAP,
+        )
+        self.apply(niconico_users=niconico_users)
+
+    def get_cursor(self) -> datetime | None:
+        """
+        変更の取得を再開するときの起点を返す。一度も同期していなければNoneを返す
+        """
+
+        with self.__lock:
+            cursor = self.__cursor
+
+        if cursor is None:
+            return None
+
+        return cursor - INCREMENTAL_SYNC_OVERLAP
+
+    def __replace(
+        self,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+    ) -> None:
+        """
+        新しい一覧とカーソルをロックの外で作り、ロックを1回取って両方を置き換える
+
+        置き換えの途中の、空や作りかけの一覧は他のスレッドから見えない
+        """
+
+        niconico_users_by_remote_niconico_user_id: dict[
+            str, LiveInboxApiNiconicoUser
+        ] = {}
+        cursor, _ = self.__merge(
+            niconico_users_by_remote_niconico_user_id=niconico_users_by_remote_niconico_user_id,
+            cursor=None,
+            niconico_users=niconico_users,
+        )
+
+        with self.__lock:
+            self.__niconico_users_by_remote_niconico_user_id = (
+                niconico_users_by_remote_niconico_user_id
+            )
+            self.__cursor = cursor
+
+        logger.info(
+            f"Fully synced {len(niconico_users_by_remote_niconico_user_id)} "
+            "niconico_users"
+        )
+
+    def apply(
+        self,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+    ) -> int:
+        """
+        追加・変更されたユーザを反映し、変わったユーザの数を返す
+        """
+
+        with self.__lock:
+            self.__cursor, changed_count = self.__merge(
+                niconico_users_by_remote_niconico_user_id=self.__niconico_users_by_remote_niconico_user_id,
+                cursor=self.__cursor,
+                niconico_users=niconico_users,
+            )
+
+        if changed_count > 0:
+            logger.info(f"Applied {changed_count} changed niconico_users")
+
+        return changed_count
+
+    def __merge(
+        self,
+        niconico_users_by_remote_niconico_user_id: dict[str, LiveInboxApiNiconicoUser],
+        cursor: datetime | None,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+    ) -> tuple[datetime | None, int]:
+        """
+        niconico_users_by_remote_niconico_user_idにユーザを反映し、
+        進めたカーソルと変わったユーザの数を返す
+        """
+
+        shard = self.shard
+
+        changed_count = 0
+        for niconico_user in niconico_users:
+            remote_niconico_user_id = niconico_user.remote_niconico_user_id
+
+            # 担当外のユーザも、変更の取得位置を進めるためカーソルには反映する
+            updated_at = niconico_user.updated_at
+            if updated_at is not None and (cursor is None or cursor < updated_at):
+                cursor = updated_at
+
+            if shard is not None and not shard.contains(
+                key=remote_niconico_user_id,
+            ):
+                continue
+
+            current_niconico_user = niconico_users_by_remote_niconico_user_id.get(
+                remote_niconico_user_id
+            )
+            if current_niconico_user != niconico_user:
+                niconico_users_by_remote_niconico_user_id[remote_niconico_user_id] = (
+                    niconico_user
+                )
+                changed_count += 1
+
+        return cursor, changed_count
+
+    def create_update_cycle_context(self) -> UpdateCycleContext:
+        with self.__lock:
+            niconico_users = list(
+                self.__niconico_users_by_remote_niconico_user_id.values()
+            )
+
+        update_cycle_context = UpdateCycleContext(niconico_users=niconico_users)
+
+        logger.info(
+            f"Found {len(update_cycle_context.enabled_niconico_users)} "
+            "enabled niconico_users"
+        )
+
+        return update_cycle_context
+
+
+def sync_update_cycle_context(
+    niconico_user_index: NiconicoUserIndex,
+) -> UpdateCycleContext:
+    """
+    ユーザ一覧を同期し、更新サイクルで使うスナップショットを作る
+    """
+
+    niconico_user_index.sync()
+    return niconico_user_index.create_update_cycle_context()
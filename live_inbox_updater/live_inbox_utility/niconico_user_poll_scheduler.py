@@ -0,0 +1,202 @@
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Iterable, Sequence
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+
+# 配信間隔（または最後の配信からの経過時間）に対するポーリング間隔の比率。
+# 毎日配信するユーザは15分ごと、週1回のユーザは約1.75時間ごとに確認する
+ACTIVITY_GAP_POLL_INTERVAL_RATIO = 1 / 96
+
+
+def compute_niconico_user_poll_interval(
+    upsert_objects: Sequence[LiveInboxApiNiconicoLiveProgramUpsertObject],
+    now: datetime,
+    min_interval: timedelta,
+    base_interval: timedelta,
+    max_interval: timedelta,
+) -> timedelta:
+    """
+    ユーザの最近の番組から、次にポーリングするまでの間隔を決める
+
+    - 放送中の番組がある: min_interval
+    - 予約中の番組がある: 開始時刻まで（min_interval以上base_interval以下）
+    - それ以外: 配信頻度と最後の配信からの経過時間に応じて
+      base_intervalからmax_intervalの間で長くする
+    """
+
+    statuses = {upsert_object.status for upsert_object in upsert_objects}
+    if "ON_AIR" in statuses:
+        return min_interval
+
+    if "RESERVED" in statuses:
+        until_begin = base_interval
+        for upsert_object in upsert_objects:
+            if upsert_object.status != "RESERVED" or upsert_object.start_time is None:
+                continue
+
+            until_begin = min(until_begin, upsert_object.start_time - now)
+
+        return max(min_interval, min(base_interval, until_begin))
+
+    start_times = sorted(
+        (
+            upsert_object.start_time
+            for upsert_object in upsert_objects
+            if upsert_object.start_time is not None
+        ),
+        reverse=True,
+    )
+    if len(start_times) == 0:
+        return max_interval
+
+    since_last_broadcast = now - start_times[0]
+
+    activity_gap = since_last_broadcast
+    if len(start_times) >= 2:
+        mean_broadcast_gap = (start_times[0] - start_times[-1]) / (len(start_times) - 1)
+        activity_gap = max(activity_gap, mean_broadcast_gap)
+
+    interval = activity_gap * ACTIVITY_GAP_POLL_INTERVAL_RATIO
+    return max(base_interval, min(max_interval, interval))
+
+
+class NiconicoUserPollScheduler:
+    """
+    ユーザごとの次回ポーリング時刻を優先度付きキューで管理する
+    """
+
+    def __init__(
+        self,
+        min_interval: timedelta,
+        base_interval: timedelta,
+        max_interval: timedelta,
+    ):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+
+        self.__heap: list[tuple[datetime, int, str]] = []
+        self.__counter = itertools.count()
+        self.__next_poll_at: dict[str, datetime] = {}
+        self.__remote_niconico_user_ids: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.__remote_niconico_user_ids)
+
+    def sync_users(
+        self,
+        remote_niconico_user_ids: Iterable[str],
+        now: datetime,
+    ) -> None:
+        """
+        ポーリング対象のユーザを置き換える。新しいユーザはすぐにポーリングする
+        """
+
+        new_remote_niconico_user_ids = set(remote_niconico_user_ids)
+
+        for remote_niconico_user_id in (
+            self.__remote_niconico_user_ids - new_remote_niconico_user_ids
+        ):
+            self.__next_poll_at.pop(remote_niconico_user_id, None)
+
+        added_remote_niconico_user_ids = (
+            new_remote_niconico_user_ids - self.__remote_niconico_user_ids
+        )
+        self.__remote_niconico_user_ids = new_remote_niconico_user_ids
+
+        for remote_niconico_user_id in added_remote_niconico_user_ids:
+            self.schedule(remote_niconico_user_id=remote_niconico_user_id, at=now)
+
+    def schedule(
+        self,
+        remote_niconico_user_id: str,
+        at: datetime,
+        earlier_only: bool = False,
+    ) -> None:
+        """
+        ユーザの次回ポーリング時刻を設定する
+
+        earlier_only: 既に設定されている時刻より早い場合だけ設定する
+        """
+
+        if remote_niconico_user_id not in self.__remote_niconico_user_ids:
+            return
+
+        next_poll_at = self.__next_poll_at.get(remote_niconico_user_id)
+        if earlier_only and next_poll_at is not None and next_poll_at <= at:
+            return
+
+        self.__next_poll_at[remote_niconico_user_id] = at
+        heapq.heappush(
+            self.__heap,
+            (at, next(self.__counter), remote_niconico_user_id),
+        )
+
+    def reschedule(
+        self,
+        remote_niconico_user_id: str,
+        upsert_objects: Sequence[LiveInboxApiNiconicoLiveProgramUpsertObject],
+        now: datetime,
+    ) -> datetime:
+        """
+        取得した番組から次回ポーリング時刻を決めて設定し、その時刻を返す
+        """
+
+        interval = compute_niconico_user_poll_interval(
+            upsert_objects=upsert_objects,
+            now=now,
+            min_interval=self.min_interval,
+            base_interval=self.base_interval,
+            max_interval=self.max_interval,
+        )
+
+        next_poll_at = now + interval
+        self.schedule(remote_niconico_user_id=remote_niconico_user_id, at=next_poll_at)
+
+        return next_poll_at
+
+    def get_user_next_poll_at(
+        self,
+        remote_niconico_user_id: str,
+    ) -> datetime | None:
+        return self.__next_poll_at.get(remote_niconico_user_id)
+
+    def __discard_stale_entries(self) -> None:
+        # 再設定や削除で古くなったエントリはキューの先頭に来たときに捨てる
+        heap = self.__heap
+        while len(heap) > 0:
+            at, _, remote_niconico_user_id = heap[0]
+            if self.__next_poll_at.get(remote_niconico_user_id) == at:
+                return
+
+            heapq.heappop(heap)
+
+    def get_next_poll_at(self) -> datetime | None:
+        self.__discard_stale_entries()
+        if len(self.__heap) == 0:
+            return None
+
+        return self.__heap[0][0]
+
+    def pop_due(
+        self,
+        now: datetime,
+    ) -> str | None:
+        """
+        ポーリング時刻を過ぎたユーザを1人取り出す。該当者がいなければNoneを返す
+
+        取り出したユーザは、再設定されるまで再び取り出されない
+        """
+
+        next_poll_at = self.get_next_poll_at()
+        if next_poll_at is None or now < next_poll_at:
+            return None
+
+        _, _, remote_niconico_user_id = heapq.heappop(self.__heap)
+        del self.__next_poll_at[remote_niconico_user_id]
+
+        return remote_niconico_user_id
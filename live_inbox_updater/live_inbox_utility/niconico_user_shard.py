@@ -0,0 +1,32 @@
+import hashlib
+
+from pydantic import BaseModel
+
+
+def get_shard_index(
+    key: str,
+    shard_count: int,
+) -> int:
+    """
+    keyが属するシャードの番号を返す
+
+    レプリカ間で同じ値になるよう、プロセスごとに値が変わるhash()ではなく内容から計算する
+    """
+
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+class NiconicoUserShard(BaseModel):
+    """
+    このレプリカが担当する範囲。ユーザはremote_niconico_user_idで、アイコンはURLで分ける
+    """
+
+    index: int
+    count: int
+
+    def contains(
+        self,
+        key: str,
+    ) -> bool:
+        return get_shard_index(key=key, shard_count=self.count) == self.index
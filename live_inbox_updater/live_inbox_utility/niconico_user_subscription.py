@@ -0,0 +1,37 @@
+import asyncio
+from datetime import timedelta
+from logging import getLogger
+from typing import Callable
+
+from ..live_inbox_api.niconico_user_manager import LiveInboxApiNiconicoUserSubscriber
+from .niconico_user_index import NiconicoUserIndex
+
+logger = getLogger(__name__)
+
+
+async def run_niconico_user_subscription_forever(
+    niconico_user_subscriber: LiveInboxApiNiconicoUserSubscriber,
+    niconico_user_index: NiconicoUserIndex,
+    on_changed: Callable[[], None],
+    reconnect_delay: timedelta,
+) -> None:
+    """
+    追加・変更されたユーザを受け取り続け、ユーザ一覧に反映する
+
+    ユーザ一覧が変わったときはon_changedを呼ぶ。
+    接続が切れたときはreconnect_delay待ってから、ユーザ一覧のカーソルから受け取り直す
+    """
+
+    while True:
+        try:
+            subscription = niconico_user_subscriber.subscribe_updated_since(
+                updated_after=niconico_user_index.get_cursor(),
+            )
+            async for niconico_users in subscription:
+                changed_count = niconico_user_index.apply(niconico_users=niconico_users)
+                if changed_count > 0:
+                    on_changed()
+        except Exception:
+            logger.exception("Failed to subscribe niconico users")
+
+        await asyncio.sleep(reconnect_delay.total_seconds())
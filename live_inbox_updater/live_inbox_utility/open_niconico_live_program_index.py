@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Iterable
+
+from pydantic import BaseModel
+
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastProgram,
+)
+
+logger = getLogger(__name__)
+
+
+class OpenNiconicoLiveProgram(BaseModel):
+    remote_niconico_content_id: str
+    remote_niconico_user_id: str
+    status: str
+    open_time: datetime | None
+    start_time: datetime | None
+    scheduled_end_time: datetime | None
+
+    def get_transition_times(self) -> list[datetime]:
+        """
+        状態が変わると見込まれる時刻を返す
+
+        - RESERVED: 開場時刻と開始時刻
+        - ON_AIR: 終了予定時刻
+        """
+
+        transition_times: list[datetime | None] = []
+        if self.status == "RESERVED":
+            transition_times = [self.open_time, self.start_time]
+        elif self.status == "ON_AIR":
+            transition_times = [self.scheduled_end_time]
+
+        return [
+            transition_time
+            for transition_time in transition_times
+            if transition_time is not None
+        ]
+
+
+class OpenNiconicoLiveProgramIndex:
+    """
+    ENDEDになっていない番組をユーザごとに保持する
+
+    最新の番組一覧から外れた番組も、ENDEDを確認するかユーザの番組一覧から
+    見つからなくなるまで保持し続ける
+    """
+
+    def __init__(
+        self,
+        recheck_delay: timedelta,
+    ):
+        self.recheck_delay = recheck_delay
+
+        self.__programs_by_remote_niconico_user_id: dict[
+            str, dict[str, OpenNiconicoLiveProgram]
+        ] = {}
+
+    def __len__(self) -> int:
+        return sum(
+            len(programs)
+            for programs in self.__programs_by_remote_niconico_user_id.values()
+        )
+
+    def get_remote_niconico_content_ids(
+        self,
+        remote_niconico_user_id: str,
+    ) -> set[str]:
+        programs = self.__programs_by_remote_niconico_user_id.get(
+            remote_niconico_user_id, {}
+        )
+        return set(programs.keys())
+
+    def update(
+        self,
+        remote_niconico_user_id: str,
+        programs: Iterable[NiconicoApiNiconicoUserBroadcastProgram],
+        lost_remote_niconico_content_ids: Iterable[str] = (),
+    ) -> None:
+        """
+        取得したユーザの番組で更新する
+
+        lost_remote_niconico_content_ids: 番組一覧を遡っても見つからなかった番組。
+        削除や非公開化によりENDEDを確認できないため、追跡をやめる
+        """
+
+        open_programs = self.__programs_by_remote_niconico_user_id.setdefault(
+            remote_niconico_user_id, {}
+        )
+
+        for program in programs:
+            if program.status == "ENDED":
+                open_programs.pop(program.niconico_content_id, None)
+                continue
+
+            open_programs[program.niconico_content_id] = OpenNiconicoLiveProgram(
+                remote_niconico_content_id=program.niconico_content_id,
+                remote_niconico_user_id=remote_niconico_user_id,
+                status=program.status,
+                open_time=program.open_time,
+                start_time=program.start_time,
+                scheduled_end_time=program.scheduled_end_time,
+            )
+
+        for remote_niconico_content_id in lost_remote_niconico_content_ids:
+            if open_programs.pop(remote_niconico_content_id, None) is not None:
+                logger.warning(
+                    f"{remote_niconico_content_id}: Not found in the broadcast history "
+                    f"of niconico_user[remote_niconico_user_id={remote_niconico_user_id}]. "
+                    "Stopped tracking"
+                )
+
+        if len(open_programs) == 0:
+            del self.__programs_by_remote_niconico_user_id[remote_niconico_user_id]
+
+    def get_next_recheck_at(
+        self,
+        remote_niconico_user_id: str,
+        now: datetime,
+    ) -> datetime | None:
+        """
+        ユーザの番組の状態が次に変わると見込まれる時刻の、recheck_delay後を返す
+        """
+
+        recheck_delay = self.recheck_delay
+
+        programs = self.__programs_by_remote_niconico_user_id.get(
+            remote_niconico_user_id, {}
+        )
+
+        next_recheck_at: datetime | None = None
+        for program in programs.values():
+            for transition_time in program.get_transition_times():
+                recheck_at = transition_time + recheck_delay
+                if recheck_at <= now:
+                    continue
+
+                if next_recheck_at is None or recheck_at < next_recheck_at:
+                    next_recheck_at = recheck_at
+
+        return next_recheck_at
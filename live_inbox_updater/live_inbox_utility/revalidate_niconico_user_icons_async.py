@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadata,
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+)
+from ..niconico_api.niconico_user_icon_client import (
+    NiconicoApiNiconicoUserIconAsyncClient,
+)
+from .fetch_uncached_niconico_user_icons_async import NiconicoUserIconPipelineConfig
+from .niconico_user_shard import NiconicoUserShard
+from .store_niconico_user_icon import store_niconico_user_icon
+
+logger = getLogger(__name__)
+
+
+async def revalidate_niconico_user_icons_async(
+    niconico_user_icon_async_client: NiconicoApiNiconicoUserIconAsyncClient,
+    niconico_user_icon_cache_metadata_manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+    niconico_user_icon_cache_storage_manager: LiveInboxApiNiconicoUserIconCacheStorageManager,
+    config: NiconicoUserIconPipelineConfig,
+    shard: NiconicoUserShard | None,
+) -> None:
+    """
+    取得済みのユーザアイコンが消滅・変更されていないか確認する
+
+    revalidation_interval秒以上確認していないアイコンを、古い順に最大revalidation_batch_size件、
+    保存済みのETag/Last-Modifiedを使った条件付きリクエストで確認する
+
+    - 304: 確認日時だけを更新する
+    - 404/410: 削除済みとして記録する
+    - 内容が変わっていた場合: 新しい内容を保存し、メタデータを更新する
+
+    shardを指定した場合は、候補のうちこのレプリカが担当するURLだけを確認する。
+    担当分がrevalidation_batch_size件ほどになるよう、シャード数倍の候補を取得する
+    """
+
+    revalidation_batch_size = config.revalidation_batch_size
+    if revalidation_batch_size < 1:
+        return
+
+    candidate_limit = revalidation_batch_size
+    if shard is not None:
+        candidate_limit *= shard.count
+
+    now = datetime.now(tz=timezone.utc)
+    icon_cache_metadatas = await asyncio.to_thread(
+        niconico_user_icon_cache_metadata_manager.get_revalidation_candidates,
+        validated_before=now - timedelta(seconds=config.revalidation_interval),
+        limit=candidate_limit,
+    )
+    if shard is not None:
+        icon_cache_metadatas = [
+            icon_cache_metadata
+            for icon_cache_metadata in icon_cache_metadatas
+            if shard.contains(key=icon_cache_metadata.url)
+        ][:revalidation_batch_size]
+    if len(icon_cache_metadatas) == 0:
+        return
+
+    not_modified_urls: list[str] = []
+    gone_urls: list[str] = []
+    modified_icon_cache_metadatas: list[LiveInboxApiNiconicoUserIconCacheMetadata] = []
+
+    semaphore = asyncio.Semaphore(config.download_concurrency)
+
+    async def _revalidate(
+        icon_cache_metadata: LiveInboxApiNiconicoUserIconCacheMetadata,
+    ) -> None:
+        icon_url = icon_cache_metadata.url
+
+        try:
+            async with semaphore:
+                revalidation = await niconico_user_icon_async_client.revalidate(
+                    url=icon_url,
+                    etag=icon_cache_metadata.etag,
+                    last_modified=icon_cache_metadata.last_modified,
+                )
+
+            if revalidation.status == "not_modified":
+                not_modified_urls.append(icon_url)
+                return
+
+            if revalidation.status == "gone":
+                logger.info(f"niconico user icon is gone: {icon_url}")
+                gone_urls.append(icon_url)
+                return
+
+            niconico_user_icon = revalidation.icon
+            if niconico_user_icon is None:
+                raise Exception("Unexpected state.")
+
+            # 条件付きリクエストに対応していない場合は内容を比べ、同じなら保存し直さない
+            hash_md5 = hashlib.md5(niconico_user_icon.content).hexdigest()
+            if (
+                hash_md5 == icon_cache_metadata.hash_md5
+                and niconico_user_icon.content_type == icon_cache_metadata.content_type
+            ):
+                modified_icon_cache_metadatas.append(
+                    icon_cache_metadata.model_copy(
+                        update={
+                            "etag": niconico_user_icon.etag,
+                            "last_modified": niconico_user_icon.last_modified,
+                            "revalidated_at": now,
+                        },
+                    ),
+                )
+                return
+
+            logger.info(f"niconico user icon is modified: {icon_url}")
+            stored_icon_cache_metadata = await asyncio.to_thread(
+                store_niconico_user_icon,
+                niconico_user_icon=niconico_user_icon,
+                fetched_at=now,
+                niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                content_addressed=config.content_addressed,
+            )
+            modified_icon_cache_metadatas.append(
+                stored_icon_cache_metadata.model_copy(
+                    update={
+                        "revalidated_at": now,
+                    },
+                ),
+            )
+        except Exception:
+            logger.exception(f"Failed to revalidate niconico user icon: {icon_url}")
+
+    async with asyncio.TaskGroup() as task_group:
+        for icon_cache_metadata in icon_cache_metadatas:
+            task_group.create_task(_revalidate(icon_cache_metadata))
+
+    if len(not_modified_urls) > 0:
+        await asyncio.to_thread(
+            niconico_user_icon_cache_metadata_manager.touch_revalidated,
+            urls=not_modified_urls,
+            revalidated_at=now,
+        )
+
+    if len(gone_urls) > 0:
+        await asyncio.to_thread(
+            niconico_user_icon_cache_metadata_manager.mark_gone,
+            urls=gone_urls,
+            gone_at=now,
+        )
+
+    if len(modified_icon_cache_metadatas) > 0:
+        await asyncio.to_thread(
+            niconico_user_icon_cache_metadata_manager.save_all,
+            metadatas=modified_icon_cache_metadatas,
+        )
+
+    logger.info(
+        f"Revalidated {len(icon_cache_metadatas)} niconico user icons: "
+        f"{len(not_modified_urls)} not modified, {len(gone_urls)} gone, "
+        f"{len(modified_icon_cache_metadatas)} updated"
+    )
@@ -0,0 +1,47 @@
+import hashlib
+import uuid
+from datetime import datetime
+
+from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadata,
+)
+from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+)
+from ..niconico_api.niconico_user_icon_client import NiconicoApiNiconicoUserIcon
+
+
+def store_niconico_user_icon(
+    niconico_user_icon: NiconicoApiNiconicoUserIcon,
+    fetched_at: datetime,
+    niconico_user_icon_cache_storage_manager: LiveInboxApiNiconicoUserIconCacheStorageManager,
+    content_addressed: bool,
+) -> LiveInboxApiNiconicoUserIconCacheMetadata:
+    """
+    ユーザアイコンをストレージに保存し、保存するメタデータを返す
+    """
+
+    if content_addressed:
+        # 同じ内容のアイコンは1つのファイルを共有する
+        file_key = niconico_user_icon_cache_storage_manager.save_content_addressed(
+            content_type=niconico_user_icon.content_type,
+            content=niconico_user_icon.content,
+        )
+    else:
+        file_key = str(uuid.uuid4())
+        niconico_user_icon_cache_storage_manager.save(
+            file_key=file_key,
+            content_type=niconico_user_icon.content_type,
+            content=niconico_user_icon.content,
+        )
+
+    return LiveInboxApiNiconicoUserIconCacheMetadata(
+        url=niconico_user_icon.url,
+        fetched_at=fetched_at,
+        file_size=len(niconico_user_icon.content),
+        hash_md5=hashlib.md5(niconico_user_icon.content).hexdigest(),
+        content_type=niconico_user_icon.content_type,
+        file_key=file_key,
+        etag=niconico_user_icon.etag,
+        last_modified=niconico_user_icon.last_modified,
+    )
@@ -0,0 +1,35 @@
+from typing import Iterable
+
+from ..live_inbox_api.niconico_user_manager import LiveInboxApiNiconicoUser
+
+
+class UpdateCycleContext:
+    """
+    1回の更新サイクルで各処理が共有する、有効なユーザのスナップショット
+    """
+
+    def __init__(
+        self,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+    ):
+        enabled_niconico_users = list(
+            filter(lambda niconico_user: niconico_user.enabled, niconico_users),
+        )
+
+        self.enabled_niconico_users = enabled_niconico_users
+        self.enabled_niconico_users_by_remote_niconico_user_id: dict[
+            str, LiveInboxApiNiconicoUser
+        ] = {
+            niconico_user.remote_niconico_user_id: niconico_user
+            for niconico_user in enabled_niconico_users
+        }
+
+    def get_enabled_niconico_user_icon_urls(self) -> set[str]:
+        icon_urls: set[str] = set()
+        for niconico_user in self.enabled_niconico_users:
+            if niconico_user.icon_url is None:
+                continue
+
+            icon_urls.add(niconico_user.icon_url)
+
+        return icon_urls
@@ -0,0 +1,105 @@
+import asyncio
+from logging import getLogger
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+)
+from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
+    LiveInboxApiNiconicoUserIconCacheStorageManager,
+)
+from ..metrics import UpdaterMetrics
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+)
+from ..niconico_api.niconico_user_icon_client import (
+    NiconicoApiNiconicoUserIconAsyncClient,
+)
+from ..tracing import Tracer, trace_span
+from .fetch_uncached_niconico_user_icons_async import (
+    NiconicoUserIconPipelineConfig,
+    fetch_uncached_niconico_user_icons_async,
+)
+from .niconico_live_program_state_store import NiconicoLiveProgramStateStore
+from .niconico_user_index import NiconicoUserIndex, sync_update_cycle_context
+from .open_niconico_live_program_index import OpenNiconicoLiveProgramIndex
+from .revalidate_niconico_user_icons_async import revalidate_niconico_user_icons_async
+from .update_niconico_live_programs_async import update_niconico_live_programs_async
+from .update_stage import observe_update_stage
+
+logger = getLogger(__name__)
+
+
+async def update_job_async(
+    niconico_user_index: NiconicoUserIndex,
+    niconico_user_icon_async_client: NiconicoApiNiconicoUserIconAsyncClient,
+    niconico_user_icon_cache_storage_manager: LiveInboxApiNiconicoUserIconCacheStorageManager,
+    niconico_user_icon_cache_metadata_manager: LiveInboxApiNiconicoUserIconCacheMetadataManager,
+    niconico_user_icon_pipeline_config: NiconicoUserIconPipelineConfig,
+    niconico_user_broadcast_history_async_client: NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    niconico_live_program_manager: LiveInboxApiNiconicoLiveProgramManager,
+    niconico_live_program_state_store: NiconicoLiveProgramStateStore,
+    open_niconico_live_program_index: OpenNiconicoLiveProgramIndex,
+    update_concurrency: int,
+    program_upsert_chunk_size: int,
+    program_history_page_size: int,
+    program_history_max_pages: int,
+    metrics: UpdaterMetrics | None,
+    tracer: Tracer | None,
+) -> None:
+    """
+    ユーザ一覧の同期、ユーザアイコンの取得・再検証、番組の更新を1サイクル行う
+
+    tracerを指定した場合は、サイクルごとに1つのトレースを記録する
+    """
+
+    with trace_span(tracer=tracer, name="update_cycle", new_trace=True):
+        # ユーザ一覧は1サイクルにつき1回だけ取得し、各処理で共有する
+        with observe_update_stage(metrics=metrics, tracer=tracer, stage="user_sync"):
+            update_cycle_context = await asyncio.to_thread(
+                sync_update_cycle_context,
+                niconico_user_index=niconico_user_index,
+            )
+
+        with observe_update_stage(metrics=metrics, tracer=tracer, stage="icon_fetch"):
+            await fetch_uncached_niconico_user_icons_async(
+                update_cycle_context=update_cycle_context,
+                niconico_user_icon_async_client=niconico_user_icon_async_client,
+                niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                config=niconico_user_icon_pipeline_config,
+            )
+
+        # 再検証に失敗しても番組の更新は続ける
+        try:
+            with observe_update_stage(
+                metrics=metrics, tracer=tracer, stage="icon_revalidation"
+            ):
+                await revalidate_niconico_user_icons_async(
+                    niconico_user_icon_async_client=niconico_user_icon_async_client,
+                    niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                    niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                    config=niconico_user_icon_pipeline_config,
+                    shard=niconico_user_index.shard,
+                )
+        except Exception:
+            logger.exception("Failed to revalidate niconico user icons")
+
+        with observe_update_stage(
+            metrics=metrics, tracer=tracer, stage="program_update"
+        ):
+            await update_niconico_live_programs_async(
+                update_cycle_context=update_cycle_context,
+                niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                niconico_live_program_manager=niconico_live_program_manager,
+                niconico_live_program_state_store=niconico_live_program_state_store,
+                open_niconico_live_program_index=open_niconico_live_program_index,
+                concurrency=update_concurrency,
+                upsert_flush_size=program_upsert_chunk_size,
+                history_page_size=program_history_page_size,
+                history_max_pages=program_history_max_pages,
+                metrics=metrics,
+                tracer=tracer,
+            )
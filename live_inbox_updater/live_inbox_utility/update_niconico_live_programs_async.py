@@ -0,0 +1,227 @@
+import asyncio
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Iterable
+
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramManager,
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+from ..live_inbox_api.niconico_user_manager import LiveInboxApiNiconicoUser
+from ..metrics import UpdaterMetrics
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    NiconicoApiNiconicoUserBroadcastProgram,
+)
+from ..tracing import Tracer, trace_span
+from .niconico_live_program_state_store import NiconicoLiveProgramStateStore
+from .niconico_live_program_upsert_buffer import NiconicoLiveProgramUpsertBuffer
+from .open_niconico_live_program_index import OpenNiconicoLiveProgramIndex
+from .update_cycle_context import UpdateCycleContext
+
+logger = getLogger(__name__)
+
+
+async def update_niconico_live_programs_async(
+    update_cycle_context: UpdateCycleContext,
+    niconico_user_broadcast_history_async_client: NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    niconico_live_program_manager: LiveInboxApiNiconicoLiveProgramManager,
+    niconico_live_program_state_store: NiconicoLiveProgramStateStore,
+    open_niconico_live_program_index: OpenNiconicoLiveProgramIndex,
+    concurrency: int,
+    upsert_flush_size: int,
+    history_page_size: int,
+    history_max_pages: int,
+    metrics: UpdaterMetrics | None,
+    tracer: Tracer | None,
+) -> None:
+    """
+    有効なユーザの番組を最大concurrency件並行して取得・更新する
+
+    前回から変化のない番組は書き込まず、変化した番組だけを
+    ユーザをまたいでまとめてupsert_flush_size件ごとに書き込む。
+    tracerを指定した場合は、ユーザごとの取得をスパンとして記録する
+    """
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    upsert_buffer = NiconicoLiveProgramUpsertBuffer(
+        niconico_live_program_manager=niconico_live_program_manager,
+        flush_size=upsert_flush_size,
+        state_store=niconico_live_program_state_store,
+        metrics=metrics,
+    )
+
+    enabled_niconico_users = update_cycle_context.enabled_niconico_users
+
+    logger.info(
+        f"Updating live programs of {len(enabled_niconico_users)} niconico_users "
+        f"(concurrency={concurrency})"
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _update_user(niconico_user: LiveInboxApiNiconicoUser) -> None:
+        async with semaphore:
+            try:
+                with trace_span(
+                    tracer=tracer,
+                    name="fetch_user_live_programs",
+                    attributes={
+                        "remote_niconico_user_id": niconico_user.remote_niconico_user_id,
+                    },
+                ) as span:
+                    upsert_objects = await fetch_niconico_user_live_programs_async(
+                        remote_niconico_user_id=niconico_user.remote_niconico_user_id,
+                        niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                        open_niconico_live_program_index=open_niconico_live_program_index,
+                        niconico_live_program_state_store=niconico_live_program_state_store,
+                        page_size=history_page_size,
+                        max_pages=history_max_pages,
+                    )
+                    if span is not None:
+                        span.attributes["live_programs"] = len(upsert_objects)
+            except Exception:
+                logger.exception(
+                    f"niconico_user[remote_niconico_user_id={niconico_user.remote_niconico_user_id}]: "
+                    "Failed to fetch live programs"
+                )
+                return
+
+        upsert_buffer.add_all(upsert_objects=upsert_objects)
+        if upsert_buffer.is_full():
+            try:
+                await upsert_buffer.flush_async()
+            except Exception:
+                logger.exception("Failed to upsert niconico live programs")
+
+    async with asyncio.TaskGroup() as task_group:
+        for niconico_user in enabled_niconico_users:
+            task_group.create_task(_update_user(niconico_user))
+
+    try:
+        await upsert_buffer.flush_async()
+    except Exception:
+        logger.exception("Failed to upsert niconico live programs")
+    finally:
+        niconico_live_program_state_store.prune(now=datetime.now(tz=timezone.utc))
+
+    logger.info(
+        f"Upserted {upsert_buffer.upserted_count} live programs, "
+        f"skipped {upsert_buffer.skipped_count} unchanged live programs"
+    )
+
+
+async def fetch_niconico_user_live_programs_async(
+    remote_niconico_user_id: str,
+    niconico_user_broadcast_history_async_client: NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
+    open_niconico_live_program_index: OpenNiconicoLiveProgramIndex,
+    niconico_live_program_state_store: NiconicoLiveProgramStateStore | None = None,
+    page_size: int = 10,
+    max_pages: int = 5,
+) -> list[LiveInboxApiNiconicoLiveProgramUpsertObject]:
+    """
+    ユーザの最新の番組を取得し、upsert用のオブジェクトに変換する
+
+    番組一覧はpage_size件ずつ、最大max_pagesページまで新しい順に遡り、
+    次の両方を満たすページで止める
+
+    - ENDEDのまま変わっていない書き込み済みの番組に達した
+      （niconico_live_program_state_storeにこのユーザの番組がなければ、最初のページで止める）
+    - ENDEDになっていない番組を全て見つけた
+    """
+
+    logger.info(
+        f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+        "Updating live programs"
+    )
+
+    missing_remote_niconico_content_ids = (
+        open_niconico_live_program_index.get_remote_niconico_content_ids(
+            remote_niconico_user_id=remote_niconico_user_id,
+        )
+    )
+
+    # 前回までの番組がわからない場合は、遡らずに最初のページだけを取得する
+    known_niconico_user = (
+        niconico_live_program_state_store is not None
+        and niconico_live_program_state_store.has_niconico_user(
+            remote_niconico_user_id=remote_niconico_user_id,
+        )
+    )
+
+    def _stop_at(program: NiconicoApiNiconicoUserBroadcastProgram) -> bool:
+        if len(missing_remote_niconico_content_ids) > 0:
+            return False
+
+        if niconico_live_program_state_store is None or not known_niconico_user:
+            return True
+
+        return niconico_live_program_state_store.is_ended_and_unchanged(
+            program=program,
+        )
+
+    fetch_time = datetime.now(tz=timezone.utc)
+    user_broadcast_programs: list[NiconicoApiNiconicoUserBroadcastProgram] = []
+    history_exhausted = False
+    async for page in niconico_user_broadcast_history_async_client.iter_program_pages(
+        niconico_user_id=remote_niconico_user_id,
+        page_size=page_size,
+        max_pages=max_pages,
+        stop_at=_stop_at,
+    ):
+        user_broadcast_programs.extend(page.programs)
+        missing_remote_niconico_content_ids -= {
+            program.niconico_content_id for program in page.programs
+        }
+        history_exhausted = not page.has_next
+
+        logger.info(
+            f"niconico_user[remote_niconico_user_id={remote_niconico_user_id}]: "
+            f"Fetched {len(page.programs)} live programs "
+            f"(total={page.total_count}, has_next={page.has_next})"
+        )
+
+    # 番組一覧の最後まで遡っても見つからなかった番組だけを追跡対象から外す
+    lost_remote_niconico_content_ids: set[str] = set()
+    if history_exhausted:
+        lost_remote_niconico_content_ids = missing_remote_niconico_content_ids
+
+    open_niconico_live_program_index.update(
+        remote_niconico_user_id=remote_niconico_user_id,
+        programs=user_broadcast_programs,
+        lost_remote_niconico_content_ids=lost_remote_niconico_content_ids,
+    )
+
+    for program in user_broadcast_programs:
+        logger.info(
+            f"{program.niconico_content_id}: {program.title} "
+            f"[{program.start_time} - {program.end_time}]"
+        )
+
+    return create_niconico_live_program_upsert_objects(
+        programs=user_broadcast_programs,
+        fetch_time=fetch_time,
+    )
+
+
+def create_niconico_live_program_upsert_objects(
+    programs: Iterable[NiconicoApiNiconicoUserBroadcastProgram],
+    fetch_time: datetime,
+) -> list[LiveInboxApiNiconicoLiveProgramUpsertObject]:
+    upsert_objects: list[LiveInboxApiNiconicoLiveProgramUpsertObject] = []
+    for program in programs:
+        upsert_objects.append(
+            LiveInboxApiNiconicoLiveProgramUpsertObject(
+                remote_niconico_content_id=program.niconico_content_id,
+                remote_niconico_user_id=program.niconico_user_id,
+                title=program.title,
+                status=program.status,
+                last_fetch_time=fetch_time,
+                start_time=program.start_time,
+                end_time=program.end_time,
+            ),
+        )
+
+    return upsert_objects
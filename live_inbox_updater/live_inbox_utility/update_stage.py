@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from ..metrics import UpdaterMetrics, measure_update_stage
+from ..tracing import Tracer, trace_span
+
+
+@contextmanager
+def observe_update_stage(
+    metrics: UpdaterMetrics | None,
+    tracer: Tracer | None,
+    stage: str,
+) -> Iterator[None]:
+    """
+    ブロックの所要時間をstageとして計測し、同名のスパンを記録する
+    """
+
+    with (
+        measure_update_stage(metrics=metrics, stage=stage),
+        trace_span(tracer=tracer, name=stage),
+    ):
+        yield
@@ -0,0 +1,24 @@
+from .http_transport import (
+    MetricsAsyncHttpTransport,
+    MetricsHttpTransport,
+    get_graphql_operation_name,
+    get_request_host,
+)
+from .rate_limiter import MetricsNiconicoApiRateLimiter
+from .registry import MetricsCounter, MetricsHistogram, MetricsRegistry
+from .server import start_metrics_server
+from .updater_metrics import UpdaterMetrics, measure_update_stage
+
+__all__ = [
+    "MetricsAsyncHttpTransport",
+    "MetricsHttpTransport",
+    "get_graphql_operation_name",
+    "get_request_host",
+    "MetricsNiconicoApiRateLimiter",
+    "MetricsCounter",
+    "MetricsHistogram",
+    "MetricsRegistry",
+    "start_metrics_server",
+    "UpdaterMetrics",
+    "measure_update_stage",
+]
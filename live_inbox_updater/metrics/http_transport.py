@@ -0,0 +1,165 @@
+import re
+import time
+from typing import Callable
+
+import httpx
+
+from ..http_client import wrap_async_response_on_close, wrap_response_on_close
+from .updater_metrics import UpdaterMetrics
+
+# GraphQLのクエリ文字列の先頭にある操作名。
+# JSONでは直前の改行が \n とエスケープされるため、単語境界は見ない
+GRAPHQL_OPERATION_NAME_PATTERN = re.compile(
+    rb"(?:query|mutation|subscription)\s+([A-Za-z_][A-Za-z0-9_]*)"
+)
+
+# 大きなupsertのペイロード全体を走査しないよう、先頭だけを見る
+GRAPHQL_OPERATION_NAME_SEARCH_BYTES = 512
+
+
+def get_request_host(
+    request: httpx.Request,
+) -> str:
+    return request.url.host
+
+
+def get_graphql_operation_name(
+    request: httpx.Request,
+) -> str:
+    """
+    リクエストボディのGraphQLクエリから操作名を取り出す。見つからない場合はunknownを返す
+    """
+
+    try:
+        content = request.content
+    except httpx.RequestNotRead:
+        return "unknown"
+
+    match = GRAPHQL_OPERATION_NAME_PATTERN.search(
+        content[:GRAPHQL_OPERATION_NAME_SEARCH_BYTES]
+    )
+    if match is None:
+        return "unknown"
+
+    return match.group(1).decode("ascii")
+
+
+class _RequestRecorder:
+    def __init__(
+        self,
+        metrics: UpdaterMetrics,
+        service: str,
+        target: str,
+    ):
+        self.metrics = metrics
+        self.service = service
+        self.target = target
+
+        self.started_at = time.monotonic()
+
+    def record(
+        self,
+        status: str,
+    ) -> None:
+        metrics = self.metrics
+
+        metrics.http_requests.inc(
+            labels={
+                "service": self.service,
+                "target": self.target,
+                "status": status,
+            },
+        )
+        metrics.http_request_duration.observe(
+            time.monotonic() - self.started_at,
+            labels={
+                "service": self.service,
+                "target": self.target,
+            },
+        )
+
+
+class MetricsHttpTransport(httpx.BaseTransport):
+    """
+    リクエスト数と、レスポンスボディを読み終えるまでの所要時間を記録するトランスポート
+
+    get_targetでリクエストごとのtargetラベルを決める
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        metrics: UpdaterMetrics,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.metrics = metrics
+        self.service = service
+        self.get_target = get_target
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        recorder = _RequestRecorder(
+            metrics=self.metrics,
+            service=self.service,
+            target=self.get_target(request),
+        )
+
+        try:
+            response = self.transport.handle_request(request)
+        except Exception:
+            recorder.record(status="error")
+            raise
+
+        return wrap_response_on_close(
+            response=response,
+            on_close=lambda: recorder.record(status=str(response.status_code)),
+        )
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class MetricsAsyncHttpTransport(httpx.AsyncBaseTransport):
+    """
+    MetricsHttpTransportの非同期版
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        metrics: UpdaterMetrics,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.metrics = metrics
+        self.service = service
+        self.get_target = get_target
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        recorder = _RequestRecorder(
+            metrics=self.metrics,
+            service=self.service,
+            target=self.get_target(request),
+        )
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            recorder.record(status="error")
+            raise
+
+        return wrap_async_response_on_close(
+            response=response,
+            on_close=lambda: recorder.record(status=str(response.status_code)),
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,32 @@
+from ..niconico_api.niconico_rate_limiter import NiconicoApiRateLimiter
+from .updater_metrics import UpdaterMetrics
+
+
+class MetricsNiconicoApiRateLimiter(NiconicoApiRateLimiter):
+    """
+    rate_limiterで待機した秒数をホストごとに記録する
+    """
+
+    def __init__(
+        self,
+        rate_limiter: NiconicoApiRateLimiter,
+        metrics: UpdaterMetrics,
+    ):
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+
+    def acquire(
+        self,
+        host: str,
+    ) -> float:
+        wait_seconds = self.rate_limiter.acquire(host=host)
+        self.metrics.rate_limiter_wait.observe(wait_seconds, labels={"host": host})
+        return wait_seconds
+
+    async def acquire_async(
+        self,
+        host: str,
+    ) -> float:
+        wait_seconds = await self.rate_limiter.acquire_async(host=host)
+        self.metrics.rate_limiter_wait.observe(wait_seconds, labels={"host": host})
+        return wait_seconds
@@ -0,0 +1,258 @@
+import bisect
+import math
+import threading
+from typing import Sequence
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_documentation(documentation: str) -> str:
+    return documentation.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(
+    label_names: Sequence[str],
+    label_values: Sequence[str],
+) -> str:
+    if len(label_names) == 0:
+        return ""
+
+    pairs = [
+        f'{name}="{_escape_label_value(value)}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+class MetricsCounter:
+    """
+    ラベルの組ごとに増え続ける値
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+        self.__lock = threading.Lock()
+        self.__values: dict[tuple[str, ...], float] = {}
+
+    def __get_label_values(
+        self,
+        labels: dict[str, str] | None,
+    ) -> tuple[str, ...]:
+        labels = labels or {}
+        return tuple(labels[name] for name in self.label_names)
+
+    def inc(
+        self,
+        amount: float = 1.0,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        if amount < 0:
+            raise ValueError("amount must be >= 0")
+
+        label_values = self.__get_label_values(labels=labels)
+        with self.__lock:
+            self.__values[label_values] = self.__values.get(label_values, 0.0) + amount
+
+    def get(
+        self,
+        labels: dict[str, str] | None = None,
+    ) -> float:
+        label_values = self.__get_label_values(labels=labels)
+        with self.__lock:
+            return self.__values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        with self.__lock:
+            values = dict(self.__values)
+
+        lines = [
+            f"# HELP {self.name} {_escape_documentation(self.documentation)}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label_values, value in sorted(values.items()):
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+
+        return lines
+
+
+class _HistogramState:
+    def __init__(
+        self,
+        bucket_count: int,
+    ):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+
+class MetricsHistogram:
+    """
+    ラベルの組ごとの観測値の分布
+
+    bucketsは上限の昇順で指定する。+Infのバケットは自動で追加する
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be sorted in ascending order")
+
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(float(bucket) for bucket in buckets)
+
+        self.__lock = threading.Lock()
+        self.__states: dict[tuple[str, ...], _HistogramState] = {}
+
+    def observe(
+        self,
+        value: float,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        labels = labels or {}
+        label_values = tuple(labels[name] for name in self.label_names)
+
+        # value以上の上限を持つ最初のバケットにだけ数え、出力時に累積する
+        bucket_index = bisect.bisect_left(self.buckets, value)
+
+        with self.__lock:
+            state = self.__states.get(label_values)
+            if state is None:
+                state = _HistogramState(bucket_count=len(self.buckets) + 1)
+                self.__states[label_values] = state
+
+            state.bucket_counts[bucket_index] += 1
+            state.count += 1
+            state.sum += value
+
+    def render(self) -> list[str]:
+        with self.__lock:
+            states = {
+                label_values: (list(state.bucket_counts), state.count, state.sum)
+                for label_values, state in self.__states.items()
+            }
+
+        lines = [
+            f"# HELP {self.name} {_escape_documentation(self.documentation)}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bucket_label_names = (*self.label_names, "le")
+        for label_values, (bucket_counts, count, sum_) in sorted(states.items()):
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(
+                (*self.buckets, math.inf), bucket_counts
+            ):
+                cumulative_count += bucket_count
+                labels = _format_labels(
+                    bucket_label_names,
+                    (*label_values, _format_value(upper_bound)),
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative_count}")
+
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sum_)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """
+    メトリクスをまとめ、Prometheusのテキスト形式で出力する
+
+    スレッドやイベントループをまたいで共有できる
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__metrics: dict[str, MetricsCounter | MetricsHistogram] = {}
+
+    def __register(
+        self,
+        metric: MetricsCounter | MetricsHistogram,
+    ) -> None:
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f"Duplicated metric name: {metric.name}")
+
+            self.__metrics[metric.name] = metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+    ) -> MetricsCounter:
+        counter = MetricsCounter(
+            name=name,
+            documentation=documentation,
+            label_names=label_names,
+        )
+        self.__register(metric=counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> MetricsHistogram:
+        histogram = MetricsHistogram(
+            name=name,
+            documentation=documentation,
+            label_names=label_names,
+            buckets=buckets,
+        )
+        self.__register(metric=histogram)
+        return histogram
+
+    def render(self) -> str:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
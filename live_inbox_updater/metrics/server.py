@@ -0,0 +1,54 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from typing import Any
+
+from .registry import MetricsRegistry
+
+logger = getLogger(__name__)
+
+METRICS_PATH = "/metrics"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def start_metrics_server(
+    registry: MetricsRegistry,
+    host: str,
+    port: int,
+) -> ThreadingHTTPServer:
+    """
+    /metrics でregistryの値を返すHTTPサーバをデーモンスレッドで起動する
+
+    停止する場合は返り値のshutdownを呼ぶ
+    """
+
+    class _MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != METRICS_PATH:
+                self.send_error(404)
+                return
+
+            body = registry.render().encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(
+        target=server.serve_forever,
+        name="metrics-server",
+        daemon=True,
+    )
+    thread.start()
+
+    logger.info(f"Serving metrics on http://{host}:{port}{METRICS_PATH}")
+
+    return server
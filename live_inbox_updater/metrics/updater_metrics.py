@@ -0,0 +1,115 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from .registry import MetricsRegistry
+
+CYCLE_DURATION_BUCKETS = (
+    0.1,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    600.0,
+    1800.0,
+)
+
+RATE_LIMITER_WAIT_BUCKETS = (
+    0.0,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class UpdaterMetrics:
+    """
+    updateサブコマンドで計測する値
+
+    - cycle: intervalモードの更新ジョブ1回分
+    - stage: user_sync, icon_fetch, icon_revalidation, program_update（intervalモード）、
+      user_poll（adaptiveモードのユーザ1人分の番組取得）
+    - http: serviceがniconicoの場合はホスト名、hasuraの場合はGraphQLの操作名ごと
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+    ):
+        self.registry = registry
+
+        self.cycles = registry.counter(
+            name="live_inbox_updater_cycles_total",
+            documentation="Number of update cycles by result",
+            label_names=("result",),
+        )
+        self.cycle_duration = registry.histogram(
+            name="live_inbox_updater_cycle_duration_seconds",
+            documentation="Duration of an update cycle",
+            buckets=CYCLE_DURATION_BUCKETS,
+        )
+        self.stage_duration = registry.histogram(
+            name="live_inbox_updater_stage_duration_seconds",
+            documentation="Duration of a stage in the update pipeline",
+            label_names=("stage",),
+            buckets=CYCLE_DURATION_BUCKETS,
+        )
+        self.http_requests = registry.counter(
+            name="live_inbox_updater_http_requests_total",
+            documentation="Number of outbound HTTP requests by status code",
+            label_names=("service", "target", "status"),
+        )
+        self.http_request_duration = registry.histogram(
+            name="live_inbox_updater_http_request_duration_seconds",
+            documentation="Duration of an outbound HTTP request including its body",
+            label_names=("service", "target"),
+        )
+        self.rate_limiter_wait = registry.histogram(
+            name="live_inbox_updater_rate_limiter_wait_seconds",
+            documentation="Time spent waiting for the niconico rate limiter",
+            label_names=("host",),
+            buckets=RATE_LIMITER_WAIT_BUCKETS,
+        )
+        self.programs_upserted = registry.counter(
+            name="live_inbox_updater_programs_upserted_total",
+            documentation="Number of live programs upserted",
+        )
+        self.programs_skipped = registry.counter(
+            name="live_inbox_updater_programs_skipped_total",
+            documentation="Number of unchanged live programs skipped",
+        )
+
+
+@contextmanager
+def measure_update_stage(
+    metrics: UpdaterMetrics | None,
+    stage: str,
+) -> Iterator[None]:
+    """
+    ブロック内の処理時間をstageの所要時間として記録する。例外で抜けた場合も記録する
+    """
+
+    if metrics is None:
+        yield
+        return
+
+    started_at = time.monotonic()
+    try:
+        yield
+    finally:
+        metrics.stage_duration.observe(
+            time.monotonic() - started_at,
+            labels={"stage": stage},
+        )
@@ -0,0 +1,18 @@
+from .base import NiconicoApiRateLimiter, NiconicoApiRateLimitRule
+from .niconico import (
+    NICONICO_ACCOUNT_HOST,
+    NICONICO_LIVE_HOST,
+    NICONICO_USER_ICON_HOST,
+    create_niconico_api_rate_limiter,
+)
+from .token_bucket import NiconicoApiTokenBucketRateLimiter
+
+__all__ = [
+    "NICONICO_LIVE_HOST",
+    "NICONICO_ACCOUNT_HOST",
+    "NICONICO_USER_ICON_HOST",
+    "NiconicoApiRateLimitRule",
+    "NiconicoApiRateLimiter",
+    "NiconicoApiTokenBucketRateLimiter",
+    "create_niconico_api_rate_limiter",
+]
@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+
+from pydantic import BaseModel
+
+
+class NiconicoApiRateLimitRule(BaseModel):
+    requests_per_second: float
+    burst: int
+
+
+class NiconicoApiRateLimiter(ABC):
+    @abstractmethod
+    def acquire(
+        self,
+        host: str,
+    ) -> float:
+        """
+        hostへのリクエスト1件分の枠を確保するまでブロックし、待機した秒数を返す
+        """
+        ...
+
+    @abstractmethod
+    async def acquire_async(
+        self,
+        host: str,
+    ) -> float:
+        """
+        hostへのリクエスト1件分の枠を確保するまで待機し、待機した秒数を返す
+        """
+        ...
@@ -0,0 +1,20 @@
+from .base import NiconicoApiRateLimitRule
+from .token_bucket import NiconicoApiTokenBucketRateLimiter
+
+NICONICO_LIVE_HOST = "live.nicovideo.jp"
+NICONICO_ACCOUNT_HOST = "account.nicovideo.jp"
+NICONICO_USER_ICON_HOST = "secure-dcdn.cdn.nimg.jp"
+
+
+def create_niconico_api_rate_limiter(
+    live_rule: NiconicoApiRateLimitRule,
+    account_rule: NiconicoApiRateLimitRule,
+    user_icon_rule: NiconicoApiRateLimitRule,
+) -> NiconicoApiTokenBucketRateLimiter:
+    return NiconicoApiTokenBucketRateLimiter(
+        rules={
+            NICONICO_LIVE_HOST: live_rule,
+            NICONICO_ACCOUNT_HOST: account_rule,
+            NICONICO_USER_ICON_HOST: user_icon_rule,
+        },
+    )
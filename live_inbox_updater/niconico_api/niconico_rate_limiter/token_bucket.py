@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+
+from .base import NiconicoApiRateLimiter, NiconicoApiRateLimitRule
+
+
+class _TokenBucket:
+    def __init__(
+        self,
+        rule: NiconicoApiRateLimitRule,
+        clock: Callable[[], float],
+    ):
+        if rule.requests_per_second <= 0:
+            raise ValueError("requests_per_second must be > 0")
+        if rule.burst < 1:
+            raise ValueError("burst must be >= 1")
+
+        self.rate = rule.requests_per_second
+        self.capacity = float(rule.burst)
+        self.tokens = float(rule.burst)
+        self.clock = clock
+        self.updated_at = clock()
+
+    def reserve(self) -> float:
+        """
+        トークンを1つ予約し、予約したトークンが使えるようになるまでの秒数を返す
+
+        トークンが足りない場合は負債として先取りするため、
+        同時に待機している呼び出し元は予約順に rate ごとの間隔で解放される
+        """
+
+        now = self.clock()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.tokens -= 1.0
+
+        if self.tokens >= 0:
+            return 0.0
+
+        return -self.tokens / self.rate
+
+
+class NiconicoApiTokenBucketRateLimiter(NiconicoApiRateLimiter):
+    """
+    ホストごとのトークンバケットによるレートリミッタ
+
+    スレッドやイベントループをまたいで共有できる。
+    rulesに含まれないホストへのリクエストは制限しない。
+    clockには単調増加する秒数を返す関数を指定する（テストで時刻を固定するため）
+    """
+
+    def __init__(
+        self,
+        rules: dict[str, NiconicoApiRateLimitRule],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rules = rules
+
+        self.__lock = threading.Lock()
+        self.__buckets: dict[str, _TokenBucket] = {}
+        for host, rule in rules.items():
+            self.__buckets[host] = _TokenBucket(rule=rule, clock=clock)
+
+    def __reserve(
+        self,
+        host: str,
+    ) -> float:
+        bucket = self.__buckets.get(host)
+        if bucket is None:
+            return 0.0
+
+        with self.__lock:
+            return bucket.reserve()
+
+    def acquire(
+        self,
+        host: str,
+    ) -> float:
+        wait_seconds = self.__reserve(host=host)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+        return wait_seconds
+
+    async def acquire_async(
+        self,
+        host: str,
+    ) -> float:
+        wait_seconds = self.__reserve(host=host)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+        return wait_seconds
@@ -1,11 +1,19 @@
 from .base import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
     NiconicoApiNiconicoUserBroadcastHistoryClient,
+    NiconicoApiNiconicoUserBroadcastHistoryPage,
     NiconicoApiNiconicoUserBroadcastProgram,
 )
-from .niconico import NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient
+from .niconico import (
+    NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient,
+    NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient,
+)
 
 __all__ = [
     "NiconicoApiNiconicoUserBroadcastProgram",
+    "NiconicoApiNiconicoUserBroadcastHistoryPage",
     "NiconicoApiNiconicoUserBroadcastHistoryClient",
+    "NiconicoApiNiconicoUserBroadcastHistoryAsyncClient",
     "NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient",
+    "NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient",
 ]
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator
 
 from pydantic import BaseModel
 
@@ -12,13 +13,134 @@ class NiconicoApiNiconicoUserBroadcastProgram(BaseModel):
     niconico_user_id: str
     start_time: datetime | None
     end_time: datetime | None
+    open_time: datetime | None = None
+    scheduled_end_time: datetime | None = None
+
+
+class NiconicoApiNiconicoUserBroadcastHistoryPage(BaseModel):
+    programs: list[NiconicoApiNiconicoUserBroadcastProgram]
+    total_count: int | None
+    has_next: bool
 
 
 class NiconicoApiNiconicoUserBroadcastHistoryClient(ABC):
     @abstractmethod
+    def get_program_page(
+        self,
+        niconico_user_id: str,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> NiconicoApiNiconicoUserBroadcastHistoryPage: ...
+
     def get_programs(
         self,
         niconico_user_id: str,
         offset: int = 0,
         limit: int = 10,
-    ) -> list[NiconicoApiNiconicoUserBroadcastProgram]: ...
+    ) -> list[NiconicoApiNiconicoUserBroadcastProgram]:
+        return self.get_program_page(
+            niconico_user_id=niconico_user_id,
+            offset=offset,
+            limit=limit,
+        ).programs
+
+    def iter_program_pages(
+        self,
+        niconico_user_id: str,
+        page_size: int = 10,
+        max_pages: int | None = None,
+        start_offset: int = 0,
+        stop_at: (
+            Callable[[NiconicoApiNiconicoUserBroadcastProgram], bool] | None
+        ) = None,
+    ) -> Iterator[NiconicoApiNiconicoUserBroadcastHistoryPage]:
+        """
+        番組一覧を新しい順に、start_offset件目からpage_size件ずつ取得して返す
+
+        最後のページか、max_pagesページに達するか、
+        返したページにstop_atが真になる番組が含まれていた場合に終了する
+        """
+
+        if page_size < 1:
+            raise ValueError("page_size must be >= 1")
+
+        page_count = 0
+        while max_pages is None or page_count < max_pages:
+            page = self.get_program_page(
+                niconico_user_id=niconico_user_id,
+                offset=start_offset + page_count * page_size,
+                limit=page_size,
+            )
+            page_count += 1
+
+            yield page
+
+            if not page.has_next:
+                return
+
+            if stop_at is not None and any(
+                stop_at(program) for program in page.programs
+            ):
+                return
+
+
+class NiconicoApiNiconicoUserBroadcastHistoryAsyncClient(ABC):
+    @abstractmethod
+    async def get_program_page(
+        self,
+        niconico_user_id: str,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> NiconicoApiNiconicoUserBroadcastHistoryPage: ...
+
+    async def get_programs(
+        self,
+        niconico_user_id: str,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> list[NiconicoApiNiconicoUserBroadcastProgram]:
+        page = await self.get_program_page(
+            niconico_user_id=niconico_user_id,
+            offset=offset,
+            limit=limit,
+        )
+        return page.programs
+
+    async def iter_program_pages(
+        self,
+        niconico_user_id: str,
+        page_size: int = 10,
+        max_pages: int | None = None,
+        start_offset: int = 0,
+        stop_at: (
+            Callable[[NiconicoApiNiconicoUserBroadcastProgram], bool] | None
+        ) = None,
+    ) -> AsyncIterator[NiconicoApiNiconicoUserBroadcastHistoryPage]:
+        """
+        番組一覧を新しい順に、start_offset件目からpage_size件ずつ取得して返す
+
+        最後のページか、max_pagesページに達するか、
+        返したページにstop_atが真になる番組が含まれていた場合に終了する
+        """
+
+        if page_size < 1:
+            raise ValueError("page_size must be >= 1")
+
+        page_count = 0
+        while max_pages is None or page_count < max_pages:
+            page = await self.get_program_page(
+                niconico_user_id=niconico_user_id,
+                offset=start_offset + page_count * page_size,
+                limit=page_size,
+            )
+            page_count += 1
+
+            yield page
+
+            if not page.has_next:
+                return
+
+            if stop_at is not None and any(
+                stop_at(program) for program in page.programs
+            ):
+                return
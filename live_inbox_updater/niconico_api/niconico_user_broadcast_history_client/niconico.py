@@ -1,16 +1,26 @@
 from datetime import datetime, timezone
 from logging import getLogger
+from urllib.parse import urlparse
 
 import httpx
 from pydantic import BaseModel, ValidationError
 
+from ...json_backend import JsonBackend
+from ..niconico_rate_limiter import NiconicoApiRateLimiter
 from .base import (
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient,
     NiconicoApiNiconicoUserBroadcastHistoryClient,
+    NiconicoApiNiconicoUserBroadcastHistoryPage,
     NiconicoApiNiconicoUserBroadcastProgram,
 )
 
 logger = getLogger(__name__)
 
+USER_BROADCAST_HISTORY_API_URL = (
+    "https://live.nicovideo.jp/front/api/v1/user-broadcast-history"
+)
+USER_BROADCAST_HISTORY_API_HOST = urlparse(USER_BROADCAST_HISTORY_API_URL).netloc
+
 
 class UserBroadcastHistoryResponseMeta(BaseModel):
     status: int
@@ -30,33 +40,67 @@ class UserBroadcastHistoryProgramScheduleTime(BaseModel):
     nanos: int
 
 
-class UserBroadcastHistoryProgramSchedule(BaseModel):
+# 番組の更新に使うフィールドだけを持つモデル。
+# レスポンスの大部分を占める未使用のフィールドは検証せずに読み飛ばす
+
+
+class UserBroadcastHistoryMinimalProgramSchedule(BaseModel):
     status: str
     openTime: UserBroadcastHistoryProgramScheduleTime | None
     beginTime: UserBroadcastHistoryProgramScheduleTime | None
     scheduledEndTime: UserBroadcastHistoryProgramScheduleTime | None
     endTime: UserBroadcastHistoryProgramScheduleTime | None
-    vposBaseTime: UserBroadcastHistoryProgramScheduleTime
 
 
-class UserBroadcastHistoryProgram(BaseModel):
+class UserBroadcastHistoryMinimalProgram(BaseModel):
     title: str
     description: str
-    schedule: UserBroadcastHistoryProgramSchedule
+    schedule: UserBroadcastHistoryMinimalProgramSchedule
 
 
 class UserBroadcastHistoryProgramProviderId(BaseModel):
     value: str
 
 
+class UserBroadcastHistoryMinimalProgramProvider(BaseModel):
+    programProviderId: UserBroadcastHistoryProgramProviderId
+
+
+class UserBroadcastHistoryMinimalProgramItem(BaseModel):
+    id: UserBroadcastHistoryProgramId
+    program: UserBroadcastHistoryMinimalProgram
+    programProvider: UserBroadcastHistoryMinimalProgramProvider
+
+
+class UserBroadcastHistoryMinimalResponseData(BaseModel):
+    totalCount: int | None = None
+    hasNext: bool | None = None
+    programsList: list[UserBroadcastHistoryMinimalProgramItem]
+
+
+class UserBroadcastHistoryMinimalResponseBody(BaseModel):
+    meta: UserBroadcastHistoryResponseMeta
+    data: UserBroadcastHistoryMinimalResponseData
+
+
+# レスポンス全体を検証するモデル
+
+
+class UserBroadcastHistoryProgramSchedule(UserBroadcastHistoryMinimalProgramSchedule):
+    vposBaseTime: UserBroadcastHistoryProgramScheduleTime
+
+
+class UserBroadcastHistoryProgram(UserBroadcastHistoryMinimalProgram):
+    schedule: UserBroadcastHistoryProgramSchedule
+
+
 class UserBroadcastHistoryProgramProviderIcons(BaseModel):
     uri150x150: str
 
 
-class UserBroadcastHistoryProgramProvider(BaseModel):
+class UserBroadcastHistoryProgramProvider(UserBroadcastHistoryMinimalProgramProvider):
     type: str
     name: str
-    programProviderId: UserBroadcastHistoryProgramProviderId
     icons: UserBroadcastHistoryProgramProviderIcons
 
 
@@ -76,8 +120,7 @@ class UserBroadcastHistoryProgramThumbnail(BaseModel):
     screenshot: UserBroadcastHistoryProgramThumbnailScreenshot | None = None
 
 
-class UserBroadcastHistoryProgramItem(BaseModel):
-    id: UserBroadcastHistoryProgramId
+class UserBroadcastHistoryProgramItem(UserBroadcastHistoryMinimalProgramItem):
     program: UserBroadcastHistoryProgram
     programProvider: UserBroadcastHistoryProgramProvider
     socialGroup: UserBroadcastHistoryProgramSocialGroup
@@ -85,96 +128,212 @@ class UserBroadcastHistoryProgramItem(BaseModel):
     linkedContent: UserBroadcastHistoryProgramLinkedContent | None = None
 
 
-class UserBroadcastHistoryResponseData(BaseModel):
-    totalCount: int | None = None
-    hasNext: bool | None = None
-    programsList: list[UserBroadcastHistoryProgramItem]
+class UserBroadcastHistoryResponseData(UserBroadcastHistoryMinimalResponseData):
+    programsList: list[UserBroadcastHistoryProgramItem]  # type: ignore[assignment]
 
 
-class UserBroadcastHistoryResponseBody(BaseModel):
-    meta: UserBroadcastHistoryResponseMeta
+class UserBroadcastHistoryResponseBody(UserBroadcastHistoryMinimalResponseBody):
     data: UserBroadcastHistoryResponseData
 
 
+def create_user_broadcast_history_params(
+    niconico_user_id: str,
+    offset: int,
+    limit: int,
+) -> dict[str, str]:
+    return {
+        "providerType": "user",
+        "providerId": niconico_user_id,
+        "isIncludeNonPublic": "false",
+        "offset": str(offset),
+        "limit": str(limit),
+        "withTotalCount": "true",
+    }
+
+
+def convert_schedule_time_to_datetime(
+    schedule_time: UserBroadcastHistoryProgramScheduleTime | None,
+) -> datetime | None:
+    if schedule_time is None:
+        return None
+
+    return datetime.fromtimestamp(schedule_time.seconds, tz=timezone.utc)
+
+
+def load_user_broadcast_history_response(
+    content: bytes,
+    json_backend: JsonBackend = "pydantic",
+) -> UserBroadcastHistoryMinimalResponseBody:
+    """
+    レスポンスのバイト列から、番組の更新に使うフィールドだけを検証して読み込む
+
+    - pydantic: JSONを辞書にせず、バイト列から直接モデルを作る
+    - orjson: orjsonで辞書にしてからモデルを作る（orjsonパッケージが必要）
+    """
+
+    try:
+        if json_backend == "orjson":
+            import orjson  # type: ignore[import-not-found, unused-ignore]
+
+            return UserBroadcastHistoryMinimalResponseBody.model_validate(
+                orjson.loads(content),
+            )
+
+        return UserBroadcastHistoryMinimalResponseBody.model_validate_json(content)
+    except ValidationError:
+        logger.error(content)
+        raise
+
+
+def parse_user_broadcast_history_response(
+    response_body: UserBroadcastHistoryMinimalResponseBody,
+    offset: int,
+    limit: int,
+) -> NiconicoApiNiconicoUserBroadcastHistoryPage:
+    niconico_user_broadcast_programs: list[NiconicoApiNiconicoUserBroadcastProgram] = []
+    for program_item in response_body.data.programsList:
+        niconico_content_id = program_item.id.value
+        title = program_item.program.title
+        description = program_item.program.description
+        status = program_item.program.schedule.status
+        niconico_user_id = program_item.programProvider.programProviderId.value
+
+        schedule = program_item.program.schedule
+        start_time = convert_schedule_time_to_datetime(schedule.beginTime)
+        end_time = convert_schedule_time_to_datetime(schedule.endTime)
+        open_time = convert_schedule_time_to_datetime(schedule.openTime)
+        scheduled_end_time = convert_schedule_time_to_datetime(
+            schedule.scheduledEndTime
+        )
+
+        niconico_user_broadcast_programs.append(
+            NiconicoApiNiconicoUserBroadcastProgram(
+                niconico_content_id=niconico_content_id,
+                title=title,
+                description=description,
+                status=status,
+                niconico_user_id=niconico_user_id,
+                start_time=start_time,
+                end_time=end_time,
+                open_time=open_time,
+                scheduled_end_time=scheduled_end_time,
+            )
+        )
+
+    total_count = response_body.data.totalCount
+
+    # hasNextがなければtotalCount、それもなければ件数から続きがあるか判断する
+    has_next = response_body.data.hasNext
+    if has_next is None:
+        if total_count is not None:
+            has_next = offset + len(niconico_user_broadcast_programs) < total_count
+        else:
+            has_next = len(niconico_user_broadcast_programs) >= limit
+
+    return NiconicoApiNiconicoUserBroadcastHistoryPage(
+        programs=niconico_user_broadcast_programs,
+        total_count=total_count,
+        has_next=has_next,
+    )
+
+
 class NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient(
     NiconicoApiNiconicoUserBroadcastHistoryClient
 ):
     def __init__(
         self,
         useragent: str,
+        http_client: httpx.Client,
+        rate_limiter: NiconicoApiRateLimiter | None = None,
+        json_backend: JsonBackend = "pydantic",
     ):
         self.useragent = useragent
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
+        self.json_backend = json_backend
 
-    def get_programs(
+    def get_program_page(
         self,
         niconico_user_id: str,
         offset: int = 0,
         limit: int = 10,
-    ) -> list[NiconicoApiNiconicoUserBroadcastProgram]:
+    ) -> NiconicoApiNiconicoUserBroadcastHistoryPage:
         useragent = self.useragent
-
-        api_url = "https://live.nicovideo.jp/front/api/v1/user-broadcast-history"
-        params = {
-            "providerType": "user",
-            "providerId": niconico_user_id,
-            "isIncludeNonPublic": "false",
-            "offset": str(offset),
-            "limit": str(limit),
-            "withTotalCount": "true",
-        }
-
-        res = httpx.get(
-            url=api_url,
-            params=params,
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
+
+        if rate_limiter is not None:
+            rate_limiter.acquire(host=USER_BROADCAST_HISTORY_API_HOST)
+
+        res = http_client.get(
+            url=USER_BROADCAST_HISTORY_API_URL,
+            params=create_user_broadcast_history_params(
+                niconico_user_id=niconico_user_id,
+                offset=offset,
+                limit=limit,
+            ),
             headers={
                 "User-Agent": useragent,
             },
         )
         res.raise_for_status()
 
-        response_body_json = res.json()
-        try:
-            response_body = UserBroadcastHistoryResponseBody.model_validate(
-                response_body_json
-            )
-        except ValidationError:
-            logger.error(response_body_json)
-            raise
-
-        niconico_user_broadcast_programs: list[
-            NiconicoApiNiconicoUserBroadcastProgram
-        ] = []
-        for program_item in response_body.data.programsList:
-            niconico_content_id = program_item.id.value
-            title = program_item.program.title
-            description = program_item.program.description
-            status = program_item.program.schedule.status
-            niconico_user_id = program_item.programProvider.programProviderId.value
-
-            start_time: datetime | None = None
-            if program_item.program.schedule.beginTime is not None:
-                start_time = datetime.fromtimestamp(
-                    program_item.program.schedule.beginTime.seconds,
-                    tz=timezone.utc,
-                )
-
-            end_time: datetime | None = None
-            if program_item.program.schedule.endTime is not None:
-                end_time = datetime.fromtimestamp(
-                    program_item.program.schedule.endTime.seconds,
-                    tz=timezone.utc,
-                )
-
-            niconico_user_broadcast_programs.append(
-                NiconicoApiNiconicoUserBroadcastProgram(
-                    niconico_content_id=niconico_content_id,
-                    title=title,
-                    description=description,
-                    status=status,
-                    niconico_user_id=niconico_user_id,
-                    start_time=start_time,
-                    end_time=end_time,
-                )
-            )
+        return parse_user_broadcast_history_response(
+            load_user_broadcast_history_response(
+                res.content,
+                json_backend=self.json_backend,
+            ),
+            offset=offset,
+            limit=limit,
+        )
 
-        return niconico_user_broadcast_programs
+
+class NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient(
+    NiconicoApiNiconicoUserBroadcastHistoryAsyncClient
+):
+    def __init__(
+        self,
+        useragent: str,
+        http_client: httpx.AsyncClient,
+        rate_limiter: NiconicoApiRateLimiter | None = None,
+        json_backend: JsonBackend = "pydantic",
+    ):
+        self.useragent = useragent
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
+        self.json_backend = json_backend
+
+    async def get_program_page(
+        self,
+        niconico_user_id: str,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> NiconicoApiNiconicoUserBroadcastHistoryPage:
+        useragent = self.useragent
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
+
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(host=USER_BROADCAST_HISTORY_API_HOST)
+
+        res = await http_client.get(
+            url=USER_BROADCAST_HISTORY_API_URL,
+            params=create_user_broadcast_history_params(
+                niconico_user_id=niconico_user_id,
+                offset=offset,
+                limit=limit,
+            ),
+            headers={
+                "User-Agent": useragent,
+            },
+        )
+        res.raise_for_status()
+
+        return parse_user_broadcast_history_response(
+            load_user_broadcast_history_response(
+                res.content,
+                json_backend=self.json_backend,
+            ),
+            offset=offset,
+            limit=limit,
+        )
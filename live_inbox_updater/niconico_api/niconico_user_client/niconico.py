@@ -1,13 +1,18 @@
 from logging import getLogger
 from typing import Iterable
+from urllib.parse import urlparse
 
 import httpx
 from pydantic import BaseModel, Field, ValidationError
 
+from ..niconico_rate_limiter import NiconicoApiRateLimiter
 from .base import NiconicoApiNiconicoUser, NiconicoApiNiconicoUserClient
 
 logger = getLogger(__name__)
 
+USERS_API_URL = "https://account.nicovideo.jp/api/public/v1/users.json"
+USERS_API_HOST = urlparse(USERS_API_URL).netloc
+
 
 class UserApiResponseMeta(BaseModel):
     status: int
@@ -36,26 +41,33 @@ class NiconicoApiNiconicoUserNiconicoClient(NiconicoApiNiconicoUserClient):
     def __init__(
         self,
         useragent: str,
+        http_client: httpx.Client,
+        rate_limiter: NiconicoApiRateLimiter | None = None,
     ):
         self.useragent = useragent
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
 
     def get_all(
         self,
         remote_niconico_user_ids: Iterable[str],
     ) -> Iterable[NiconicoApiNiconicoUser]:
         useragent = self.useragent
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
 
         remote_niconico_user_ids_list = list(remote_niconico_user_ids)
         if len(remote_niconico_user_ids_list) > 10:
             raise ValueError("Too many users given. Required num <= 10.")
 
-        api_url = "https://account.nicovideo.jp/api/public/v1/users.json"
+        if rate_limiter is not None:
+            rate_limiter.acquire(host=USERS_API_HOST)
 
         params = {
             "userIds": remote_niconico_user_ids_list,
         }
-        res = httpx.get(
-            url=api_url,
+        res = http_client.get(
+            url=USERS_API_URL,
             params=params,
             headers={
                 "User-Agent": useragent,
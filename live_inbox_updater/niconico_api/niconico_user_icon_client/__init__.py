@@ -1,8 +1,21 @@
-from .base import NiconicoApiNiconicoUserIcon, NiconicoApiNiconicoUserIconClient
-from .niconico import NiconicoApiNiconicoUserIconNiconicoClient
+from .base import (
+    NiconicoApiNiconicoUserIcon,
+    NiconicoApiNiconicoUserIconAsyncClient,
+    NiconicoApiNiconicoUserIconClient,
+    NiconicoApiNiconicoUserIconRevalidation,
+    NiconicoApiNiconicoUserIconRevalidationStatus,
+)
+from .niconico import (
+    NiconicoApiNiconicoUserIconNiconicoAsyncClient,
+    NiconicoApiNiconicoUserIconNiconicoClient,
+)
 
 __all__ = [
     "NiconicoApiNiconicoUserIcon",
+    "NiconicoApiNiconicoUserIconRevalidation",
+    "NiconicoApiNiconicoUserIconRevalidationStatus",
     "NiconicoApiNiconicoUserIconClient",
+    "NiconicoApiNiconicoUserIconAsyncClient",
     "NiconicoApiNiconicoUserIconNiconicoClient",
+    "NiconicoApiNiconicoUserIconNiconicoAsyncClient",
 ]
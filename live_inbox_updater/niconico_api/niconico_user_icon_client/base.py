@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
+from typing import Literal
 
 from pydantic import BaseModel
 
+NiconicoApiNiconicoUserIconRevalidationStatus = Literal[
+    "not_modified",
+    "modified",
+    "gone",
+]
+
 
 class NiconicoApiNiconicoUserIcon(BaseModel):
     url: str
     content_type: str
     content: bytes
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class NiconicoApiNiconicoUserIconRevalidation(BaseModel):
+    url: str
+    status: NiconicoApiNiconicoUserIconRevalidationStatus
+    # statusがmodifiedのときだけ、新しいアイコンが入る
+    icon: NiconicoApiNiconicoUserIcon | None
 
 
 class NiconicoApiNiconicoUserIconClient(ABC):
@@ -15,3 +31,19 @@ class NiconicoApiNiconicoUserIconClient(ABC):
         self,
         url: str,
     ) -> NiconicoApiNiconicoUserIcon: ...
+
+
+class NiconicoApiNiconicoUserIconAsyncClient(ABC):
+    @abstractmethod
+    async def get(
+        self,
+        url: str,
+    ) -> NiconicoApiNiconicoUserIcon: ...
+
+    @abstractmethod
+    async def revalidate(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> NiconicoApiNiconicoUserIconRevalidation: ...
@@ -2,37 +2,160 @@ from urllib.parse import urlparse
 
 import httpx
 
-from .base import NiconicoApiNiconicoUserIcon, NiconicoApiNiconicoUserIconClient
+from ..niconico_rate_limiter import NiconicoApiRateLimiter
+from .base import (
+    NiconicoApiNiconicoUserIcon,
+    NiconicoApiNiconicoUserIconAsyncClient,
+    NiconicoApiNiconicoUserIconClient,
+    NiconicoApiNiconicoUserIconRevalidation,
+)
+
+# アイコンが削除されたとみなすステータスコード
+GONE_STATUS_CODES = {404, 410}
+
+
+def validate_niconico_user_icon_url(
+    url: str,
+) -> str:
+    """
+    ユーザアイコンのURLを検証し、ホスト名を返す
+    """
+
+    urlp = urlparse(url)
+
+    if urlp.scheme != "https":
+        raise ValueError(f"Invalid scheme: {urlp.scheme}")
+
+    if urlp.hostname != "secure-dcdn.cdn.nimg.jp":
+        raise ValueError(f"Invalid hostname: {urlp.hostname}")
+
+    return urlp.hostname
+
+
+def parse_niconico_user_icon_response(
+    url: str,
+    res: httpx.Response,
+) -> NiconicoApiNiconicoUserIcon:
+    content_type = res.headers.get("Content-Type")
+    if content_type is None:
+        raise Exception("Invalid response: No Content-Type response header")
+
+    content = res.content
+
+    return NiconicoApiNiconicoUserIcon(
+        url=url,
+        content_type=content_type,
+        content=content,
+        etag=res.headers.get("ETag"),
+        last_modified=res.headers.get("Last-Modified"),
+    )
+
+
+def create_niconico_user_icon_revalidation_headers(
+    useragent: str,
+    etag: str | None,
+    last_modified: str | None,
+) -> dict[str, str]:
+    headers = {
+        "User-Agent": useragent,
+    }
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if last_modified is not None:
+        headers["If-Modified-Since"] = last_modified
+
+    return headers
+
+
+def parse_niconico_user_icon_revalidation_response(
+    url: str,
+    res: httpx.Response,
+) -> NiconicoApiNiconicoUserIconRevalidation:
+    if res.status_code == 304:
+        return NiconicoApiNiconicoUserIconRevalidation(
+            url=url,
+            status="not_modified",
+            icon=None,
+        )
+
+    if res.status_code in GONE_STATUS_CODES:
+        return NiconicoApiNiconicoUserIconRevalidation(
+            url=url,
+            status="gone",
+            icon=None,
+        )
+
+    res.raise_for_status()
+
+    return NiconicoApiNiconicoUserIconRevalidation(
+        url=url,
+        status="modified",
+        icon=parse_niconico_user_icon_response(url=url, res=res),
+    )
 
 
 class NiconicoApiNiconicoUserIconNiconicoClient(NiconicoApiNiconicoUserIconClient):
     def __init__(
         self,
         useragent: str,
+        http_client: httpx.Client,
+        rate_limiter: NiconicoApiRateLimiter | None = None,
     ):
         self.useragent = useragent
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
 
-    def __validate_url(
+    def get(
         self,
         url: str,
-    ) -> None:
-        urlp = urlparse(url)
+    ) -> NiconicoApiNiconicoUserIcon:
+        useragent = self.useragent
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
 
-        if urlp.scheme != "https":
-            raise ValueError(f"Invalid scheme: {urlp.scheme}")
+        host = validate_niconico_user_icon_url(url=url)
 
-        if urlp.hostname != "secure-dcdn.cdn.nimg.jp":
-            raise ValueError(f"Invalid hostname: {urlp.hostname}")
+        if rate_limiter is not None:
+            rate_limiter.acquire(host=host)
 
-    def get(
+        res = http_client.get(
+            url,
+            headers={
+                "User-Agent": useragent,
+            },
+        )
+        res.raise_for_status()
+
+        return parse_niconico_user_icon_response(url=url, res=res)
+
+
+class NiconicoApiNiconicoUserIconNiconicoAsyncClient(
+    NiconicoApiNiconicoUserIconAsyncClient
+):
+    def __init__(
+        self,
+        useragent: str,
+        http_client: httpx.AsyncClient,
+        rate_limiter: NiconicoApiRateLimiter | None = None,
+    ):
+        self.useragent = useragent
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
+
+    async def get(
         self,
         url: str,
     ) -> NiconicoApiNiconicoUserIcon:
         useragent = self.useragent
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
 
-        self.__validate_url(url=url)
+        host = validate_niconico_user_icon_url(url=url)
 
-        res = httpx.get(
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(host=host)
+
+        res = await http_client.get(
             url,
             headers={
                 "User-Agent": useragent,
@@ -40,14 +163,30 @@ class NiconicoApiNiconicoUserIconNiconicoClient(NiconicoApiNiconicoUserIconClien
         )
         res.raise_for_status()
 
-        content_type = res.headers.get("Content-Type")
-        if content_type is None:
-            raise Exception("Invalid response: No Content-Type response header")
+        return parse_niconico_user_icon_response(url=url, res=res)
+
+    async def revalidate(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> NiconicoApiNiconicoUserIconRevalidation:
+        useragent = self.useragent
+        http_client = self.http_client
+        rate_limiter = self.rate_limiter
+
+        host = validate_niconico_user_icon_url(url=url)
 
-        content = res.content
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(host=host)
 
-        return NiconicoApiNiconicoUserIcon(
-            url=url,
-            content_type=content_type,
-            content=content,
+        res = await http_client.get(
+            url,
+            headers=create_niconico_user_icon_revalidation_headers(
+                useragent=useragent,
+                etag=etag,
+                last_modified=last_modified,
+            ),
         )
+
+        return parse_niconico_user_icon_revalidation_response(url=url, res=res)
@@ -0,0 +1,11 @@
+import importlib.util
+
+
+def is_package_installed(
+    name: str,
+) -> bool:
+    """
+    任意の依存パッケージがインストールされているかを、読み込まずに確認する
+    """
+
+    return importlib.util.find_spec(name) is not None
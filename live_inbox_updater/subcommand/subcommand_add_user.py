@@ -1,6 +1,7 @@
 from argparse import ArgumentParser, Namespace
 from logging import getLogger
 
+import httpx
 from pydantic import BaseModel
 
 from ..app_config import AppConfig
@@ -24,21 +25,27 @@ def subcommand_add_user(args: SubcommandAddUserArguments) -> None:
     live_inbox_hasura_token = args.live_inbox_hasura_token
     useragent = args.useragent
 
-    niconico_user_client = NiconicoApiNiconicoUserNiconicoClient(
-        useragent=useragent,
-    )
+    with (
+        httpx.Client() as niconico_http_client,
+        httpx.Client() as hasura_http_client,
+    ):
+        niconico_user_client = NiconicoApiNiconicoUserNiconicoClient(
+            useragent=useragent,
+            http_client=niconico_http_client,
+        )
 
-    niconico_user_manager = NiconicoUserHasuraManager(
-        hasura_url=live_inbox_hasura_url,
-        hasura_token=live_inbox_hasura_token,
-        useragent=useragent,
-    )
+        niconico_user_manager = NiconicoUserHasuraManager(
+            hasura_url=live_inbox_hasura_url,
+            hasura_token=live_inbox_hasura_token,
+            useragent=useragent,
+            http_client=hasura_http_client,
+        )
 
-    add_users(
-        remote_niconico_user_ids=remote_niconico_user_ids,
-        niconico_user_client=niconico_user_client,
-        niconico_user_manager=niconico_user_manager,
-    )
+        add_users(
+            remote_niconico_user_ids=remote_niconico_user_ids,
+            niconico_user_client=niconico_user_client,
+            niconico_user_manager=niconico_user_manager,
+        )
 
 
 def execute_subcommand_add_user(
@@ -0,0 +1,222 @@
+import asyncio
+from argparse import ArgumentParser, Namespace
+from logging import getLogger
+from pathlib import Path
+
+import httpx
+from pydantic import BaseModel
+
+from ..app_config import AppConfig
+from ..json_backend import JsonBackend, validate_json_backend_string
+from ..live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramHasuraManager,
+)
+from ..live_inbox_utility import (
+    NiconicoLiveProgramBackfillCheckpoint,
+    backfill_niconico_live_programs_async,
+)
+from ..niconico_api.niconico_rate_limiter import (
+    NICONICO_LIVE_HOST,
+    NiconicoApiRateLimitRule,
+    NiconicoApiTokenBucketRateLimiter,
+)
+from ..niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient,
+)
+
+logger = getLogger(__name__)
+
+
+class SubcommandBackfillArguments(BaseModel):
+    remote_niconico_user_ids: list[str]
+    live_inbox_hasura_url: str
+    live_inbox_hasura_token: str
+    useragent: str
+    backfill_concurrency: int
+    backfill_page_size: int
+    backfill_checkpoint_path: Path | None
+    program_upsert_chunk_size: int
+    program_upsert_max_payload_bytes: int
+    niconico_live_rate_limit_rule: NiconicoApiRateLimitRule
+    niconico_json_backend: JsonBackend
+
+
+def subcommand_backfill(args: SubcommandBackfillArguments) -> None:
+    remote_niconico_user_ids = args.remote_niconico_user_ids
+    live_inbox_hasura_url = args.live_inbox_hasura_url
+    live_inbox_hasura_token = args.live_inbox_hasura_token
+    useragent = args.useragent
+    backfill_concurrency = args.backfill_concurrency
+    backfill_page_size = args.backfill_page_size
+    backfill_checkpoint_path = args.backfill_checkpoint_path
+    program_upsert_chunk_size = args.program_upsert_chunk_size
+    program_upsert_max_payload_bytes = args.program_upsert_max_payload_bytes
+    niconico_live_rate_limit_rule = args.niconico_live_rate_limit_rule
+    niconico_json_backend = args.niconico_json_backend
+
+    # 全てのワーカーでupdateと同じレート制限を共有する
+    niconico_rate_limiter = NiconicoApiTokenBucketRateLimiter(
+        rules={
+            NICONICO_LIVE_HOST: niconico_live_rate_limit_rule,
+        },
+    )
+
+    checkpoint = NiconicoLiveProgramBackfillCheckpoint(
+        path=backfill_checkpoint_path,
+    )
+
+    async def _backfill() -> None:
+        async with httpx.AsyncClient() as niconico_async_http_client:
+            with httpx.Client() as hasura_http_client:
+                niconico_user_broadcast_history_async_client = (
+                    NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient(
+                        useragent=useragent,
+                        http_client=niconico_async_http_client,
+                        rate_limiter=niconico_rate_limiter,
+                        json_backend=niconico_json_backend,
+                    )
+                )
+
+                niconico_live_program_manager = (
+                    LiveInboxApiNiconicoLiveProgramHasuraManager(
+                        hasura_url=live_inbox_hasura_url,
+                        hasura_token=live_inbox_hasura_token,
+                        useragent=useragent,
+                        http_client=hasura_http_client,
+                        upsert_chunk_size=program_upsert_chunk_size,
+                        upsert_max_payload_bytes=program_upsert_max_payload_bytes,
+                    )
+                )
+
+                await backfill_niconico_live_programs_async(
+                    remote_niconico_user_ids=remote_niconico_user_ids,
+                    niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                    niconico_live_program_manager=niconico_live_program_manager,
+                    checkpoint=checkpoint,
+                    concurrency=backfill_concurrency,
+                    page_size=backfill_page_size,
+                )
+
+    asyncio.run(_backfill())
+
+
+def execute_subcommand_backfill(
+    args: Namespace,
+) -> None:
+    remote_niconico_user_ids: list[str] = args.remote_niconico_user_ids
+    live_inbox_hasura_url: str = args.live_inbox_hasura_url
+    live_inbox_hasura_token: str = args.live_inbox_hasura_token
+    useragent: str = args.useragent
+    backfill_concurrency: int = args.backfill_concurrency
+    backfill_page_size: int = args.backfill_page_size
+    backfill_checkpoint_path: Path | None = args.backfill_checkpoint_path
+    program_upsert_chunk_size: int = args.program_upsert_chunk_size
+    program_upsert_max_payload_bytes: int = args.program_upsert_max_payload_bytes
+    niconico_live_requests_per_second: float = args.niconico_live_requests_per_second
+    niconico_live_burst: int = args.niconico_live_burst
+
+    niconico_json_backend_string: str = args.niconico_json_backend
+    if not validate_json_backend_string(niconico_json_backend_string):
+        raise ValueError("Invalid json backend string. Use 'pydantic' or 'orjson'.")
+    niconico_json_backend: JsonBackend = niconico_json_backend_string
+
+    subcommand_backfill(
+        args=SubcommandBackfillArguments(
+            remote_niconico_user_ids=remote_niconico_user_ids,
+            live_inbox_hasura_url=live_inbox_hasura_url,
+            live_inbox_hasura_token=live_inbox_hasura_token,
+            useragent=useragent,
+            backfill_concurrency=backfill_concurrency,
+            backfill_page_size=backfill_page_size,
+            backfill_checkpoint_path=backfill_checkpoint_path,
+            program_upsert_chunk_size=program_upsert_chunk_size,
+            program_upsert_max_payload_bytes=program_upsert_max_payload_bytes,
+            niconico_live_rate_limit_rule=NiconicoApiRateLimitRule(
+                requests_per_second=niconico_live_requests_per_second,
+                burst=niconico_live_burst,
+            ),
+            niconico_json_backend=niconico_json_backend,
+        ),
+    )
+
+
+def add_arguments_subcommand_backfill(
+    parser: ArgumentParser,
+    app_config: AppConfig,
+) -> None:
+    parser.add_argument(
+        "--remote_niconico_user_ids",
+        type=str,
+        nargs="+",
+        required=True,
+    )
+
+    parser.add_argument(
+        "--live_inbox_hasura_url",
+        type=str,
+        default=app_config.live_inbox_hasura_url,
+        required=app_config.live_inbox_hasura_url is None,
+    )
+    parser.add_argument(
+        "--live_inbox_hasura_token",
+        type=str,
+        default=app_config.live_inbox_hasura_token,
+        required=app_config.live_inbox_hasura_token is None,
+    )
+    parser.add_argument(
+        "--useragent",
+        type=str,
+        default=app_config.useragent,
+        required=app_config.useragent is None,
+    )
+
+    parser.add_argument(
+        "--backfill_concurrency",
+        type=int,
+        default=app_config.backfill_concurrency,
+        help="Number of niconico_users backfilled concurrently",
+    )
+    parser.add_argument(
+        "--backfill_page_size",
+        type=int,
+        default=app_config.backfill_page_size,
+        help="Number of live programs fetched and upserted per broadcast history page",
+    )
+    parser.add_argument(
+        "--backfill_checkpoint_path",
+        type=Path,
+        default=app_config.backfill_checkpoint_path,
+        help="JSON file to record progress and resume an interrupted backfill (optional)",
+    )
+    parser.add_argument(
+        "--program_upsert_chunk_size",
+        type=int,
+        default=app_config.program_upsert_chunk_size,
+        help="Maximum number of live programs upserted in a single Hasura mutation",
+    )
+    parser.add_argument(
+        "--program_upsert_max_payload_bytes",
+        type=int,
+        default=app_config.program_upsert_max_payload_bytes,
+        help="Maximum payload size of a single live program upsert mutation",
+    )
+    parser.add_argument(
+        "--niconico_live_requests_per_second",
+        type=float,
+        default=app_config.niconico_live_requests_per_second,
+        help="Rate limit for live.nicovideo.jp",
+    )
+    parser.add_argument(
+        "--niconico_live_burst",
+        type=int,
+        default=app_config.niconico_live_burst,
+        help="Burst size for live.nicovideo.jp",
+    )
+    parser.add_argument(
+        "--niconico_json_backend",
+        type=str,
+        default=app_config.niconico_json_backend,
+        help="JSON parser for broadcast history responses ('pydantic' or 'orjson')",
+    )
+
+    parser.set_defaults(handler=execute_subcommand_backfill)
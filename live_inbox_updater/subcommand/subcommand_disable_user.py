@@ -1,6 +1,7 @@
 from argparse import ArgumentParser, Namespace
 from logging import getLogger
 
+import httpx
 from pydantic import BaseModel
 
 from ..app_config import AppConfig
@@ -23,15 +24,18 @@ def subcommand_disable_user(args: SubcommandDisableUserArguments) -> None:
     live_inbox_hasura_token = args.live_inbox_hasura_token
     useragent = args.useragent
 
-    niconico_user_manager = NiconicoUserHasuraManager(
-        hasura_url=live_inbox_hasura_url,
-        hasura_token=live_inbox_hasura_token,
-        useragent=useragent,
-    )
-    disable_users(
-        remote_niconico_user_ids=remote_niconico_user_ids,
-        niconico_user_manager=niconico_user_manager,
-    )
+    with httpx.Client() as hasura_http_client:
+        niconico_user_manager = NiconicoUserHasuraManager(
+            hasura_url=live_inbox_hasura_url,
+            hasura_token=live_inbox_hasura_token,
+            useragent=useragent,
+            http_client=hasura_http_client,
+        )
+
+        disable_users(
+            remote_niconico_user_ids=remote_niconico_user_ids,
+            niconico_user_manager=niconico_user_manager,
+        )
 
 
 def execute_subcommand_disable_user(
@@ -1,37 +1,99 @@
+import asyncio
 import time
 import traceback
-from argparse import ArgumentParser, Namespace
+from argparse import ArgumentParser, BooleanOptionalAction, Namespace
 from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
 from logging import getLogger
 from pathlib import Path
 
+import httpx
 from pydantic import BaseModel
 from schedule import Scheduler
 
 from ..app_config import AppConfig
+from ..cassette import (
+    CassettePlayer,
+    CassetteRecorder,
+    RecordingAsyncHttpTransport,
+    RecordingHttpTransport,
+    ReplayAsyncHttpTransport,
+    ReplayHttpTransport,
+)
+from ..cassette_mode import CassetteMode, validate_cassette_mode_string
+from ..http_client import (
+    HttpClientConfig,
+    create_async_http_client,
+    create_async_http_transport,
+    create_http_client,
+    create_http_transport,
+)
+from ..json_backend import JsonBackend, validate_json_backend_string
 from ..live_inbox_api.niconico_live_program_manager import (
     LiveInboxApiNiconicoLiveProgramHasuraManager,
 )
 from ..live_inbox_api.niconico_user_icon_cache_metadata_manager import (
     LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager,
+    LiveInboxApiNiconicoUserIconCacheMetadataManager,
+    LiveInboxApiNiconicoUserIconCacheMetadataSqliteCacheManager,
 )
 from ..live_inbox_api.niconico_user_icon_cache_storage_manager import (
     LiveInboxApiNiconicoUserIconCacheStorageFileManager,
     LiveInboxApiNiconicoUserIconCacheStorageManager,
     LiveInboxApiNiconicoUserIconCacheStorageS3Manager,
 )
-from ..live_inbox_api.niconico_user_manager import NiconicoUserHasuraManager
-from ..live_inbox_utility import update_job
+from ..live_inbox_api.niconico_user_manager import (
+    NiconicoUserHasuraManager,
+    NiconicoUserHasuraSubscriber,
+)
+from ..live_inbox_utility import (
+    NiconicoLiveProgramStateStore,
+    NiconicoUserIconPipelineConfig,
+    NiconicoUserIndex,
+    NiconicoUserPollScheduler,
+    NiconicoUserShard,
+    OpenNiconicoLiveProgramIndex,
+    run_adaptive_update_loop,
+    update_job_async,
+)
+from ..metrics import (
+    MetricsAsyncHttpTransport,
+    MetricsHttpTransport,
+    MetricsNiconicoApiRateLimiter,
+    MetricsRegistry,
+    UpdaterMetrics,
+    get_graphql_operation_name,
+    get_request_host,
+    start_metrics_server,
+)
+from ..niconico_api.niconico_rate_limiter import (
+    NiconicoApiRateLimiter,
+    NiconicoApiRateLimitRule,
+    create_niconico_api_rate_limiter,
+)
 from ..niconico_api.niconico_user_broadcast_history_client import (
-    NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient,
+    NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient,
 )
 from ..niconico_api.niconico_user_icon_client import (
-    NiconicoApiNiconicoUserIconNiconicoClient,
+    NiconicoApiNiconicoUserIconNiconicoAsyncClient,
 )
+from ..optional_dependency import is_package_installed
 from ..storage_type import StorageType, validate_storage_type_string
+from ..tracing import (
+    JsonLinesTraceSpanExporter,
+    Tracer,
+    TracingAsyncHttpTransport,
+    TracingHttpTransport,
+)
+from ..update_mode import UpdateMode, validate_update_mode_string
+from ..user_sync_mode import UserSyncMode, validate_user_sync_mode_string
 
 logger = getLogger(__name__)
 
+ADAPTIVE_PROGRAM_UPSERT_FLUSH_INTERVAL = timedelta(seconds=10)
+OPEN_PROGRAM_RECHECK_DELAY = timedelta(seconds=30)
+USER_SUBSCRIPTION_RECONNECT_DELAY = timedelta(seconds=5)
+
 
 class SubcommandUpdateArgumentsStorageFileConfig(BaseModel):
     storage_file_dir: Path
@@ -43,6 +105,10 @@ class SubcommandUpdateArgumentsStorageS3Config(BaseModel):
     storage_s3_region_name: str | None
     storage_s3_access_key_id: str
     storage_s3_secret_access_key: str
+    storage_s3_max_pool_connections: int
+    storage_s3_multipart_threshold: int
+    storage_s3_max_concurrency: int
+    storage_s3_listing_cache_ttl: float | None
 
 
 class SubcommandUpdateArguments(BaseModel):
@@ -54,7 +120,42 @@ class SubcommandUpdateArguments(BaseModel):
     storage_s3_config: SubcommandUpdateArgumentsStorageS3Config | None
 
     useragent: str
+    update_mode: UpdateMode
+    user_sync_mode: UserSyncMode
+    user_full_resync_interval: int
+    user_subscription: bool
+    niconico_user_shard: NiconicoUserShard | None
     update_interval: int
+    update_concurrency: int
+    program_upsert_chunk_size: int
+    program_upsert_max_payload_bytes: int
+    program_history_page_size: int
+    program_history_max_pages: int
+    niconico_json_backend: JsonBackend
+    program_heartbeat_interval: int
+    adaptive_poll_min_interval: int
+    adaptive_poll_max_interval: int
+
+    niconico_live_rate_limit_rule: NiconicoApiRateLimitRule
+    niconico_account_rate_limit_rule: NiconicoApiRateLimitRule
+    niconico_user_icon_rate_limit_rule: NiconicoApiRateLimitRule
+
+    niconico_user_icon_pipeline_config: NiconicoUserIconPipelineConfig
+    icon_metadata_lookup_chunk_size: int
+    icon_metadata_lookup_concurrency: int
+    icon_metadata_cache_path: Path | None
+    icon_metadata_cache_reconcile_interval: float
+
+    http_client_config: HttpClientConfig
+
+    metrics_host: str
+    metrics_port: int | None
+
+    trace_path: Path | None
+
+    cassette_mode: CassetteMode | None
+    cassette_path: Path | None
+    cassette_time_scale: float
 
 
 def subcommand_update(args: SubcommandUpdateArguments) -> None:
@@ -66,26 +167,205 @@ def subcommand_update(args: SubcommandUpdateArguments) -> None:
     storage_s3_config = args.storage_s3_config
 
     useragent = args.useragent
+    update_mode = args.update_mode
+    user_sync_mode = args.user_sync_mode
+    user_full_resync_interval = args.user_full_resync_interval
+    user_subscription = args.user_subscription
+    niconico_user_shard = args.niconico_user_shard
     update_interval = args.update_interval
+    update_concurrency = args.update_concurrency
+    program_upsert_chunk_size = args.program_upsert_chunk_size
+    program_upsert_max_payload_bytes = args.program_upsert_max_payload_bytes
+    program_history_page_size = args.program_history_page_size
+    program_history_max_pages = args.program_history_max_pages
+    niconico_json_backend = args.niconico_json_backend
+    program_heartbeat_interval = args.program_heartbeat_interval
+    adaptive_poll_min_interval = args.adaptive_poll_min_interval
+    adaptive_poll_max_interval = args.adaptive_poll_max_interval
+
+    niconico_live_rate_limit_rule = args.niconico_live_rate_limit_rule
+    niconico_account_rate_limit_rule = args.niconico_account_rate_limit_rule
+    niconico_user_icon_rate_limit_rule = args.niconico_user_icon_rate_limit_rule
+
+    niconico_user_icon_pipeline_config = args.niconico_user_icon_pipeline_config
+    icon_metadata_lookup_chunk_size = args.icon_metadata_lookup_chunk_size
+    icon_metadata_lookup_concurrency = args.icon_metadata_lookup_concurrency
+    icon_metadata_cache_path = args.icon_metadata_cache_path
+    icon_metadata_cache_reconcile_interval = args.icon_metadata_cache_reconcile_interval
+
+    http_client_config = args.http_client_config
+
+    metrics_host = args.metrics_host
+    metrics_port = args.metrics_port
+
+    trace_path = args.trace_path
+
+    cassette_mode = args.cassette_mode
+    cassette_path = args.cassette_path
+    cassette_time_scale = args.cassette_time_scale
+
+    # 計測値はメトリクスを公開する場合だけ集める
+    metrics: UpdaterMetrics | None = None
+    if metrics_port is not None:
+        metrics = UpdaterMetrics(registry=MetricsRegistry())
+
+    # 全てのニコニコAPIクライアントでホストごとのレート制限を共有する
+    niconico_rate_limiter: NiconicoApiRateLimiter = create_niconico_api_rate_limiter(
+        live_rule=niconico_live_rate_limit_rule,
+        account_rule=niconico_account_rate_limit_rule,
+        user_icon_rule=niconico_user_icon_rate_limit_rule,
+    )
+    if metrics is not None:
+        niconico_rate_limiter = MetricsNiconicoApiRateLimiter(
+            rate_limiter=niconico_rate_limiter,
+            metrics=metrics,
+        )
+
+    # 更新サイクルごとのトレースはtrace_pathを指定した場合だけ記録する
+    tracer: Tracer | None = None
+    if trace_path is not None:
+        tracer = Tracer(exporter=JsonLinesTraceSpanExporter(path=trace_path))
+
+    # 計測やトレースはトランスポートを包んで行い、各クライアントには手を入れない
+    hasura_http_transport: httpx.BaseTransport
+    niconico_async_http_transport: httpx.AsyncBaseTransport
+    cassette_recorder: CassetteRecorder | None = None
+    if cassette_mode == "replay":
+        if cassette_path is None:
+            raise Exception("Unexpected state.")
+
+        # 通信せず、記録したレスポンスを記録時の所要時間に合わせて返す
+        cassette_player = CassettePlayer(path=cassette_path)
+        hasura_http_transport = ReplayHttpTransport(
+            player=cassette_player,
+            service="hasura",
+            get_target=get_graphql_operation_name,
+            time_scale=cassette_time_scale,
+        )
+        niconico_async_http_transport = ReplayAsyncHttpTransport(
+            player=cassette_player,
+            service="niconico",
+            get_target=get_request_host,
+            time_scale=cassette_time_scale,
+        )
+    else:
+        hasura_http_transport = create_http_transport(config=http_client_config)
+        niconico_async_http_transport = create_async_http_transport(
+            config=http_client_config,
+        )
+
+        if cassette_mode == "record":
+            if cassette_path is None:
+                raise Exception("Unexpected state.")
+
+            # 計測やトレースの影響を受けないよう、通信に最も近い位置で記録する
+            cassette_recorder = CassetteRecorder(path=cassette_path)
+            hasura_http_transport = RecordingHttpTransport(
+                transport=hasura_http_transport,
+                recorder=cassette_recorder,
+                service="hasura",
+                get_target=get_graphql_operation_name,
+            )
+            niconico_async_http_transport = RecordingAsyncHttpTransport(
+                transport=niconico_async_http_transport,
+                recorder=cassette_recorder,
+                service="niconico",
+                get_target=get_request_host,
+            )
+
+    if metrics is not None:
+        hasura_http_transport = MetricsHttpTransport(
+            transport=hasura_http_transport,
+            metrics=metrics,
+            service="hasura",
+            get_target=get_graphql_operation_name,
+        )
+        niconico_async_http_transport = MetricsAsyncHttpTransport(
+            transport=niconico_async_http_transport,
+            metrics=metrics,
+            service="niconico",
+            get_target=get_request_host,
+        )
+    if tracer is not None:
+        hasura_http_transport = TracingHttpTransport(
+            transport=hasura_http_transport,
+            tracer=tracer,
+            service="hasura",
+            get_target=get_graphql_operation_name,
+        )
+        niconico_async_http_transport = TracingAsyncHttpTransport(
+            transport=niconico_async_http_transport,
+            tracer=tracer,
+            service="niconico",
+            get_target=get_request_host,
+        )
+
+    # 接続を使い回すため、HTTPクライアントはプロセス終了まで保持する。
+    # Hasuraの認証ヘッダをニコニコに送らないよう、接続先ごとに分ける
+    hasura_http_client = create_http_client(
+        config=http_client_config,
+        transport=hasura_http_transport,
+    )
+    niconico_async_http_client = create_async_http_client(
+        config=http_client_config,
+        transport=niconico_async_http_transport,
+    )
 
     niconico_user_manager = NiconicoUserHasuraManager(
         hasura_url=live_inbox_hasura_url,
         hasura_token=live_inbox_hasura_token,
         useragent=useragent,
+        http_client=hasura_http_client,
     )
 
-    niconico_user_icon_client = NiconicoApiNiconicoUserIconNiconicoClient(
-        useragent=useragent,
+    # 更新サイクルをまたいでユーザ一覧を保持し、incrementalの場合は変更分だけを取得する
+    niconico_user_index = NiconicoUserIndex(
+        niconico_user_manager=niconico_user_manager,
+        incremental=user_sync_mode == "incremental",
+        full_resync_interval=timedelta(seconds=user_full_resync_interval),
+        shard=niconico_user_shard,
     )
+    if niconico_user_shard is not None:
+        logger.info(
+            f"Updating shard {niconico_user_shard.index} "
+            f"of {niconico_user_shard.count} shards"
+        )
 
-    niconico_user_icon_cache_metadata_manager = (
-        LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
+    # ユーザの追加・変更をポーリングせずに受け取る
+    niconico_user_subscriber: NiconicoUserHasuraSubscriber | None = None
+    if user_subscription:
+        niconico_user_subscriber = NiconicoUserHasuraSubscriber(
             hasura_url=live_inbox_hasura_url,
             hasura_token=live_inbox_hasura_token,
             useragent=useragent,
         )
+
+    niconico_user_icon_async_client = NiconicoApiNiconicoUserIconNiconicoAsyncClient(
+        useragent=useragent,
+        http_client=niconico_async_http_client,
+        rate_limiter=niconico_rate_limiter,
     )
 
+    niconico_user_icon_cache_metadata_manager: (
+        LiveInboxApiNiconicoUserIconCacheMetadataManager
+    ) = LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
+        hasura_url=live_inbox_hasura_url,
+        hasura_token=live_inbox_hasura_token,
+        useragent=useragent,
+        http_client=hasura_http_client,
+        get_by_urls_chunk_size=icon_metadata_lookup_chunk_size,
+        get_by_urls_concurrency=icon_metadata_lookup_concurrency,
+    )
+    if icon_metadata_cache_path is not None:
+        # 既知のアイコンURLをHasuraに問い合わせないよう、ローカルに保持する
+        niconico_user_icon_cache_metadata_manager = (
+            LiveInboxApiNiconicoUserIconCacheMetadataSqliteCacheManager(
+                manager=niconico_user_icon_cache_metadata_manager,
+                database_path=icon_metadata_cache_path,
+                reconcile_interval=icon_metadata_cache_reconcile_interval,
+            )
+        )
+
     niconico_user_icon_cache_storage_manager: (
         LiveInboxApiNiconicoUserIconCacheStorageManager | None
     ) = None
@@ -111,14 +391,21 @@ def subcommand_update(args: SubcommandUpdateArguments) -> None:
                 region_name=storage_s3_config.storage_s3_region_name,
                 access_key_id=storage_s3_config.storage_s3_access_key_id,
                 secret_access_key=storage_s3_config.storage_s3_secret_access_key,
+                max_pool_connections=storage_s3_config.storage_s3_max_pool_connections,
+                multipart_threshold=storage_s3_config.storage_s3_multipart_threshold,
+                max_concurrency=storage_s3_config.storage_s3_max_concurrency,
+                listing_cache_ttl=storage_s3_config.storage_s3_listing_cache_ttl,
             )
         )
     else:
         raise Exception("Unexpected state.")
 
-    niconico_user_broadcast_history_client = (
-        NiconicoApiNiconicoUserBroadcastHistoryNiconicoClient(
+    niconico_user_broadcast_history_async_client = (
+        NiconicoApiNiconicoUserBroadcastHistoryNiconicoAsyncClient(
             useragent=useragent,
+            http_client=niconico_async_http_client,
+            rate_limiter=niconico_rate_limiter,
+            json_backend=niconico_json_backend,
         )
     )
 
@@ -126,44 +413,135 @@ def subcommand_update(args: SubcommandUpdateArguments) -> None:
         hasura_url=live_inbox_hasura_url,
         hasura_token=live_inbox_hasura_token,
         useragent=useragent,
+        http_client=hasura_http_client,
+        upsert_chunk_size=program_upsert_chunk_size,
+        upsert_max_payload_bytes=program_upsert_max_payload_bytes,
     )
 
+    # 変化のない番組の書き込みを省くため、前回書き込んだ状態をジョブ間で保持する
+    niconico_live_program_state_store = NiconicoLiveProgramStateStore(
+        heartbeat_interval=timedelta(seconds=program_heartbeat_interval),
+    )
+
+    # ENDEDになるまで番組を追跡するため、未終了の番組をジョブ間で保持する
+    open_niconico_live_program_index = OpenNiconicoLiveProgramIndex(
+        recheck_delay=OPEN_PROGRAM_RECHECK_DELAY,
+    )
+
+    # ジョブごとにイベントループを作り直さないよう、同じRunnerを使い回す
+    runner = asyncio.Runner()
+
     def _update_job() -> None:
+        started_at = time.monotonic()
+        succeeded = False
         try:
-            update_job(
-                niconico_user_manager=niconico_user_manager,
-                niconico_user_icon_client=niconico_user_icon_client,
-                niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
-                niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
-                niconico_user_broadcast_history_client=niconico_user_broadcast_history_client,
-                niconico_live_program_manager=niconico_live_program_manager,
+            runner.run(
+                update_job_async(
+                    niconico_user_index=niconico_user_index,
+                    niconico_user_icon_async_client=niconico_user_icon_async_client,
+                    niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                    niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                    niconico_user_icon_pipeline_config=niconico_user_icon_pipeline_config,
+                    niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                    niconico_live_program_manager=niconico_live_program_manager,
+                    niconico_live_program_state_store=niconico_live_program_state_store,
+                    open_niconico_live_program_index=open_niconico_live_program_index,
+                    update_concurrency=update_concurrency,
+                    program_upsert_chunk_size=program_upsert_chunk_size,
+                    program_history_page_size=program_history_page_size,
+                    program_history_max_pages=program_history_max_pages,
+                    metrics=metrics,
+                    tracer=tracer,
+                ),
             )
+            succeeded = True
         except KeyboardInterrupt:
             raise
         except Exception:
             traceback.print_exc()
 
-    scheduler = Scheduler()
-    scheduler.every(update_interval).seconds.do(
-        _update_job,
-    )
+        if metrics is not None:
+            metrics.cycles.inc(labels={"result": "success" if succeeded else "failure"})
+            metrics.cycle_duration.observe(time.monotonic() - started_at)
+
+    def _run_interval_update_loop() -> None:
+        scheduler = Scheduler()
+        scheduler.every(update_interval).seconds.do(
+            _update_job,
+        )
 
-    scheduler.run_all()
+        scheduler.run_all()
 
-    scheduled_time: datetime | None = None
-    while True:
-        now = datetime.now(tz=timezone.utc)
+        scheduled_time: datetime | None = None
+        while True:
+            now = datetime.now(tz=timezone.utc)
 
-        if scheduled_time is None or scheduled_time < now:
-            scheduled_time_seconds = scheduler.idle_seconds
-            if scheduled_time_seconds is not None:
-                scheduled_time = now + timedelta(seconds=scheduled_time_seconds)
-            else:
-                scheduled_time = None
-            logger.info(f"Next schedule: {scheduled_time}")
+            if scheduled_time is None or scheduled_time < now:
+                scheduled_time_seconds = scheduler.idle_seconds
+                if scheduled_time_seconds is not None:
+                    scheduled_time = now + timedelta(seconds=scheduled_time_seconds)
+                else:
+                    scheduled_time = None
+                logger.info(f"Next schedule: {scheduled_time}")
+
+            scheduler.run_pending()
+            time.sleep(1)
+
+    def _run_adaptive_update_loop() -> None:
+        # ユーザごとの最近の配信状況から次回ポーリング時刻を決める
+        niconico_user_poll_scheduler = NiconicoUserPollScheduler(
+            min_interval=timedelta(seconds=adaptive_poll_min_interval),
+            base_interval=timedelta(seconds=update_interval),
+            max_interval=timedelta(seconds=adaptive_poll_max_interval),
+        )
+
+        runner.run(
+            run_adaptive_update_loop(
+                niconico_user_index=niconico_user_index,
+                niconico_user_icon_async_client=niconico_user_icon_async_client,
+                niconico_user_icon_cache_storage_manager=niconico_user_icon_cache_storage_manager,
+                niconico_user_icon_cache_metadata_manager=niconico_user_icon_cache_metadata_manager,
+                niconico_user_icon_pipeline_config=niconico_user_icon_pipeline_config,
+                niconico_user_broadcast_history_async_client=niconico_user_broadcast_history_async_client,
+                niconico_live_program_manager=niconico_live_program_manager,
+                niconico_live_program_state_store=niconico_live_program_state_store,
+                open_niconico_live_program_index=open_niconico_live_program_index,
+                niconico_user_poll_scheduler=niconico_user_poll_scheduler,
+                user_refresh_interval=timedelta(seconds=update_interval),
+                update_concurrency=update_concurrency,
+                program_upsert_chunk_size=program_upsert_chunk_size,
+                program_upsert_flush_interval=ADAPTIVE_PROGRAM_UPSERT_FLUSH_INTERVAL,
+                program_history_page_size=program_history_page_size,
+                program_history_max_pages=program_history_max_pages,
+                niconico_user_subscriber=niconico_user_subscriber,
+                user_subscription_reconnect_delay=USER_SUBSCRIPTION_RECONNECT_DELAY,
+                metrics=metrics,
+                tracer=tracer,
+            ),
+        )
 
-        scheduler.run_pending()
-        time.sleep(1)
+    metrics_server: ThreadingHTTPServer | None = None
+    if metrics is not None and metrics_port is not None:
+        metrics_server = start_metrics_server(
+            registry=metrics.registry,
+            host=metrics_host,
+            port=metrics_port,
+        )
+
+    with hasura_http_client, runner:
+        try:
+            if update_mode == "adaptive":
+                _run_adaptive_update_loop()
+            else:
+                _run_interval_update_loop()
+        finally:
+            runner.run(niconico_async_http_client.aclose())
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            if tracer is not None:
+                tracer.exporter.close()
+            if cassette_recorder is not None:
+                cassette_recorder.close()
 
 
 def execute_subcommand_update(
@@ -195,6 +573,10 @@ def execute_subcommand_update(
         storage_s3_region_name: str | None = args.storage_s3_region_name
         storage_s3_access_key_id: str | None = args.storage_s3_access_key_id
         storage_s3_secret_access_key: str | None = args.storage_s3_secret_access_key
+        storage_s3_max_pool_connections: int = args.storage_s3_max_pool_connections
+        storage_s3_multipart_threshold: int = args.storage_s3_multipart_threshold
+        storage_s3_max_concurrency: int = args.storage_s3_max_concurrency
+        storage_s3_listing_cache_ttl: float = args.storage_s3_listing_cache_ttl
 
         if (
             storage_s3_bucket_name is None
@@ -210,10 +592,137 @@ def execute_subcommand_update(
             storage_s3_region_name=storage_s3_region_name,
             storage_s3_access_key_id=storage_s3_access_key_id,
             storage_s3_secret_access_key=storage_s3_secret_access_key,
+            storage_s3_max_pool_connections=storage_s3_max_pool_connections,
+            storage_s3_multipart_threshold=storage_s3_multipart_threshold,
+            storage_s3_max_concurrency=storage_s3_max_concurrency,
+            storage_s3_listing_cache_ttl=(
+                storage_s3_listing_cache_ttl
+                if storage_s3_listing_cache_ttl > 0
+                else None
+            ),
         )
 
     useragent: str = args.useragent
+
+    update_mode_string: str = args.update_mode
+    if not validate_update_mode_string(update_mode_string):
+        raise ValueError("Invalid update mode string. Use 'interval' or 'adaptive'.")
+    update_mode: UpdateMode = update_mode_string
+
+    user_sync_mode_string: str = args.user_sync_mode
+    if not validate_user_sync_mode_string(user_sync_mode_string):
+        raise ValueError("Invalid user sync mode string. Use 'full' or 'incremental'.")
+    user_sync_mode: UserSyncMode = user_sync_mode_string
+    user_full_resync_interval: int = args.user_full_resync_interval
+
+    user_subscription: bool = args.user_subscription
+    if user_subscription and update_mode != "adaptive":
+        raise ValueError("User subscription requires the 'adaptive' update mode.")
+    if user_subscription and user_sync_mode != "incremental":
+        raise ValueError("User subscription requires the 'incremental' user sync mode.")
+    if user_subscription and not is_package_installed("websockets"):
+        raise ValueError(
+            "User subscription requires the websockets package. "
+            "Install the 'subscription' extra."
+        )
+
+    shard_index: int = args.shard_index
+    shard_count: int = args.shard_count
+    if shard_count < 1 or shard_index < 0 or shard_count <= shard_index:
+        raise ValueError("Invalid shard config. Use 0 <= shard_index < shard_count.")
+
+    # シャードが1つの場合は全ユーザを担当する
+    niconico_user_shard: NiconicoUserShard | None = None
+    if shard_count > 1:
+        niconico_user_shard = NiconicoUserShard(index=shard_index, count=shard_count)
+
     update_interval: int = args.update_interval
+    update_concurrency: int = args.update_concurrency
+    program_upsert_chunk_size: int = args.program_upsert_chunk_size
+    program_upsert_max_payload_bytes: int = args.program_upsert_max_payload_bytes
+    program_history_page_size: int = args.program_history_page_size
+    program_history_max_pages: int = args.program_history_max_pages
+
+    niconico_json_backend_string: str = args.niconico_json_backend
+    if not validate_json_backend_string(niconico_json_backend_string):
+        raise ValueError("Invalid json backend string. Use 'pydantic' or 'orjson'.")
+    niconico_json_backend: JsonBackend = niconico_json_backend_string
+    if niconico_json_backend == "orjson" and not is_package_installed("orjson"):
+        raise ValueError(
+            "The orjson json backend requires the orjson package. "
+            "Install the 'orjson' extra."
+        )
+
+    program_heartbeat_interval: int = args.program_heartbeat_interval
+    adaptive_poll_min_interval: int = args.adaptive_poll_min_interval
+    adaptive_poll_max_interval: int = args.adaptive_poll_max_interval
+
+    niconico_live_requests_per_second: float = args.niconico_live_requests_per_second
+    niconico_live_burst: int = args.niconico_live_burst
+    niconico_account_requests_per_second: float = (
+        args.niconico_account_requests_per_second
+    )
+    niconico_account_burst: int = args.niconico_account_burst
+    niconico_user_icon_requests_per_second: float = (
+        args.niconico_user_icon_requests_per_second
+    )
+    niconico_user_icon_burst: int = args.niconico_user_icon_burst
+
+    # トークンバケットはプロセスごとに持つため、全シャードの合計が指定した値になるよう分ける
+    niconico_live_rate_limit_rule = NiconicoApiRateLimitRule(
+        requests_per_second=niconico_live_requests_per_second / shard_count,
+        burst=max(1, niconico_live_burst // shard_count),
+    )
+    niconico_account_rate_limit_rule = NiconicoApiRateLimitRule(
+        requests_per_second=niconico_account_requests_per_second / shard_count,
+        burst=max(1, niconico_account_burst // shard_count),
+    )
+    niconico_user_icon_rate_limit_rule = NiconicoApiRateLimitRule(
+        requests_per_second=niconico_user_icon_requests_per_second / shard_count,
+        burst=max(1, niconico_user_icon_burst // shard_count),
+    )
+
+    icon_download_concurrency: int = args.icon_download_concurrency
+    icon_store_concurrency: int = args.icon_store_concurrency
+    icon_metadata_concurrency: int = args.icon_metadata_concurrency
+    icon_metadata_batch_size: int = args.icon_metadata_batch_size
+    icon_max_in_flight_bytes: int = args.icon_max_in_flight_bytes
+    icon_content_addressed: bool = args.icon_content_addressed
+    icon_revalidation_batch_size: int = args.icon_revalidation_batch_size
+    icon_revalidation_interval: int = args.icon_revalidation_interval
+    icon_metadata_lookup_chunk_size: int = args.icon_metadata_lookup_chunk_size
+    icon_metadata_lookup_concurrency: int = args.icon_metadata_lookup_concurrency
+    icon_metadata_cache_path: Path | None = args.icon_metadata_cache_path
+    icon_metadata_cache_reconcile_interval: float = (
+        args.icon_metadata_cache_reconcile_interval
+    )
+
+    http_max_connections: int = args.http_max_connections
+    http_max_keepalive_connections: int = args.http_max_keepalive_connections
+    http_keepalive_expiry: float = args.http_keepalive_expiry
+    http2: bool = args.http2
+    if http2 and not is_package_installed("h2"):
+        raise ValueError("HTTP/2 requires the h2 package. Install the 'http2' extra.")
+
+    metrics_host: str = args.metrics_host
+    metrics_port: int | None = args.metrics_port
+
+    trace_path: Path | None = args.trace_path
+
+    cassette_mode: CassetteMode | None = None
+    cassette_mode_string: str | None = args.cassette_mode
+    if cassette_mode_string is not None:
+        if not validate_cassette_mode_string(cassette_mode_string):
+            raise ValueError("Invalid cassette mode string. Use 'record' or 'replay'.")
+        cassette_mode = cassette_mode_string
+
+    cassette_path: Path | None = args.cassette_path
+    if cassette_mode is not None and cassette_path is None:
+        raise ValueError("Cassette mode requires cassette_path.")
+    if cassette_mode == "replay" and user_subscription:
+        raise ValueError("User subscription cannot be replayed from a cassette.")
+
+    cassette_time_scale: float = args.cassette_time_scale
 
     subcommand_update(
         args=SubcommandUpdateArguments(
@@ -223,7 +732,50 @@ def execute_subcommand_update(
             storage_file_config=storage_file_config,
             storage_s3_config=storage_s3_config,
             useragent=useragent,
+            update_mode=update_mode,
+            user_sync_mode=user_sync_mode,
+            user_full_resync_interval=user_full_resync_interval,
+            user_subscription=user_subscription,
+            niconico_user_shard=niconico_user_shard,
             update_interval=update_interval,
+            update_concurrency=update_concurrency,
+            program_upsert_chunk_size=program_upsert_chunk_size,
+            program_upsert_max_payload_bytes=program_upsert_max_payload_bytes,
+            program_history_page_size=program_history_page_size,
+            program_history_max_pages=program_history_max_pages,
+            niconico_json_backend=niconico_json_backend,
+            program_heartbeat_interval=program_heartbeat_interval,
+            adaptive_poll_min_interval=adaptive_poll_min_interval,
+            adaptive_poll_max_interval=adaptive_poll_max_interval,
+            niconico_live_rate_limit_rule=niconico_live_rate_limit_rule,
+            niconico_account_rate_limit_rule=niconico_account_rate_limit_rule,
+            niconico_user_icon_rate_limit_rule=niconico_user_icon_rate_limit_rule,
+            niconico_user_icon_pipeline_config=NiconicoUserIconPipelineConfig(
+                download_concurrency=icon_download_concurrency,
+                store_concurrency=icon_store_concurrency,
+                metadata_concurrency=icon_metadata_concurrency,
+                metadata_batch_size=icon_metadata_batch_size,
+                max_in_flight_bytes=icon_max_in_flight_bytes,
+                content_addressed=icon_content_addressed,
+                revalidation_batch_size=icon_revalidation_batch_size,
+                revalidation_interval=icon_revalidation_interval,
+            ),
+            icon_metadata_lookup_chunk_size=icon_metadata_lookup_chunk_size,
+            icon_metadata_lookup_concurrency=icon_metadata_lookup_concurrency,
+            icon_metadata_cache_path=icon_metadata_cache_path,
+            icon_metadata_cache_reconcile_interval=icon_metadata_cache_reconcile_interval,
+            http_client_config=HttpClientConfig(
+                max_connections=http_max_connections,
+                max_keepalive_connections=http_max_keepalive_connections,
+                keepalive_expiry=http_keepalive_expiry,
+                http2=http2,
+            ),
+            metrics_host=metrics_host,
+            metrics_port=metrics_port,
+            trace_path=trace_path,
+            cassette_mode=cassette_mode,
+            cassette_path=cassette_path,
+            cassette_time_scale=cassette_time_scale,
         ),
     )
 
@@ -283,6 +835,33 @@ def add_arguments_subcommand_update(
         type=str,
         default=app_config.storage_s3_secret_access_key,
     )
+    parser.add_argument(
+        "--storage_s3_max_pool_connections",
+        type=int,
+        default=app_config.storage_s3_max_pool_connections,
+        help="Maximum number of connections kept by the S3 client",
+    )
+    parser.add_argument(
+        "--storage_s3_multipart_threshold",
+        type=int,
+        default=app_config.storage_s3_multipart_threshold,
+        help="Size in bytes above which uploads to S3 are split into parts",
+    )
+    parser.add_argument(
+        "--storage_s3_max_concurrency",
+        type=int,
+        default=app_config.storage_s3_max_concurrency,
+        help="Maximum number of threads used by a single S3 upload",
+    )
+    parser.add_argument(
+        "--storage_s3_listing_cache_ttl",
+        type=float,
+        default=app_config.storage_s3_listing_cache_ttl,
+        help=(
+            "Seconds to reuse the S3 object listing for existence checks "
+            "(0 to check each object with HEAD)"
+        ),
+    )
 
     parser.add_argument(
         "--useragent",
@@ -290,6 +869,59 @@ def add_arguments_subcommand_update(
         default=app_config.useragent,
         required=app_config.useragent is None,
     )
+    parser.add_argument(
+        "--update_mode",
+        type=str,
+        default=app_config.update_mode,
+        help=(
+            "'interval' updates all users every update_interval seconds. "
+            "'adaptive' polls each user at an interval based on their recent "
+            "activity and reloads the user list every update_interval seconds."
+        ),
+    )
+    parser.add_argument(
+        "--user_sync_mode",
+        type=str,
+        default=app_config.user_sync_mode,
+        help=(
+            "'full' fetches all niconico_users every cycle. "
+            "'incremental' fetches only niconico_users updated since the last cycle "
+            "(requires niconico_users.updated_at)."
+        ),
+    )
+    parser.add_argument(
+        "--user_full_resync_interval",
+        type=int,
+        default=app_config.user_full_resync_interval,
+        help="Seconds between full niconico_users resyncs in incremental mode",
+    )
+    parser.add_argument(
+        "--user_subscription",
+        action=BooleanOptionalAction,
+        default=app_config.user_subscription,
+        help=(
+            "Receive added and updated niconico_users "
+            "through a Hasura streaming subscription instead of polling "
+            "(requires the 'subscription' extra, 'adaptive' update mode "
+            "and 'incremental' user sync mode)"
+        ),
+    )
+    parser.add_argument(
+        "--shard_index",
+        type=int,
+        default=app_config.shard_index,
+        help="Index of the shard of niconico_users this process updates (0-based)",
+    )
+    parser.add_argument(
+        "--shard_count",
+        type=int,
+        default=app_config.shard_count,
+        help=(
+            "Number of processes sharing niconico_users. "
+            "Each niconico_user is assigned to one shard by a stable hash of "
+            "remote_niconico_user_id"
+        ),
+    )
     parser.add_argument(
         "--update_interval",
         type=int,
@@ -297,5 +929,251 @@ def add_arguments_subcommand_update(
         required=app_config.update_interval is None,
         help="Update interval in seconds",
     )
+    parser.add_argument(
+        "--update_concurrency",
+        type=int,
+        default=app_config.update_concurrency,
+        help="Number of niconico users whose live programs are fetched concurrently",
+    )
+    parser.add_argument(
+        "--program_upsert_chunk_size",
+        type=int,
+        default=app_config.program_upsert_chunk_size,
+        help="Maximum number of live programs upserted in a single Hasura mutation",
+    )
+    parser.add_argument(
+        "--program_upsert_max_payload_bytes",
+        type=int,
+        default=app_config.program_upsert_max_payload_bytes,
+        help="Maximum payload size of a single live program upsert mutation",
+    )
+    parser.add_argument(
+        "--program_history_page_size",
+        type=int,
+        default=app_config.program_history_page_size,
+        help="Number of live programs fetched per broadcast history page",
+    )
+    parser.add_argument(
+        "--program_history_max_pages",
+        type=int,
+        default=app_config.program_history_max_pages,
+        help=(
+            "Maximum number of broadcast history pages fetched per user poll. "
+            "Paging stops early at an unchanged ENDED live program"
+        ),
+    )
+    parser.add_argument(
+        "--niconico_json_backend",
+        type=str,
+        default=app_config.niconico_json_backend,
+        help=(
+            "JSON parser for broadcast history responses. "
+            "'pydantic' validates the response bytes directly. "
+            "'orjson' requires the 'orjson' extra"
+        ),
+    )
+    parser.add_argument(
+        "--program_heartbeat_interval",
+        type=int,
+        default=app_config.program_heartbeat_interval,
+        help="Seconds after which an unchanged live program is upserted again",
+    )
+    parser.add_argument(
+        "--adaptive_poll_min_interval",
+        type=int,
+        default=app_config.adaptive_poll_min_interval,
+        help="Poll interval in seconds for users who are on air (adaptive mode)",
+    )
+    parser.add_argument(
+        "--adaptive_poll_max_interval",
+        type=int,
+        default=app_config.adaptive_poll_max_interval,
+        help="Poll interval in seconds for users who have been inactive for long (adaptive mode)",
+    )
+
+    parser.add_argument(
+        "--niconico_live_requests_per_second",
+        type=float,
+        default=app_config.niconico_live_requests_per_second,
+        help="Rate limit for live.nicovideo.jp, shared by all shards",
+    )
+    parser.add_argument(
+        "--niconico_live_burst",
+        type=int,
+        default=app_config.niconico_live_burst,
+        help="Burst size for live.nicovideo.jp, shared by all shards",
+    )
+    parser.add_argument(
+        "--niconico_account_requests_per_second",
+        type=float,
+        default=app_config.niconico_account_requests_per_second,
+        help="Rate limit for account.nicovideo.jp, shared by all shards",
+    )
+    parser.add_argument(
+        "--niconico_account_burst",
+        type=int,
+        default=app_config.niconico_account_burst,
+        help="Burst size for account.nicovideo.jp, shared by all shards",
+    )
+    parser.add_argument(
+        "--niconico_user_icon_requests_per_second",
+        type=float,
+        default=app_config.niconico_user_icon_requests_per_second,
+        help="Rate limit for secure-dcdn.cdn.nimg.jp, shared by all shards",
+    )
+    parser.add_argument(
+        "--niconico_user_icon_burst",
+        type=int,
+        default=app_config.niconico_user_icon_burst,
+        help="Burst size for secure-dcdn.cdn.nimg.jp, shared by all shards",
+    )
+
+    parser.add_argument(
+        "--icon_download_concurrency",
+        type=int,
+        default=app_config.icon_download_concurrency,
+        help="Number of niconico user icons downloaded concurrently",
+    )
+    parser.add_argument(
+        "--icon_store_concurrency",
+        type=int,
+        default=app_config.icon_store_concurrency,
+        help="Number of niconico user icons written to the storage concurrently",
+    )
+    parser.add_argument(
+        "--icon_metadata_concurrency",
+        type=int,
+        default=app_config.icon_metadata_concurrency,
+        help="Number of concurrent niconico user icon metadata saves",
+    )
+    parser.add_argument(
+        "--icon_metadata_batch_size",
+        type=int,
+        default=app_config.icon_metadata_batch_size,
+        help="Maximum number of niconico user icon metadatas saved at once",
+    )
+    parser.add_argument(
+        "--icon_max_in_flight_bytes",
+        type=int,
+        default=app_config.icon_max_in_flight_bytes,
+        help="Maximum total bytes of downloaded niconico user icons waiting to be stored",
+    )
+    parser.add_argument(
+        "--icon_content_addressed",
+        action=BooleanOptionalAction,
+        default=app_config.icon_content_addressed,
+        help=(
+            "Name stored niconico user icons by the digest of their content "
+            "and skip uploading content that is already stored"
+        ),
+    )
+    parser.add_argument(
+        "--icon_revalidation_batch_size",
+        type=int,
+        default=app_config.icon_revalidation_batch_size,
+        help="Maximum number of cached niconico user icons revalidated per cycle (0 to disable)",
+    )
+    parser.add_argument(
+        "--icon_revalidation_interval",
+        type=int,
+        default=app_config.icon_revalidation_interval,
+        help="Seconds after which a cached niconico user icon is revalidated",
+    )
+    parser.add_argument(
+        "--icon_metadata_lookup_chunk_size",
+        type=int,
+        default=app_config.icon_metadata_lookup_chunk_size,
+        help="Maximum number of icon URLs in a single icon metadata lookup query",
+    )
+    parser.add_argument(
+        "--icon_metadata_lookup_concurrency",
+        type=int,
+        default=app_config.icon_metadata_lookup_concurrency,
+        help="Number of icon metadata lookup queries run concurrently",
+    )
+    parser.add_argument(
+        "--icon_metadata_cache_path",
+        type=Path,
+        default=app_config.icon_metadata_cache_path,
+        help="SQLite file to keep known niconico user icon metadatas locally (optional)",
+    )
+    parser.add_argument(
+        "--icon_metadata_cache_reconcile_interval",
+        type=float,
+        default=app_config.icon_metadata_cache_reconcile_interval,
+        help="Seconds between full reconciliations of the local icon metadata cache",
+    )
+
+    parser.add_argument(
+        "--http_max_connections",
+        type=int,
+        default=app_config.http_max_connections,
+        help="Maximum number of connections per HTTP client pool",
+    )
+    parser.add_argument(
+        "--http_max_keepalive_connections",
+        type=int,
+        default=app_config.http_max_keepalive_connections,
+        help="Maximum number of idle keep-alive connections per HTTP client pool",
+    )
+    parser.add_argument(
+        "--http_keepalive_expiry",
+        type=float,
+        default=app_config.http_keepalive_expiry,
+        help="Seconds to keep an idle connection alive",
+    )
+    parser.add_argument(
+        "--http2",
+        action=BooleanOptionalAction,
+        default=app_config.http2,
+        help="Use HTTP/2 (requires the 'http2' extra)",
+    )
+
+    parser.add_argument(
+        "--metrics_host",
+        type=str,
+        default=app_config.metrics_host,
+        help="Address to serve Prometheus metrics on",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=app_config.metrics_port,
+        help="Port to serve Prometheus metrics on /metrics (optional)",
+    )
+
+    parser.add_argument(
+        "--trace_path",
+        type=Path,
+        default=app_config.trace_path,
+        help="JSON Lines file to append spans of each update cycle to (optional)",
+    )
+
+    parser.add_argument(
+        "--cassette_mode",
+        type=str,
+        default=app_config.cassette_mode,
+        help=(
+            "'record' writes every request and response to Hasura and niconico "
+            "to cassette_path. "
+            "'replay' serves them from cassette_path without network access "
+            "(optional)"
+        ),
+    )
+    parser.add_argument(
+        "--cassette_path",
+        type=Path,
+        default=app_config.cassette_path,
+        help="Cassette file to record to or replay from",
+    )
+    parser.add_argument(
+        "--cassette_time_scale",
+        type=float,
+        default=app_config.cassette_time_scale,
+        help=(
+            "Multiplier for the recorded response times on replay "
+            "(0 replays without waiting)"
+        ),
+    )
 
     parser.set_defaults(handler=execute_subcommand_update)
@@ -0,0 +1,16 @@
+from .exporter import JsonLinesTraceSpanExporter, TraceSpanExporter
+from .http_transport import TracingAsyncHttpTransport, TracingHttpTransport
+from .span import TraceSpan, TraceSpanAttributeValue, TraceSpanStatus
+from .tracer import Tracer, trace_span
+
+__all__ = [
+    "JsonLinesTraceSpanExporter",
+    "TraceSpanExporter",
+    "TracingAsyncHttpTransport",
+    "TracingHttpTransport",
+    "TraceSpan",
+    "TraceSpanAttributeValue",
+    "TraceSpanStatus",
+    "Tracer",
+    "trace_span",
+]
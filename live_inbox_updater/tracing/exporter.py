@@ -0,0 +1,55 @@
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from .span import TraceSpan
+
+
+class TraceSpanExporter(ABC):
+    @abstractmethod
+    def export(
+        self,
+        span: TraceSpan,
+    ) -> None:
+        """
+        終了したスパンを書き出す。スレッドやイベントループをまたいで呼ばれる
+        """
+        ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+
+class JsonLinesTraceSpanExporter(TraceSpanExporter):
+    """
+    終了したスパンを1行1件のJSONとしてpathに追記する
+
+    ルートのスパンを書いたときにファイルへ反映するため、
+    トレースはルートのスパンが終わった時点でまとめて読める
+    """
+
+    def __init__(
+        self,
+        path: Path,
+    ):
+        self.path = path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__file = path.open("a", encoding="utf-8")
+
+    def export(
+        self,
+        span: TraceSpan,
+    ) -> None:
+        line = span.model_dump_json() + "\n"
+
+        with self.__lock:
+            self.__file.write(line)
+            if span.parent_span_id is None:
+                self.__file.flush()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__file.close()
@@ -0,0 +1,119 @@
+from typing import Callable
+
+import httpx
+
+from ..http_client import wrap_async_response_on_close, wrap_response_on_close
+from .span import TraceSpan
+from .tracer import Tracer
+
+
+def _create_request_span(
+    tracer: Tracer,
+    service: str,
+    get_target: Callable[[httpx.Request], str],
+    request: httpx.Request,
+) -> TraceSpan:
+    return tracer.create_span(
+        name=f"{service} {get_target(request)}",
+        attributes={
+            "http.method": request.method,
+            "http.host": request.url.host,
+            "http.path": request.url.path,
+        },
+    )
+
+
+class TracingHttpTransport(httpx.BaseTransport):
+    """
+    リクエストごとに、レスポンスボディを読み終えるまでのスパンを記録するトランスポート
+
+    スパン名は「service target」とし、get_targetでtargetを決める
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        tracer: Tracer,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.tracer = tracer
+        self.service = service
+        self.get_target = get_target
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        tracer = self.tracer
+
+        span = _create_request_span(
+            tracer=tracer,
+            service=self.service,
+            get_target=self.get_target,
+            request=request,
+        )
+
+        try:
+            response = self.transport.handle_request(request)
+        except Exception as error:
+            tracer.end_span(span=span, error=error)
+            raise
+
+        span.attributes["http.status_code"] = response.status_code
+
+        return wrap_response_on_close(
+            response=response,
+            on_close=lambda: tracer.end_span(span=span),
+        )
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class TracingAsyncHttpTransport(httpx.AsyncBaseTransport):
+    """
+    TracingHttpTransportの非同期版
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        tracer: Tracer,
+        service: str,
+        get_target: Callable[[httpx.Request], str],
+    ):
+        self.transport = transport
+        self.tracer = tracer
+        self.service = service
+        self.get_target = get_target
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        tracer = self.tracer
+
+        span = _create_request_span(
+            tracer=tracer,
+            service=self.service,
+            get_target=self.get_target,
+            request=request,
+        )
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception as error:
+            tracer.end_span(span=span, error=error)
+            raise
+
+        span.attributes["http.status_code"] = response.status_code
+
+        return wrap_async_response_on_close(
+            response=response,
+            on_close=lambda: tracer.end_span(span=span),
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
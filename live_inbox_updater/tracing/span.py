@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+TraceSpanAttributeValue = str | int | float | bool
+TraceSpanStatus = Literal["ok", "error"]
+
+
+class TraceSpan(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    name: str
+    start_time: datetime
+    end_time: datetime | None = None
+    duration_seconds: float | None = None
+    attributes: dict[str, TraceSpanAttributeValue] = {}
+    status: TraceSpanStatus = "ok"
+    error: str | None = None
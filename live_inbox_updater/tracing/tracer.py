@@ -0,0 +1,120 @@
+import secrets
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator, Mapping
+
+from .exporter import TraceSpanExporter
+from .span import TraceSpan, TraceSpanAttributeValue
+
+# 実行中のスパン。asyncioのタスクやasyncio.to_threadには作成時の値が引き継がれる
+_current_span: ContextVar[TraceSpan | None] = ContextVar(
+    "live_inbox_updater_current_span",
+    default=None,
+)
+
+
+class Tracer:
+    """
+    スパンを作り、終了したものをexporterに渡す
+
+    親のスパンは実行中のコンテキストから決める。
+    親がない場合、またはnew_traceを指定した場合は新しいトレースを始める
+    """
+
+    def __init__(
+        self,
+        exporter: TraceSpanExporter,
+    ):
+        self.exporter = exporter
+
+    def create_span(
+        self,
+        name: str,
+        attributes: Mapping[str, TraceSpanAttributeValue] | None = None,
+        new_trace: bool = False,
+    ) -> TraceSpan:
+        """
+        スパンを作る。実行中のスパンにはしないため、子のスパンの親にはならない
+        """
+
+        parent_span = None if new_trace else _current_span.get()
+
+        return TraceSpan(
+            trace_id=(
+                parent_span.trace_id
+                if parent_span is not None
+                else secrets.token_hex(16)
+            ),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent_span.span_id if parent_span is not None else None,
+            name=name,
+            start_time=datetime.now(tz=timezone.utc),
+            attributes=dict(attributes or {}),
+        )
+
+    def end_span(
+        self,
+        span: TraceSpan,
+        error: BaseException | None = None,
+    ) -> None:
+        end_time = datetime.now(tz=timezone.utc)
+
+        span.end_time = end_time
+        span.duration_seconds = (end_time - span.start_time).total_seconds()
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+
+        self.exporter.export(span=span)
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        attributes: Mapping[str, TraceSpanAttributeValue] | None = None,
+        new_trace: bool = False,
+    ) -> Iterator[TraceSpan]:
+        """
+        ブロックの間、作ったスパンを実行中のスパンにする
+        """
+
+        span = self.create_span(
+            name=name,
+            attributes=attributes,
+            new_trace=new_trace,
+        )
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            self.end_span(span=span, error=error)
+            raise
+        else:
+            self.end_span(span=span)
+        finally:
+            _current_span.reset(token)
+
+
+@contextmanager
+def trace_span(
+    tracer: Tracer | None,
+    name: str,
+    attributes: Mapping[str, TraceSpanAttributeValue] | None = None,
+    new_trace: bool = False,
+) -> Iterator[TraceSpan | None]:
+    """
+    tracerがある場合だけ、ブロックの間スパンを記録する
+    """
+
+    if tracer is None:
+        yield None
+        return
+
+    with tracer.start_span(
+        name=name,
+        attributes=attributes,
+        new_trace=new_trace,
+    ) as span:
+        yield span
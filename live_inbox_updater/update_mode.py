@@ -0,0 +1,15 @@
+from typing import Literal, TypeGuard
+
+UpdateMode = Literal["interval", "adaptive"]
+
+
+def validate_update_mode_string(
+    string: str,
+) -> TypeGuard[UpdateMode]:
+    if string == "interval":
+        return True
+
+    if string == "adaptive":
+        return True
+
+    return False
@@ -0,0 +1,15 @@
+from typing import Literal, TypeGuard
+
+UserSyncMode = Literal["full", "incremental"]
+
+
+def validate_user_sync_mode_string(
+    string: str,
+) -> TypeGuard[UserSyncMode]:
+    if string == "full":
+        return True
+
+    if string == "incremental":
+        return True
+
+    return False
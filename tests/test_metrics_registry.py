@@ -0,0 +1,151 @@
+import pytest
+
+from live_inbox_updater.metrics import MetricsRegistry
+
+
+def test_render_counter() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter(
+        name="live_inbox_requests_total",
+        documentation="Requests",
+        label_names=("host", "status"),
+    )
+    counter.inc(labels={"host": "live.nicovideo.jp", "status": "200"})
+    counter.inc(2, labels={"host": "live.nicovideo.jp", "status": "200"})
+    counter.inc(labels={"host": "live.nicovideo.jp", "status": "503"})
+
+    assert registry.render() == (
+        "# HELP live_inbox_requests_total Requests\n"
+        "# TYPE live_inbox_requests_total counter\n"
+        'live_inbox_requests_total{host="live.nicovideo.jp",status="200"} 3.0\n'
+        'live_inbox_requests_total{host="live.nicovideo.jp",status="503"} 1.0\n'
+    )
+
+
+def test_render_counter_without_labels() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter(
+        name="live_inbox_cycles_total",
+        documentation="Cycles",
+    )
+    counter.inc()
+
+    assert registry.render() == (
+        "# HELP live_inbox_cycles_total Cycles\n"
+        "# TYPE live_inbox_cycles_total counter\n"
+        "live_inbox_cycles_total 1.0\n"
+    )
+
+
+def test_render_histogram() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        name="live_inbox_request_duration_seconds",
+        documentation="Request duration",
+        label_names=("host",),
+        buckets=(0.1, 1.0),
+    )
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, labels={"host": "a"})
+
+    name = "live_inbox_request_duration_seconds"
+    assert registry.render() == (
+        f"# HELP {name} Request duration\n"
+        f"# TYPE {name} histogram\n"
+        f'{name}_bucket{{host="a",le="0.1"}} 2\n'
+        f'{name}_bucket{{host="a",le="1.0"}} 3\n'
+        f'{name}_bucket{{host="a",le="+Inf"}} 4\n'
+        f'{name}_sum{{host="a"}} 3.65\n'
+        f'{name}_count{{host="a"}} 4\n'
+    )
+
+
+def test_render_escapes_label_values_and_documentation() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter(
+        name="live_inbox_errors_total",
+        documentation="Errors\nby \\ message",
+        label_names=("message",),
+    )
+    counter.inc(labels={"message": 'a "quoted"\nback\\slash'})
+
+    assert registry.render() == (
+        "# HELP live_inbox_errors_total Errors\\nby \\\\ message\n"
+        "# TYPE live_inbox_errors_total counter\n"
+        'live_inbox_errors_total{message="a \\"quoted\\"\\nback\\\\slash"} 1.0\n'
+    )
+
+
+def test_render_metrics_in_registration_order() -> None:
+    registry = MetricsRegistry()
+    registry.counter(name="b_total", documentation="b").inc()
+    registry.counter(name="a_total", documentation="a").inc()
+
+    lines = registry.render().splitlines()
+
+    assert lines.index("b_total 1.0") < lines.index("a_total 1.0")
+
+
+def test_duplicated_metric_name() -> None:
+    registry = MetricsRegistry()
+    registry.counter(name="live_inbox_cycles_total", documentation="Cycles")
+
+    with pytest.raises(ValueError):
+        registry.histogram(name="live_inbox_cycles_total", documentation="Cycles")
+
+
+def test_invalid_metric_values() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter(name="live_inbox_cycles_total", documentation="Cycles")
+
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+
+    with pytest.raises(ValueError):
+        registry.histogram(
+            name="live_inbox_durations",
+            documentation="Durations",
+            buckets=(1.0, 0.1),
+        )
+
+
+def test_render_is_parsed_by_prometheus_client() -> None:
+    """
+    prometheus_clientがあれば、公式のパーサで読めることも確認する
+    """
+
+    parser = pytest.importorskip("prometheus_client.parser")
+
+    registry = MetricsRegistry()
+    counter = registry.counter(
+        name="live_inbox_requests_total",
+        documentation="Requests",
+        label_names=("host",),
+    )
+    counter.inc(labels={"host": 'a "b"'})
+    histogram = registry.histogram(
+        name="live_inbox_request_duration_seconds",
+        documentation="Request duration",
+        buckets=(0.1,),
+    )
+    histogram.observe(0.05)
+
+    families = {
+        family.name: family
+        for family in parser.text_string_to_metric_families(registry.render())
+    }
+
+    requests_family = families["live_inbox_requests"]
+    assert requests_family.type == "counter"
+    assert [sample.labels for sample in requests_family.samples] == [{"host": 'a "b"'}]
+
+    duration_family = families["live_inbox_request_duration_seconds"]
+    assert duration_family.type == "histogram"
+    assert {
+        sample.name: sample.value
+        for sample in duration_family.samples
+        if sample.name.endswith(("_count", "_sum"))
+    } == {
+        "live_inbox_request_duration_seconds_count": 1.0,
+        "live_inbox_request_duration_seconds_sum": 0.05,
+    }
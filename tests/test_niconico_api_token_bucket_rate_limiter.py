@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+import pytest
+
+from live_inbox_updater.niconico_api.niconico_rate_limiter import (
+    NiconicoApiRateLimitRule,
+    NiconicoApiTokenBucketRateLimiter,
+)
+
+HOST = "live.nicovideo.jp"
+
+# 待機する場合も実時間では数ミリ秒で終わるよう、大きなレートにする
+RATE = 1000.0
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def create_rate_limiter(
+    clock: FakeClock,
+    burst: int,
+) -> NiconicoApiTokenBucketRateLimiter:
+    return NiconicoApiTokenBucketRateLimiter(
+        rules={
+            HOST: NiconicoApiRateLimitRule(requests_per_second=RATE, burst=burst),
+        },
+        clock=clock,
+    )
+
+
+def test_burst_is_not_delayed() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock=clock, burst=3)
+
+    wait_seconds_list = [rate_limiter.acquire(host=HOST) for _ in range(3)]
+
+    assert wait_seconds_list == [0.0, 0.0, 0.0]
+
+
+def test_requests_after_burst_wait_in_reservation_order() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock=clock, burst=2)
+
+    wait_seconds_list = [rate_limiter.acquire(host=HOST) for _ in range(5)]
+
+    assert wait_seconds_list == pytest.approx(
+        [0.0, 0.0, 1 / RATE, 2 / RATE, 3 / RATE],
+    )
+
+
+def test_tokens_refill_with_elapsed_time() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock=clock, burst=2)
+
+    rate_limiter.acquire(host=HOST)
+    rate_limiter.acquire(host=HOST)
+
+    clock.advance(1 / RATE)
+    assert rate_limiter.acquire(host=HOST) == 0.0
+    assert rate_limiter.acquire(host=HOST) == pytest.approx(1 / RATE)
+
+
+def test_tokens_refill_up_to_burst() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock=clock, burst=2)
+
+    rate_limiter.acquire(host=HOST)
+    rate_limiter.acquire(host=HOST)
+
+    clock.advance(3600.0)
+    wait_seconds_list = [rate_limiter.acquire(host=HOST) for _ in range(3)]
+
+    assert wait_seconds_list == pytest.approx([0.0, 0.0, 1 / RATE])
+
+
+def test_unknown_host_is_not_limited() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock=clock, burst=1)
+
+    wait_seconds_list = [rate_limiter.acquire(host="example.com") for _ in range(3)]
+
+    assert wait_seconds_list == [0.0, 0.0, 0.0]
+
+
+def test_invalid_rule() -> None:
+    with pytest.raises(ValueError):
+        NiconicoApiTokenBucketRateLimiter(
+            rules={HOST: NiconicoApiRateLimitRule(requests_per_second=0, burst=1)},
+        )
+
+    with pytest.raises(ValueError):
+        NiconicoApiTokenBucketRateLimiter(
+            rules={HOST: NiconicoApiRateLimitRule(requests_per_second=1, burst=0)},
+        )
+
+
+def test_sync_and_async_callers_share_one_bucket() -> None:
+    """
+    スレッドからの同期呼び出しとイベントループからの非同期呼び出しが、
+    同じホストのバケットから重複なく予約する
+    """
+
+    clock = FakeClock()
+    burst = 2
+    rate_limiter = create_rate_limiter(clock=clock, burst=burst)
+
+    thread_count = 4
+    sync_calls_per_thread = 5
+    async_calls = 20
+
+    wait_seconds_list: list[float] = []
+    wait_seconds_lock = threading.Lock()
+    start_barrier = threading.Barrier(thread_count + 1)
+
+    def _acquire_sync() -> None:
+        start_barrier.wait()
+        for _ in range(sync_calls_per_thread):
+            wait_seconds = rate_limiter.acquire(host=HOST)
+            with wait_seconds_lock:
+                wait_seconds_list.append(wait_seconds)
+
+    async def _acquire_async() -> None:
+        wait_seconds = await rate_limiter.acquire_async(host=HOST)
+        with wait_seconds_lock:
+            wait_seconds_list.append(wait_seconds)
+
+    async def _run_async_callers() -> None:
+        start_barrier.wait()
+        async with asyncio.TaskGroup() as task_group:
+            for _ in range(async_calls):
+                task_group.create_task(_acquire_async())
+
+    threads = [threading.Thread(target=_acquire_sync) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+
+    asyncio.run(_run_async_callers())
+
+    for thread in threads:
+        thread.join()
+
+    # 時刻を止めているため、burstを超えた分は1件ずつ1/RATE秒後ろにずれる
+    total_calls = thread_count * sync_calls_per_thread + async_calls
+    expected = [0.0] * burst + [
+        index / RATE for index in range(1, total_calls - burst + 1)
+    ]
+    assert sorted(wait_seconds_list) == pytest.approx(expected)
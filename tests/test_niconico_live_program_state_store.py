@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+
+from live_inbox_updater.live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+from live_inbox_updater.live_inbox_utility import NiconicoLiveProgramStateStore
+from live_inbox_updater.niconico_api.niconico_user_broadcast_history_client import (
+    NiconicoApiNiconicoUserBroadcastProgram,
+)
+
+HEARTBEAT_INTERVAL = timedelta(hours=1)
+
+FETCH_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+START_TIME = datetime(2023, 12, 31, 12, tzinfo=timezone.utc)
+END_TIME = datetime(2023, 12, 31, 14, tzinfo=timezone.utc)
+
+
+def create_upsert_object(
+    remote_niconico_content_id: str = "lv1",
+    remote_niconico_user_id: str = "1000",
+    title: str = "title",
+    status: str = "ENDED",
+    last_fetch_time: datetime = FETCH_TIME,
+    end_time: datetime | None = END_TIME,
+) -> LiveInboxApiNiconicoLiveProgramUpsertObject:
+    return LiveInboxApiNiconicoLiveProgramUpsertObject(
+        remote_niconico_content_id=remote_niconico_content_id,
+        remote_niconico_user_id=remote_niconico_user_id,
+        title=title,
+        status=status,
+        last_fetch_time=last_fetch_time,
+        start_time=START_TIME,
+        end_time=end_time,
+    )
+
+
+def create_program(
+    niconico_content_id: str = "lv1",
+    niconico_user_id: str = "1000",
+    title: str = "title",
+    status: str = "ENDED",
+) -> NiconicoApiNiconicoUserBroadcastProgram:
+    return NiconicoApiNiconicoUserBroadcastProgram(
+        niconico_content_id=niconico_content_id,
+        title=title,
+        description="",
+        status=status,
+        niconico_user_id=niconico_user_id,
+        start_time=START_TIME,
+        end_time=END_TIME,
+    )
+
+
+def create_state_store() -> NiconicoLiveProgramStateStore:
+    return NiconicoLiveProgramStateStore(heartbeat_interval=HEARTBEAT_INTERVAL)
+
+
+def test_filter_changed_returns_new_programs() -> None:
+    state_store = create_state_store()
+    upsert_object = create_upsert_object()
+
+    assert state_store.filter_changed(upsert_objects=[upsert_object]) == [upsert_object]
+
+
+def test_filter_changed_skips_unchanged_programs() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+
+    upsert_object = create_upsert_object(
+        last_fetch_time=FETCH_TIME + timedelta(minutes=5),
+    )
+
+    assert state_store.filter_changed(upsert_objects=[upsert_object]) == []
+
+
+def test_filter_changed_returns_changed_programs() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(
+        upsert_objects=[create_upsert_object(status="ON_AIR", end_time=None)],
+    )
+
+    upsert_objects = [
+        create_upsert_object(title="new title", status="ON_AIR", end_time=None),
+        create_upsert_object(status="ENDED"),
+    ]
+    for upsert_object in upsert_objects:
+        assert state_store.filter_changed(upsert_objects=[upsert_object]) == [
+            upsert_object
+        ]
+
+
+def test_filter_changed_returns_programs_after_heartbeat_interval() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+
+    before_heartbeat = create_upsert_object(
+        last_fetch_time=FETCH_TIME + HEARTBEAT_INTERVAL - timedelta(seconds=1),
+    )
+    at_heartbeat = create_upsert_object(
+        last_fetch_time=FETCH_TIME + HEARTBEAT_INTERVAL,
+    )
+
+    assert state_store.filter_changed(upsert_objects=[before_heartbeat]) == []
+    assert state_store.filter_changed(upsert_objects=[at_heartbeat]) == [at_heartbeat]
+
+
+def test_filter_changed_does_not_record_state() -> None:
+    """
+    書き込みに失敗した場合に再送できるよう、filter_changedだけでは状態を記録しない
+    """
+
+    state_store = create_state_store()
+    upsert_object = create_upsert_object()
+
+    state_store.filter_changed(upsert_objects=[upsert_object])
+
+    assert state_store.get(remote_niconico_content_id="lv1") is None
+    assert state_store.filter_changed(upsert_objects=[upsert_object]) == [upsert_object]
+
+
+def test_is_ended_and_unchanged() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+
+    assert state_store.is_ended_and_unchanged(program=create_program())
+
+
+def test_is_ended_and_unchanged_unknown_program() -> None:
+    state_store = create_state_store()
+
+    assert not state_store.is_ended_and_unchanged(program=create_program())
+
+
+def test_is_ended_and_unchanged_changed_program() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+
+    assert not state_store.is_ended_and_unchanged(
+        program=create_program(title="new title"),
+    )
+    assert not state_store.is_ended_and_unchanged(
+        program=create_program(niconico_user_id="2000"),
+    )
+
+
+def test_is_ended_and_unchanged_not_ended_program() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(
+        upsert_objects=[create_upsert_object(status="ON_AIR", end_time=None)],
+    )
+
+    assert not state_store.is_ended_and_unchanged(program=create_program())
+
+
+def test_prune_discards_programs_not_seen_for_twice_heartbeat_interval() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(
+        upsert_objects=[
+            create_upsert_object(remote_niconico_content_id="lv1"),
+            create_upsert_object(
+                remote_niconico_content_id="lv2",
+                remote_niconico_user_id="2000",
+            ),
+        ],
+    )
+
+    # lv1だけ後で再び取得する
+    state_store.filter_changed(
+        upsert_objects=[
+            create_upsert_object(
+                remote_niconico_content_id="lv1",
+                last_fetch_time=FETCH_TIME + HEARTBEAT_INTERVAL,
+            ),
+        ],
+    )
+
+    pruned_count = state_store.prune(
+        now=FETCH_TIME + HEARTBEAT_INTERVAL * 2 + timedelta(seconds=1),
+    )
+
+    assert pruned_count == 1
+    assert len(state_store) == 1
+    assert state_store.get(remote_niconico_content_id="lv1") is not None
+    assert state_store.get(remote_niconico_content_id="lv2") is None
+    assert state_store.has_niconico_user(remote_niconico_user_id="1000")
+    assert not state_store.has_niconico_user(remote_niconico_user_id="2000")
+
+
+def test_prune_keeps_recent_programs() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+
+    pruned_count = state_store.prune(now=FETCH_TIME + HEARTBEAT_INTERVAL * 2)
+
+    assert pruned_count == 0
+    assert len(state_store) == 1
+
+
+def test_mark_upserted_moves_program_between_users() -> None:
+    state_store = create_state_store()
+    state_store.mark_upserted(upsert_objects=[create_upsert_object()])
+    state_store.mark_upserted(
+        upsert_objects=[create_upsert_object(remote_niconico_user_id="2000")],
+    )
+
+    assert not state_store.has_niconico_user(remote_niconico_user_id="1000")
+    assert state_store.has_niconico_user(remote_niconico_user_id="2000")
@@ -0,0 +1,106 @@
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+from live_inbox_updater.live_inbox_api.niconico_user_icon_cache_metadata_manager import (
+    LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager,
+)
+
+# 引数を持たないフィールド名だけが並ぶ、最も内側の選択セット
+GRAPHQL_SELECTION_SET_PATTERN = re.compile(
+    r"\{\s*((?:[A-Za-z_][A-Za-z0-9_]*\s+)*[A-Za-z_][A-Za-z0-9_]*)\s*\}"
+)
+
+FETCHED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+REVALIDATED_AT = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+ICON_URL = "https://secure-dcdn.cdn.nimg.jp/nicoaccount/usericon/1000/1000.jpg"
+
+# テーブルの全ての列。問い合わせでは、クエリが選択した列だけを返す
+STORED_ROW: dict[str, Any] = {
+    "id": "1",
+    "url": ICON_URL,
+    "fetched_at": FETCHED_AT.isoformat(),
+    "file_size": 100,
+    "hash_md5": "d41d8cd98f00b204e9800998ecf8427e",
+    "content_type": "image/jpeg",
+    "file_key": "niconico_user_icon/1000.jpg",
+    "etag": '"etag"',
+    "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+    "revalidated_at": REVALIDATED_AT.isoformat(),
+    "gone_at": None,
+}
+
+
+class FakeHasura:
+    def __init__(self) -> None:
+        self.selected_field_names: list[list[str]] = []
+
+    def handle_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        query: str = json.loads(request.content)["query"]
+
+        match = GRAPHQL_SELECTION_SET_PATTERN.search(query)
+        assert match is not None
+        field_names = match.group(1).split()
+        self.selected_field_names.append(field_names)
+
+        row = {field_name: STORED_ROW[field_name] for field_name in field_names}
+        return httpx.Response(
+            200,
+            json={"data": {"niconico_user_icon_caches": [row]}},
+        )
+
+
+def create_manager(
+    fake_hasura: FakeHasura,
+) -> LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager:
+    return LiveInboxApiNiconicoUserIconCacheMetadataHasuraManager(
+        hasura_url="http://hasura.test/",
+        hasura_token="token",
+        useragent="live_inbox_updater test",
+        http_client=httpx.Client(
+            transport=httpx.MockTransport(fake_hasura.handle_request),
+        ),
+    )
+
+
+def test_get_by_urls_validates_only_selected_columns() -> None:
+    """
+    更新サイクルごとの問い合わせは再検証用の列を選択しないため、
+    それらの列がない応答も読めなければならない
+    """
+
+    fake_hasura = FakeHasura()
+    manager = create_manager(fake_hasura=fake_hasura)
+
+    metadatas = manager.get_by_urls(urls=[ICON_URL])
+
+    assert "revalidated_at" not in fake_hasura.selected_field_names[0]
+    assert len(metadatas) == 1
+    assert metadatas[0].url == ICON_URL
+    assert metadatas[0].fetched_at == FETCHED_AT
+    assert metadatas[0].file_key == STORED_ROW["file_key"]
+    assert metadatas[0].etag is None
+    assert metadatas[0].revalidated_at is None
+
+
+def test_get_revalidation_candidates_reads_revalidation_columns() -> None:
+    fake_hasura = FakeHasura()
+    manager = create_manager(fake_hasura=fake_hasura)
+
+    metadatas = manager.get_revalidation_candidates(
+        validated_before=REVALIDATED_AT,
+        limit=10,
+    )
+
+    assert len(metadatas) == 1
+    assert metadatas[0].etag == STORED_ROW["etag"]
+    assert metadatas[0].last_modified == STORED_ROW["last_modified"]
+    assert metadatas[0].revalidated_at == REVALIDATED_AT
+    assert metadatas[0].gone_at is None
@@ -0,0 +1,313 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+from live_inbox_updater.live_inbox_api.niconico_user_manager import (
+    LiveInboxApiNiconicoUser,
+    LiveInboxApiNiconicoUserCreateObject,
+    LiveInboxApiNiconicoUserEnabledUpdateObject,
+    LiveInboxApiNiconicoUserManager,
+)
+from live_inbox_updater.live_inbox_utility import (
+    NiconicoUserIndex,
+    NiconicoUserShard,
+    get_shard_index,
+)
+from live_inbox_updater.live_inbox_utility.niconico_user_index import (
+    INCREMENTAL_SYNC_OVERLAP,
+)
+
+UPDATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+FULL_RESYNC_INTERVAL = timedelta(hours=1)
+
+
+def create_niconico_user(
+    remote_niconico_user_id: str,
+    updated_at: datetime | None = UPDATED_AT,
+    enabled: bool = True,
+    name: str = "name",
+) -> LiveInboxApiNiconicoUser:
+    return LiveInboxApiNiconicoUser(
+        remote_niconico_user_id=remote_niconico_user_id,
+        name=name,
+        enabled=enabled,
+        icon_url=None,
+        updated_at=updated_at,
+    )
+
+
+class IteratingNiconicoUserList(list[LiveInboxApiNiconicoUser]):
+    """
+    1件取り出すごとにon_iterを呼ぶリスト。反映の途中の状態を確かめるために使う
+    """
+
+    def __init__(
+        self,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+        on_iter: Callable[[], None],
+    ):
+        super().__init__(niconico_users)
+        self.on_iter = on_iter
+
+    def __iter__(self) -> Iterator[LiveInboxApiNiconicoUser]:
+        for niconico_user in super().__iter__():
+            self.on_iter()
+            yield niconico_user
+
+
+class FakeNiconicoUserManager(LiveInboxApiNiconicoUserManager):
+    def __init__(self) -> None:
+        self.niconico_users: list[LiveInboxApiNiconicoUser] = []
+        self.updated_afters: list[datetime | None] = []
+        self.on_iter: Callable[[], None] | None = None
+
+    def __create_list(
+        self,
+        niconico_users: Iterable[LiveInboxApiNiconicoUser],
+    ) -> list[LiveInboxApiNiconicoUser]:
+        on_iter = self.on_iter
+        if on_iter is None:
+            return list(niconico_users)
+
+        return IteratingNiconicoUserList(niconico_users=niconico_users, on_iter=on_iter)
+
+    def get_all(
+        self,
+    ) -> list[LiveInboxApiNiconicoUser]:
+        return self.__create_list(niconico_users=self.niconico_users)
+
+    def get_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> list[LiveInboxApiNiconicoUser]:
+        self.updated_afters.append(updated_after)
+
+        return self.__create_list(
+            niconico_users=(
+                niconico_user
+                for niconico_user in self.niconico_users
+                if updated_after is None
+                or niconico_user.updated_at is None
+                or updated_after <= niconico_user.updated_at
+            ),
+        )
+
+    def create_users(
+        self,
+        create_objects: Iterable[LiveInboxApiNiconicoUserCreateObject],
+    ) -> None:
+        raise NotImplementedError()
+
+    def bulk_update_user_enabled(
+        self,
+        update_objects: Iterable[LiveInboxApiNiconicoUserEnabledUpdateObject],
+    ) -> None:
+        raise NotImplementedError()
+
+
+def create_index(
+    niconico_user_manager: FakeNiconicoUserManager,
+    incremental: bool = True,
+    full_resync_interval: timedelta = FULL_RESYNC_INTERVAL,
+    shard: NiconicoUserShard | None = None,
+) -> NiconicoUserIndex:
+    return NiconicoUserIndex(
+        niconico_user_manager=niconico_user_manager,
+        incremental=incremental,
+        full_resync_interval=full_resync_interval,
+        shard=shard,
+    )
+
+
+def get_remote_niconico_user_ids(
+    niconico_user_index: NiconicoUserIndex,
+) -> list[str]:
+    update_cycle_context = niconico_user_index.create_update_cycle_context()
+    return sorted(
+        niconico_user.remote_niconico_user_id
+        for niconico_user in update_cycle_context.enabled_niconico_users
+    )
+
+
+def test_apply_returns_changed_count() -> None:
+    niconico_user_index = create_index(niconico_user_manager=FakeNiconicoUserManager())
+
+    assert (
+        niconico_user_index.apply(
+            niconico_users=[create_niconico_user("1000"), create_niconico_user("2000")],
+        )
+        == 2
+    )
+    assert niconico_user_index.apply(niconico_users=[create_niconico_user("1000")]) == 0
+    assert (
+        niconico_user_index.apply(
+            niconico_users=[create_niconico_user("1000", name="new name")],
+        )
+        == 1
+    )
+    assert len(niconico_user_index) == 2
+
+
+def test_apply_disabled_user_is_kept_but_not_enabled() -> None:
+    niconico_user_index = create_index(niconico_user_manager=FakeNiconicoUserManager())
+    niconico_user_index.apply(
+        niconico_users=[create_niconico_user("1000"), create_niconico_user("2000")],
+    )
+
+    niconico_user_index.apply(
+        niconico_users=[create_niconico_user("1000", enabled=False)],
+    )
+
+    assert len(niconico_user_index) == 2
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["2000"]
+
+
+def test_apply_advances_cursor_to_latest_updated_at() -> None:
+    niconico_user_index = create_index(niconico_user_manager=FakeNiconicoUserManager())
+    assert niconico_user_index.get_cursor() is None
+
+    niconico_user_index.apply(
+        niconico_users=[
+            create_niconico_user("1000", updated_at=UPDATED_AT + timedelta(hours=2)),
+            create_niconico_user("2000", updated_at=UPDATED_AT),
+            create_niconico_user("3000", updated_at=None),
+        ],
+    )
+
+    assert (
+        niconico_user_index.get_cursor()
+        == UPDATED_AT + timedelta(hours=2) - INCREMENTAL_SYNC_OVERLAP
+    )
+
+
+def test_apply_keeps_only_users_in_shard() -> None:
+    shard = NiconicoUserShard(index=0, count=2)
+    niconico_user_index = create_index(
+        niconico_user_manager=FakeNiconicoUserManager(),
+        shard=shard,
+    )
+
+    remote_niconico_user_ids = [str(1000 + index) for index in range(20)]
+    niconico_users = [
+        create_niconico_user(
+            remote_niconico_user_id,
+            updated_at=UPDATED_AT + timedelta(minutes=index),
+        )
+        for index, remote_niconico_user_id in enumerate(remote_niconico_user_ids)
+    ]
+    niconico_user_index.apply(niconico_users=niconico_users)
+
+    assert get_remote_niconico_user_ids(niconico_user_index) == sorted(
+        remote_niconico_user_id
+        for remote_niconico_user_id in remote_niconico_user_ids
+        if get_shard_index(key=remote_niconico_user_id, shard_count=2) == 0
+    )
+
+    # 担当外のユーザもカーソルは進める
+    assert (
+        niconico_user_index.get_cursor()
+        == UPDATED_AT + timedelta(minutes=19) - INCREMENTAL_SYNC_OVERLAP
+    )
+
+
+def test_sync_full_mode_replaces_users() -> None:
+    niconico_user_manager = FakeNiconicoUserManager()
+    niconico_user_index = create_index(
+        niconico_user_manager=niconico_user_manager,
+        incremental=False,
+    )
+
+    niconico_user_manager.niconico_users = [
+        create_niconico_user("1000"),
+        create_niconico_user("2000"),
+    ]
+    niconico_user_index.sync()
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["1000", "2000"]
+
+    # 削除されたユーザは全件の取得し直しで消える
+    niconico_user_manager.niconico_users = [create_niconico_user("2000")]
+    niconico_user_index.sync()
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["2000"]
+
+
+def test_sync_incremental_mode_fetches_since_cursor() -> None:
+    niconico_user_manager = FakeNiconicoUserManager()
+    niconico_user_index = create_index(niconico_user_manager=niconico_user_manager)
+
+    niconico_user_manager.niconico_users = [create_niconico_user("1000")]
+    niconico_user_index.sync()
+
+    updated_at = UPDATED_AT + timedelta(hours=1)
+    niconico_user_manager.niconico_users.append(
+        create_niconico_user("2000", updated_at=updated_at),
+    )
+    niconico_user_index.sync()
+
+    assert niconico_user_manager.updated_afters == [
+        None,
+        UPDATED_AT - INCREMENTAL_SYNC_OVERLAP,
+    ]
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["1000", "2000"]
+    assert niconico_user_index.get_cursor() == updated_at - INCREMENTAL_SYNC_OVERLAP
+
+
+def test_sync_incremental_mode_resyncs_when_due() -> None:
+    niconico_user_manager = FakeNiconicoUserManager()
+    niconico_user_index = create_index(
+        niconico_user_manager=niconico_user_manager,
+        full_resync_interval=timedelta(0),
+    )
+
+    niconico_user_manager.niconico_users = [
+        create_niconico_user("1000"),
+        create_niconico_user("2000"),
+    ]
+    niconico_user_index.sync()
+    assert niconico_user_index.is_full_resync_due()
+
+    niconico_user_manager.niconico_users = [create_niconico_user("2000")]
+    niconico_user_index.sync()
+
+    assert niconico_user_manager.updated_afters == [None, None]
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["2000"]
+
+
+def test_full_resync_is_not_visible_until_complete() -> None:
+    """
+    全件の取得し直しの途中で、空や作りかけのユーザ一覧が見えない
+    """
+
+    niconico_user_manager = FakeNiconicoUserManager()
+    niconico_user_index = create_index(
+        niconico_user_manager=niconico_user_manager,
+        full_resync_interval=timedelta(0),
+    )
+
+    niconico_user_manager.niconico_users = [
+        create_niconico_user("1000"),
+        create_niconico_user("2000"),
+    ]
+    niconico_user_index.sync()
+    cursor = niconico_user_index.get_cursor()
+
+    observed_remote_niconico_user_ids: list[list[str]] = []
+
+    def _observe() -> None:
+        observed_remote_niconico_user_ids.append(
+            get_remote_niconico_user_ids(niconico_user_index),
+        )
+        assert niconico_user_index.get_cursor() == cursor
+
+    niconico_user_manager.niconico_users = [
+        create_niconico_user("3000", updated_at=UPDATED_AT + timedelta(hours=1)),
+        create_niconico_user("4000", updated_at=UPDATED_AT + timedelta(hours=1)),
+    ]
+    niconico_user_manager.on_iter = _observe
+    niconico_user_index.sync()
+
+    assert observed_remote_niconico_user_ids == [["1000", "2000"], ["1000", "2000"]]
+    assert get_remote_niconico_user_ids(niconico_user_index) == ["3000", "4000"]
+    assert (
+        niconico_user_index.get_cursor()
+        == UPDATED_AT + timedelta(hours=1) - INCREMENTAL_SYNC_OVERLAP
+    )
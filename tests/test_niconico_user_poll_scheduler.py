@@ -0,0 +1,214 @@
+from datetime import datetime, timedelta, timezone
+
+from live_inbox_updater.live_inbox_api.niconico_live_program_manager import (
+    LiveInboxApiNiconicoLiveProgramUpsertObject,
+)
+from live_inbox_updater.live_inbox_utility import (
+    NiconicoUserPollScheduler,
+    compute_niconico_user_poll_interval,
+)
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+MIN_INTERVAL = timedelta(minutes=1)
+BASE_INTERVAL = timedelta(minutes=15)
+MAX_INTERVAL = timedelta(hours=6)
+
+
+def create_scheduler() -> NiconicoUserPollScheduler:
+    return NiconicoUserPollScheduler(
+        min_interval=MIN_INTERVAL,
+        base_interval=BASE_INTERVAL,
+        max_interval=MAX_INTERVAL,
+    )
+
+
+def create_upsert_object(
+    status: str,
+    start_time: datetime | None,
+) -> LiveInboxApiNiconicoLiveProgramUpsertObject:
+    return LiveInboxApiNiconicoLiveProgramUpsertObject(
+        remote_niconico_content_id="lv1",
+        remote_niconico_user_id="1000",
+        title="title",
+        status=status,
+        last_fetch_time=NOW,
+        start_time=start_time,
+        end_time=None,
+    )
+
+
+def pop_all_due(
+    scheduler: NiconicoUserPollScheduler,
+    now: datetime,
+) -> list[str]:
+    remote_niconico_user_ids: list[str] = []
+    while True:
+        remote_niconico_user_id = scheduler.pop_due(now=now)
+        if remote_niconico_user_id is None:
+            return remote_niconico_user_ids
+
+        remote_niconico_user_ids.append(remote_niconico_user_id)
+
+
+def test_new_users_are_due_immediately() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000", "2000"], now=NOW)
+
+    assert len(scheduler) == 2
+    assert sorted(pop_all_due(scheduler=scheduler, now=NOW)) == ["1000", "2000"]
+    assert scheduler.get_next_poll_at() is None
+
+
+def test_pop_due_returns_users_in_poll_time_order() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000", "2000", "3000"], now=NOW)
+    pop_all_due(scheduler=scheduler, now=NOW)
+
+    scheduler.schedule(remote_niconico_user_id="1000", at=NOW + timedelta(minutes=3))
+    scheduler.schedule(remote_niconico_user_id="2000", at=NOW + timedelta(minutes=1))
+    scheduler.schedule(remote_niconico_user_id="3000", at=NOW + timedelta(minutes=2))
+
+    assert scheduler.get_next_poll_at() == NOW + timedelta(minutes=1)
+    assert scheduler.pop_due(now=NOW) is None
+    assert pop_all_due(scheduler=scheduler, now=NOW + timedelta(minutes=2)) == [
+        "2000",
+        "3000",
+    ]
+    assert pop_all_due(scheduler=scheduler, now=NOW + timedelta(minutes=3)) == ["1000"]
+
+
+def test_rescheduled_users_skip_stale_entries() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000", "2000"], now=NOW)
+    pop_all_due(scheduler=scheduler, now=NOW)
+
+    scheduler.schedule(remote_niconico_user_id="1000", at=NOW + timedelta(minutes=1))
+    scheduler.schedule(remote_niconico_user_id="2000", at=NOW + timedelta(minutes=2))
+
+    # 1000を後ろに動かすと、先頭に残った古いエントリは捨てられる
+    scheduler.schedule(remote_niconico_user_id="1000", at=NOW + timedelta(minutes=5))
+
+    assert scheduler.get_next_poll_at() == NOW + timedelta(minutes=2)
+    assert pop_all_due(scheduler=scheduler, now=NOW + timedelta(minutes=10)) == [
+        "2000",
+        "1000",
+    ]
+
+
+def test_earlier_only_keeps_earlier_poll_time() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000"], now=NOW)
+    pop_all_due(scheduler=scheduler, now=NOW)
+
+    scheduler.schedule(remote_niconico_user_id="1000", at=NOW + timedelta(minutes=5))
+    scheduler.schedule(
+        remote_niconico_user_id="1000",
+        at=NOW + timedelta(minutes=10),
+        earlier_only=True,
+    )
+    assert scheduler.get_user_next_poll_at(
+        remote_niconico_user_id="1000"
+    ) == NOW + timedelta(minutes=5)
+
+    scheduler.schedule(
+        remote_niconico_user_id="1000",
+        at=NOW + timedelta(minutes=1),
+        earlier_only=True,
+    )
+    assert scheduler.get_user_next_poll_at(
+        remote_niconico_user_id="1000"
+    ) == NOW + timedelta(minutes=1)
+
+    # 前の時刻のエントリは残っていても取り出されない
+    assert pop_all_due(scheduler=scheduler, now=NOW + timedelta(minutes=10)) == ["1000"]
+
+
+def test_removed_users_are_not_popped() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000", "2000"], now=NOW)
+    scheduler.sync_users(remote_niconico_user_ids=["2000"], now=NOW)
+
+    assert len(scheduler) == 1
+    assert pop_all_due(scheduler=scheduler, now=NOW) == ["2000"]
+
+    # 対象外のユーザは設定しても無視する
+    scheduler.schedule(remote_niconico_user_id="1000", at=NOW)
+    assert scheduler.pop_due(now=NOW) is None
+
+
+def test_popped_users_are_not_popped_again_until_rescheduled() -> None:
+    scheduler = create_scheduler()
+    scheduler.sync_users(remote_niconico_user_ids=["1000"], now=NOW)
+
+    assert scheduler.pop_due(now=NOW) == "1000"
+    assert scheduler.pop_due(now=NOW + timedelta(days=1)) is None
+
+    next_poll_at = scheduler.reschedule(
+        remote_niconico_user_id="1000",
+        upsert_objects=[create_upsert_object(status="ON_AIR", start_time=NOW)],
+        now=NOW,
+    )
+    assert next_poll_at == NOW + MIN_INTERVAL
+    assert scheduler.pop_due(now=next_poll_at) == "1000"
+
+
+def test_compute_poll_interval_on_air() -> None:
+    interval = compute_niconico_user_poll_interval(
+        upsert_objects=[create_upsert_object(status="ON_AIR", start_time=NOW)],
+        now=NOW,
+        min_interval=MIN_INTERVAL,
+        base_interval=BASE_INTERVAL,
+        max_interval=MAX_INTERVAL,
+    )
+
+    assert interval == MIN_INTERVAL
+
+
+def test_compute_poll_interval_reserved() -> None:
+    interval = compute_niconico_user_poll_interval(
+        upsert_objects=[
+            create_upsert_object(
+                status="RESERVED",
+                start_time=NOW + timedelta(minutes=5),
+            ),
+        ],
+        now=NOW,
+        min_interval=MIN_INTERVAL,
+        base_interval=BASE_INTERVAL,
+        max_interval=MAX_INTERVAL,
+    )
+
+    assert interval == timedelta(minutes=5)
+
+
+def test_compute_poll_interval_without_programs() -> None:
+    interval = compute_niconico_user_poll_interval(
+        upsert_objects=[],
+        now=NOW,
+        min_interval=MIN_INTERVAL,
+        base_interval=BASE_INTERVAL,
+        max_interval=MAX_INTERVAL,
+    )
+
+    assert interval == MAX_INTERVAL
+
+
+def test_compute_poll_interval_grows_with_activity_gap() -> None:
+    def _compute(days_since_last_broadcast: int) -> timedelta:
+        return compute_niconico_user_poll_interval(
+            upsert_objects=[
+                create_upsert_object(
+                    status="ENDED",
+                    start_time=NOW - timedelta(days=days_since_last_broadcast),
+                ),
+            ],
+            now=NOW,
+            min_interval=MIN_INTERVAL,
+            base_interval=BASE_INTERVAL,
+            max_interval=MAX_INTERVAL,
+        )
+
+    assert _compute(days_since_last_broadcast=1) == BASE_INTERVAL
+    assert _compute(days_since_last_broadcast=7) == timedelta(days=7) / 96
+    assert _compute(days_since_last_broadcast=365) == MAX_INTERVAL
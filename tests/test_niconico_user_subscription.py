@@ -0,0 +1,354 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+import pytest
+
+from live_inbox_updater.live_inbox_api.niconico_user_manager import (
+    LiveInboxApiNiconicoUser,
+    LiveInboxApiNiconicoUserCreateObject,
+    LiveInboxApiNiconicoUserEnabledUpdateObject,
+    LiveInboxApiNiconicoUserManager,
+    NiconicoUserHasuraSubscriber,
+)
+from live_inbox_updater.live_inbox_api.niconico_user_manager.hasura_subscription import (
+    GRAPHQL_TRANSPORT_WS_PROTOCOL,
+    STREAM_INITIAL_UPDATED_AT,
+)
+from live_inbox_updater.live_inbox_utility import (
+    NiconicoUserIndex,
+    run_niconico_user_subscription_forever,
+)
+from live_inbox_updater.live_inbox_utility.niconico_user_index import (
+    INCREMENTAL_SYNC_OVERLAP,
+)
+
+# websocketsは任意の依存パッケージのため、なければこのファイルのテストを飛ばす
+websockets_server = pytest.importorskip("websockets.asyncio.server")
+
+HASURA_TOKEN = "token"
+USERAGENT = "live_inbox_updater test"
+
+UPDATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def create_hasura_niconico_user(
+    remote_niconico_user_id: str,
+    updated_at: datetime,
+) -> dict[str, Any]:
+    return {
+        "id": remote_niconico_user_id,
+        "remote_niconico_user_id": remote_niconico_user_id,
+        "name": f"user {remote_niconico_user_id}",
+        "enabled": True,
+        "icon_url": None,
+        "updated_at": updated_at.isoformat(),
+    }
+
+
+def create_next_message(
+    hasura_niconico_users: list[dict[str, Any]],
+) -> dict[str, Any]:
+    return {
+        "id": "1",
+        "type": "next",
+        "payload": {
+            "data": {
+                "niconico_users_stream": hasura_niconico_users,
+            },
+        },
+    }
+
+
+class FakeHasuraSubscriptionServer:
+    """
+    graphql-transport-wsでHasuraのストリーミングサブスクリプションを真似るサーバ
+
+    n回目の接続では、subscribeを受けた後にscripts[n]のメッセージを順に送る。
+    最後のscriptを送り終えたら接続を保ち、それ以外は切断して再接続を促す
+    """
+
+    def __init__(
+        self,
+        scripts: list[list[dict[str, Any]]],
+    ):
+        self.scripts = scripts
+
+        self.paths: list[str] = []
+        self.subprotocols: list[str | None] = []
+        self.user_agents: list[str | None] = []
+        self.connection_init_payloads: list[dict[str, Any]] = []
+        self.subscribe_payloads: list[dict[str, Any]] = []
+        self.pong_count = 0
+
+    async def handle(self, connection: Any) -> None:
+        connection_index = len(self.paths)
+
+        self.paths.append(connection.request.path)
+        self.subprotocols.append(connection.subprotocol)
+        self.user_agents.append(connection.request.headers.get("User-Agent"))
+
+        async def _send(message: dict[str, Any]) -> None:
+            await connection.send(json.dumps(message))
+
+        async def _receive() -> dict[str, Any]:
+            message: dict[str, Any] = json.loads(await connection.recv())
+            if message["type"] == "pong":
+                self.pong_count += 1
+                return await _receive()
+
+            return message
+
+        message = await _receive()
+        assert message["type"] == "connection_init"
+        self.connection_init_payloads.append(message["payload"])
+
+        # 接続の確立前のpingにも応答できることを確かめる
+        await _send({"type": "ping"})
+        await _send({"type": "connection_ack"})
+
+        message = await _receive()
+        assert message["type"] == "subscribe"
+        self.subscribe_payloads.append(message["payload"])
+
+        for script_message in self.scripts[connection_index]:
+            await _send(script_message)
+
+        if connection_index < len(self.scripts) - 1:
+            await connection.close()
+            return
+
+        # クライアントが閉じるまで、送ったpingへの応答を数える
+        async for raw_message in connection:
+            if json.loads(raw_message)["type"] == "pong":
+                self.pong_count += 1
+
+
+class FakeNiconicoUserManager(LiveInboxApiNiconicoUserManager):
+    """
+    サブスクリプションのテストでは同期を行わないため、呼ばれたら失敗する
+    """
+
+    def get_all(
+        self,
+    ) -> list[LiveInboxApiNiconicoUser]:
+        raise NotImplementedError()
+
+    def get_updated_since(
+        self,
+        updated_after: datetime | None,
+    ) -> list[LiveInboxApiNiconicoUser]:
+        raise NotImplementedError()
+
+    def create_users(
+        self,
+        create_objects: Iterable[LiveInboxApiNiconicoUserCreateObject],
+    ) -> None:
+        raise NotImplementedError()
+
+    def bulk_update_user_enabled(
+        self,
+        update_objects: Iterable[LiveInboxApiNiconicoUserEnabledUpdateObject],
+    ) -> None:
+        raise NotImplementedError()
+
+
+async def collect_subscription(
+    server: FakeHasuraSubscriptionServer,
+    updated_after: datetime | None,
+) -> list[list[LiveInboxApiNiconicoUser]]:
+    async with websockets_server.serve(
+        server.handle,
+        "127.0.0.1",
+        0,
+        subprotocols=[GRAPHQL_TRANSPORT_WS_PROTOCOL],
+    ) as websocket_server:
+        port = websocket_server.sockets[0].getsockname()[1]
+        subscriber = NiconicoUserHasuraSubscriber(
+            hasura_url=f"http://127.0.0.1:{port}/",
+            hasura_token=HASURA_TOKEN,
+            useragent=USERAGENT,
+            batch_size=10,
+        )
+
+        batches: list[list[LiveInboxApiNiconicoUser]] = []
+        async for niconico_users in subscriber.subscribe_updated_since(
+            updated_after=updated_after,
+        ):
+            batches.append(niconico_users)
+
+        return batches
+
+
+def test_subscribe_receives_batches_until_complete() -> None:
+    server = FakeHasuraSubscriptionServer(
+        scripts=[
+            [
+                create_next_message(
+                    [
+                        create_hasura_niconico_user("1000", UPDATED_AT),
+                        create_hasura_niconico_user(
+                            "2000", UPDATED_AT + timedelta(seconds=1)
+                        ),
+                    ],
+                ),
+                {"type": "ping"},
+                {"type": "ka"},
+                create_next_message(
+                    [
+                        create_hasura_niconico_user(
+                            "3000", UPDATED_AT + timedelta(seconds=2)
+                        ),
+                    ],
+                ),
+                {"id": "1", "type": "complete"},
+            ],
+        ],
+    )
+
+    batches = asyncio.run(collect_subscription(server=server, updated_after=None))
+
+    assert [
+        [niconico_user.remote_niconico_user_id for niconico_user in niconico_users]
+        for niconico_users in batches
+    ] == [["1000", "2000"], ["3000"]]
+    assert batches[1][0].updated_at == UPDATED_AT + timedelta(seconds=2)
+
+    assert server.paths == ["/v1/graphql"]
+    assert server.subprotocols == [GRAPHQL_TRANSPORT_WS_PROTOCOL]
+    assert server.user_agents == [USERAGENT]
+    assert server.connection_init_payloads == [
+        {"headers": {"Authorization": f"Bearer {HASURA_TOKEN}"}},
+    ]
+    assert server.pong_count == 2
+
+    subscribe_payload = server.subscribe_payloads[0]
+    assert "subscription StreamNiconicoUsers" in subscribe_payload["query"]
+    assert subscribe_payload["variables"] == {
+        "batch_size": 10,
+        "updated_after": STREAM_INITIAL_UPDATED_AT.isoformat(),
+    }
+
+
+def test_subscribe_from_updated_after() -> None:
+    server = FakeHasuraSubscriptionServer(
+        scripts=[[{"id": "1", "type": "complete"}]],
+    )
+
+    batches = asyncio.run(
+        collect_subscription(server=server, updated_after=UPDATED_AT),
+    )
+
+    assert batches == []
+    assert (
+        server.subscribe_payloads[0]["variables"]["updated_after"]
+        == UPDATED_AT.isoformat()
+    )
+
+
+def test_subscribe_raises_on_error_message() -> None:
+    server = FakeHasuraSubscriptionServer(
+        scripts=[
+            [{"id": "1", "type": "error", "payload": [{"message": "denied"}]}],
+        ],
+    )
+
+    with pytest.raises(Exception, match="Subscription error"):
+        asyncio.run(collect_subscription(server=server, updated_after=None))
+
+
+def test_subscription_reconnects_from_index_cursor() -> None:
+    """
+    切断されたら、それまでに反映したユーザのカーソルから受け取り直す
+    """
+
+    server = FakeHasuraSubscriptionServer(
+        scripts=[
+            [
+                create_next_message(
+                    [
+                        create_hasura_niconico_user("1000", UPDATED_AT),
+                        create_hasura_niconico_user(
+                            "2000", UPDATED_AT + timedelta(seconds=1)
+                        ),
+                    ],
+                ),
+            ],
+            [
+                # 重なりの分だけ再送されたユーザは変更として数えない
+                create_next_message(
+                    [
+                        create_hasura_niconico_user(
+                            "2000", UPDATED_AT + timedelta(seconds=1)
+                        ),
+                        create_hasura_niconico_user(
+                            "3000", UPDATED_AT + timedelta(seconds=2)
+                        ),
+                    ],
+                ),
+            ],
+        ],
+    )
+
+    niconico_user_index = NiconicoUserIndex(
+        niconico_user_manager=FakeNiconicoUserManager(),
+        incremental=True,
+        full_resync_interval=timedelta(hours=1),
+        shard=None,
+    )
+
+    async def _run() -> int:
+        changed = asyncio.Event()
+        changed_count = 0
+
+        def _on_changed() -> None:
+            nonlocal changed_count
+            changed_count += 1
+            if len(niconico_user_index) == 3:
+                changed.set()
+
+        async with websockets_server.serve(
+            server.handle,
+            "127.0.0.1",
+            0,
+            subprotocols=[GRAPHQL_TRANSPORT_WS_PROTOCOL],
+        ) as websocket_server:
+            port = websocket_server.sockets[0].getsockname()[1]
+            subscriber = NiconicoUserHasuraSubscriber(
+                hasura_url=f"http://127.0.0.1:{port}/",
+                hasura_token=HASURA_TOKEN,
+                useragent=USERAGENT,
+            )
+
+            subscription_task = asyncio.create_task(
+                run_niconico_user_subscription_forever(
+                    niconico_user_subscriber=subscriber,
+                    niconico_user_index=niconico_user_index,
+                    on_changed=_on_changed,
+                    reconnect_delay=timedelta(0),
+                ),
+            )
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=10)
+            finally:
+                subscription_task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await subscription_task
+
+        return changed_count
+
+    changed_count = asyncio.run(_run())
+
+    assert changed_count == 2
+    assert [
+        subscribe_payload["variables"]["updated_after"]
+        for subscribe_payload in server.subscribe_payloads
+    ] == [
+        STREAM_INITIAL_UPDATED_AT.isoformat(),
+        (UPDATED_AT + timedelta(seconds=1) - INCREMENTAL_SYNC_OVERLAP).isoformat(),
+    ]
+    assert (
+        niconico_user_index.get_cursor()
+        == UPDATED_AT + timedelta(seconds=2) - INCREMENTAL_SYNC_OVERLAP
+    )